@@ -3,22 +3,39 @@ Sistema de Classificação de Emails - Backend
 Desenvolvido para automatizar a classificação e resposta de emails corporativos
 """
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 from flask_cors import CORS
 import re
 import string
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import RSLPStemmer
-import PyPDF2
 import io
 import os
+import json
+import hashlib
+import hmac
+import time
+import atexit
+import threading
+from functools import cached_property
 from datetime import datetime
 import logging
-import imaplib
-import email
-from email.header import decode_header
+from response_rules import ResponseRulesError, ResponseSelector, load_response_rules
+from linear_model import LinearEngine, LinearModelError
+from model_artifact import BackgroundVerifier, is_artifact, load_artifact_engine, rss_kb
+from online_learning import FeedbackLearner
+from near_duplicates import NearDuplicateIndex
+from language_detection import LanguageDetector
+from keyword_matcher import _trie_pattern
+from text_trimming import EmailTrimmer
+from intent_tags import IntentTagger, summarize_tags
+from rule_config import RuleConfigError, RuleReloader, load_rule_config
+from classification_store import ClassificationStore
+from nlp_resources import LazyResource, download_nltk_resources, use_bundled_data, word_tokenize
+from stem_table import StemTableError, TableStemmer, load_table
+from email_features import EmailFeatures
+from classification_export import FORMATS as EXPORT_FORMATS, ExportError, export as export_classifications
+from shared_stats import SharedStats
+from job_queue import JobError, JobQueue, JobWorkerPool
+from event_log import EventLog
 # import emailconfig.env  # Comentado temporariamente para evitar erro de import
 
 # Configuração de logging
@@ -29,200 +46,457 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Download dos recursos NLTK necessários (executar automaticamente)
-def download_nltk_resources():
-    """Download automático dos recursos NLTK necessários"""
-    resources = ['punkt', 'stopwords', 'rslp']
+# Modo serverless (SERVERLESS=1, ex.: Vercel): cada cold start importa o app do
+# zero, então nada pesado é carregado na subida. nltk, PyPDF2 e imaplib só são
+# importados quando uma rota precisa deles, e os dados do NLTK vêm do diretório
+# empacotado com a função (NLTK_DATA_DIR), sem verificação nem download.
+SERVERLESS = os.environ.get('SERVERLESS', '0') == '1'
+NLTK_DATA_DIR = os.environ.get('NLTK_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data'))
+
+# Inicialização dos componentes NLP com tratamento de erro (no primeiro uso)
+def load_stemmer():
+    try:
+        from nltk.stem import RSLPStemmer
+        stemmer = RSLPStemmer()
+        print("✅ Stemmer português (RSLP) carregado com sucesso")
+        return stemmer
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar stemmer português, usando alternativa: {e}")
+        # Fallback: usar stemmer básico ou sem stemming
+        return None
+
+def load_stop_words():
+    try:
+        from nltk.corpus import stopwords
+        stop_words = frozenset(stopwords.words('portuguese'))
+        print("✅ Stop words em português carregadas com sucesso")
+        return stop_words
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar stop words, usando lista básica: {e}")
+        # Lista básica de stop words em português
+        return frozenset((
+            'a', 'o', 'e', 'é', 'de', 'do', 'da', 'em', 'um', 'uma', 'para', 'com', 'não', 'na', 'no',
+            'se', 'que', 'por', 'mais', 'as', 'os', 'como', 'mas', 'foi', 'ao', 'ele', 'das', 'tem',
+            'à', 'seu', 'sua', 'ou', 'ser', 'quando', 'muito', 'há', 'nos', 'já', 'está', 'eu', 'também',
+            'só', 'pelo', 'pela', 'até', 'isso', 'ela', 'entre', 'era', 'depois', 'sem', 'mesmo', 'aos',
+            'ter', 'seus', 'suas', 'numa', 'pelos', 'pelas', 'esse', 'essa', 'num', 'nem', 'meu',
+            'às', 'minha', 'têm', 'contra', 'sobre', 'durante', 'antes'
+        ))
+
+# Componentes do pipeline em inglês (o Porter não depende de dados do NLTK)
+def load_english_stemmer():
+    from nltk.stem import PorterStemmer
+    return PorterStemmer()
+
+def load_english_stop_words():
+    try:
+        from nltk.corpus import stopwords
+        stop_words = frozenset(stopwords.words('english'))
+        print("✅ Stop words em inglês carregadas com sucesso")
+        return stop_words
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar stop words em inglês, usando lista básica: {e}")
+        return frozenset((
+            'a', 'an', 'the', 'and', 'or', 'but', 'if', 'of', 'to', 'in', 'on', 'at', 'by', 'for',
+            'with', 'about', 'as', 'is', 'are', 'was', 'were', 'be', 'been', 'it', 'its', 'this',
+            'that', 'these', 'those', 'i', 'you', 'he', 'she', 'we', 'they', 'me', 'him', 'her',
+            'us', 'them', 'my', 'your', 'his', 'our', 'their', 'from', 'up', 'out', 'so', 'not',
+            'no', 'do', 'does', 'did', 'have', 'has', 'had', 'will', 'would', 'can', 'could',
+            'should', 'all', 'any', 'some', 'just', 'than', 'then', 'there', 'here', 'too', 'very'
+        ))
+
+# Tabela de radicais pré-calculada (build-stem-table-script.py): o RSLP só é
+# carregado para palavras fora dela. Sem o arquivo, o RSLP responde tudo.
+STEM_TABLE_PATH = os.environ.get(
+    'STEM_TABLE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'stem_table.tsv')
+)
+
+def load_table_stemmer():
+    if not STEM_TABLE_PATH or not os.path.exists(STEM_TABLE_PATH):
+        return rslp_stemmer.get()
+    try:
+        stems, name = load_table(STEM_TABLE_PATH)
+    except StemTableError as e:
+        logger.error(f"{e}; usando o stemmer sem tabela")
+        return rslp_stemmer.get()
+    print(f"✅ Tabela de radicais carregada: {len(stems)} palavras ({name})")
+    return TableStemmer(stems, rslp_stemmer, name)
+
+rslp_stemmer = LazyResource(load_stemmer)
+stemmer = LazyResource(load_table_stemmer)
+stop_words = LazyResource(load_stop_words)
+english_stemmer = LazyResource(load_english_stemmer)
+english_stop_words = LazyResource(load_english_stop_words)
+
+if SERVERLESS:
+    use_bundled_data(NLTK_DATA_DIR)
+else:
+    # Servidor de longa duração: recursos baixados e carregados já na subida
+    download_nltk_resources()
+    for resource in (rslp_stemmer, stemmer, stop_words, english_stemmer, english_stop_words):
+        resource.get()
+
+# Limpeza do pré-processamento, na ordem em que é aplicada (o texto já está em minúsculas)
+PREPROCESS_SUBSTITUTIONS = (
+    (re.compile(r'http\S+'), ''),                              # URLs
+    (re.compile(r'www\.\S+'), ''),
+    (re.compile(r'\S+@\S+'), ''),                               # emails
+    (re.compile(r'\(?\d{2}\)?\s?\d{4,5}-?\d{4}'), ''),            # telefones
+    (re.compile(r'[^\w\s]'), ' '),                             # pontuação
+    (re.compile(r'\s+'), ' '),                                  # espaços extras
+)
+# Contrações que o word_tokenize do NLTK separa mesmo sem pontuação ("cannot" → "can not")
+TOKENIZER_CONTRACTIONS = re.compile(r'\b(can)(not)\b|\b(gim|lem)(me)\b|\b(gon)(na)\b|\b(got)(ta)\b|\b(wan)(na)(?=\s|$)')
+# Radicais memorizados por pipeline (pré-processamento do motor linear)
+STEM_CACHE_SIZE = int(os.environ.get('STEM_CACHE_SIZE', 50000))
+SENTENCE_END_RE = re.compile(r'[.!?]+')
+POLITENESS_WORDS = frozenset(('por favor', 'please', 'obrigado', 'thanks'))
+
+class LanguagePipeline:
+    """Tokenização, stop words, stemmer e palavras-chave de um idioma
+
+    As palavras-chave passam pelo mesmo stemmer dos tokens, então a contagem
+    em extract_features compara formas equivalentes. Stop words e stemmer são
+    LazyResources, e as palavras-chave (`keywords`: produtivas, improdutivas e de
+    urgência, como no arquivo de regras) só são reduzidas no primeiro uso ou em
+    warm(), que o recarregamento das regras chama antes de publicá-las.
+    """
+    
+    def __init__(self, language, tokenizer_language, stop_words, stemmer,
+                 productive_keywords, unproductive_keywords, urgency_words):
+        self.language = language
+        self.tokenizer_language = tokenizer_language
+        self._stop_words = stop_words
+        self._stemmer = stemmer
+        self.keywords = (productive_keywords, unproductive_keywords, urgency_words)
+        self._stems = {}
+        
+        # Primeira etapa da cascata: palavras inteiras no texto cru, sem NLP
+        self.quick_productive = self._word_regex(productive_keywords)
+        self.quick_unproductive = self._word_regex(unproductive_keywords)
+        self.quick_urgency = self._word_regex(urgency_words)
+    
+    @staticmethod
+    def _word_regex(words):
+        return re.compile(r'\b(?:' + _trie_pattern(sorted(set(words))) + r')\b')
+    
+    @property
+    def stop_words(self):
+        return self._stop_words.get()
     
-    for resource in resources:
+    @property
+    def stemmer(self):
+        return self._stemmer.get()
+    
+    @cached_property
+    def productive_keywords(self):
+        return frozenset(self.stem(word) for word in self.keywords[0])
+    
+    @cached_property
+    def unproductive_keywords(self):
+        return frozenset(self.stem(word) for word in self.keywords[1])
+    
+    @cached_property
+    def urgency_words(self):
+        return frozenset(self.stem(word) for word in self.keywords[2])
+    
+    @cached_property
+    def politeness_words(self):
+        # Forma original e reduzida: o Porter transforma "please" em "pleas"
+        return POLITENESS_WORDS | frozenset(self.stem(word) for word in POLITENESS_WORDS)
+    
+    def warm(self):
+        """Reduz as palavras-chave agora, fora do caminho das requisições"""
+        return self.productive_keywords, self.unproductive_keywords, self.urgency_words, self.politeness_words
+    
+    def stem(self, word):
+        if self.stemmer is None:
+            return word
         try:
-            if resource == 'punkt':
-                nltk.data.find('tokenizers/punkt')
-            elif resource == 'stopwords':
-                nltk.data.find('corpora/stopwords')
-            elif resource == 'rslp':
-                nltk.data.find('stemmers/rslp')
-        except LookupError:
-            print(f"Baixando recurso NLTK: {resource}")
-            nltk.download(resource, quiet=True)
-
-# Download dos recursos
-download_nltk_resources()
-
-# Inicialização dos componentes NLP com tratamento de erro
-try:
-    stemmer = RSLPStemmer()
-    print("✅ Stemmer português (RSLP) carregado com sucesso")
-except Exception as e:
-    print(f"⚠️ Erro ao carregar stemmer português, usando alternativa: {e}")
-    # Fallback: usar stemmer básico ou sem stemming
-    stemmer = None
-
-try:
-    stop_words = set(stopwords.words('portuguese'))
-    print("✅ Stop words em português carregadas com sucesso")
-except Exception as e:
-    print(f"⚠️ Erro ao carregar stop words, usando lista básica: {e}")
-    # Lista básica de stop words em português
-    stop_words = {
-        'a', 'o', 'e', 'é', 'de', 'do', 'da', 'em', 'um', 'uma', 'para', 'com', 'não', 'na', 'no',
-        'se', 'que', 'por', 'mais', 'as', 'os', 'como', 'mas', 'foi', 'ao', 'ele', 'das', 'tem',
-        'à', 'seu', 'sua', 'ou', 'ser', 'quando', 'muito', 'há', 'nos', 'já', 'está', 'eu', 'também',
-        'só', 'pelo', 'pela', 'até', 'isso', 'ela', 'entre', 'era', 'depois', 'sem', 'mesmo', 'aos',
-        'ter', 'seus', 'suas', 'numa', 'pelos', 'pelas', 'esse', 'essa', 'num', 'nem', 'suas', 'meu',
-        'às', 'minha', 'têm', 'numa', 'pelos', 'pelas', 'foi', 'contra', 'sobre', 'durante', 'antes'
-    }
+            return self.stemmer.stem(word)
+        except Exception:
+            return word
+    
+    def cached_stem(self, word):
+        """stem() com memória: cada palavra passa pelo stemmer uma vez"""
+        stem = self._stems.get(word)
+        if stem is None:
+            stem = self.stem(word)
+            if len(self._stems) < STEM_CACHE_SIZE:
+                self._stems[word] = stem
+        return stem
+    
+    @staticmethod
+    def split_tokens(text):
+        """Os tokens do word_tokenize para um texto já sem pontuação, sem passar pelo NLTK"""
+        return TOKENIZER_CONTRACTIONS.sub(lambda m: ' '.join(filter(None, m.groups())), text).split()
+    
+    def tokenize(self, text):
+        try:
+            return word_tokenize(text, language=self.tokenizer_language)
+        except Exception:
+            # Fallback: split simples se word_tokenize falhar
+            return text.split()
 
-class EmailClassifier:
-    def __init__(self):
-        # Palavras-chave para classificação produtiva
-        self.productive_keywords = [
-            'urgente', 'problema', 'erro', 'bug', 'falha', 'suporte', 'ajuda', 
-            'dúvida', 'status', 'atualização', 'pendente', 'solicitação', 'requisição',
-            'preciso', 'necessário', 'importante', 'prazo', 'deadline', 'crítico',
-            'sistema', 'plataforma', 'aplicativo', 'site', 'login', 'senha',
-            'pagamento', 'cobrança', 'fatura', 'boleto', 'transferência',
-            'documento', 'relatório', 'aprovação', 'autorização', 'permissão',
-            'reunião', 'meeting', 'call', 'conferência', 'agendamento',
-            'proposta', 'contrato', 'acordo', 'negociação', 'orçamento',
-            'cliente', 'fornecedor', 'parceiro', 'projeto', 'entrega'
-        ]
+class RuleSet:
+    """Regras compiladas (palavras-chave, padrões, pipelines e respostas)
+
+    Imutável depois de montado: o classificador troca o conjunto inteiro por
+    referência, então cada classificação usa uma única versão das regras.
+    """
+    
+    def __init__(self, config, version='padrao'):
+        self.version = version
+        self.productive_keywords = tuple(config['productive_keywords'])
+        self.unproductive_keywords = tuple(config['unproductive_keywords'])
+        self.productive_patterns = tuple(config['productive_patterns'])
+        self.english_productive_keywords = tuple(config['english_productive_keywords'])
+        self.english_unproductive_keywords = tuple(config['english_unproductive_keywords'])
         
-        # Palavras-chave para classificação improdutiva
-        self.unproductive_keywords = [
-            'parabéns', 'felicitações', 'feliz', 'natal', 'ano novo', 'aniversário',
-            'birthday', 'obrigado', 'obrigada', 'agradecimento', 'thanks',
-            'festa', 'evento', 'comemoração', 'celebração', 'happy',
-            'bom dia', 'boa tarde', 'boa noite', 'cumprimento', 'saudação',
-            'coffee', 'café', 'almoço', 'jantar', 'happy hour', 'confraternização',
-            'feriado', 'férias', 'descanso', 'folga', 'licença',
-            'weather', 'tempo', 'clima', 'chuva', 'sol', 'frio', 'calor',
-            'piada', 'joke', 'humor', 'engraçado', 'funny', 'meme',
-            'corrente', 'chain', 'forward', 'repassar', 'viral'
-        ]
+        # Um pipeline por idioma, escolhido pelo detector na entrada
+        self.pipelines = {
+            'pt': LanguagePipeline(
+                'pt', 'portuguese', stop_words, stemmer,
+                self.productive_keywords, self.unproductive_keywords,
+                config['urgency_words']['pt']
+            ),
+            'en': LanguagePipeline(
+                'en', 'english', english_stop_words, english_stemmer,
+                self.english_productive_keywords, self.english_unproductive_keywords,
+                config['urgency_words']['en']
+            ),
+        }
+        self.compiled_patterns = tuple(re.compile(pattern, re.IGNORECASE) for pattern in self.productive_patterns)
+        self.tagger = IntentTagger(config['intent_tags'])
         
-        # Padrões regex para identificar características produtivas
-        self.productive_patterns = [
-            r'\b(como|when|onde|what|qual|quando|por que|why)\b',  # Perguntas
-            r'\b(please|por favor|kindly|gentileza)\b',  # Solicitações educadas
-            r'\b(deadline|prazo|until|até|before|antes)\b',  # Prazos
-            r'\b(asap|urgente|urgent|imediato|immediate)\b',  # Urgência
-            r'\b(anexo|attached|attachment|documento)\b',  # Anexos
-            r'\b(erro|error|issue|problema|trouble)\b',  # Problemas
-            r'\b(status|update|atualização|progress)\b'  # Status
-        ]
+        # Regras de resposta automática (do arquivo de regras, do arquivo
+        # RESPONSE_RULES_FILE ou padrão)
+        try:
+            if 'responses' in config:
+                self.response_selector = ResponseSelector(config['responses'])
+            else:
+                self.response_selector = load_response_rules(os.environ.get('RESPONSE_RULES_FILE'))
+        except ResponseRulesError as e:
+            raise RuleConfigError(f"'responses': {e}") from e
+        unknown_tags = sorted(self.response_selector.tags - set(self.tagger.tags))
+        if unknown_tags:
+            raise RuleConfigError(f"'responses': marca(s) desconhecida(s): {', '.join(unknown_tags)}")
+    
+    def warm(self):
+        """Reduz as palavras-chave de todos os idiomas (carrega os stemmers)"""
+        for pipeline in self.pipelines.values():
+            pipeline.warm()
+        return self
+    
+    def summary(self):
+        return {
+            'version': self.version,
+            'productive_keywords': len(self.productive_keywords),
+            'unproductive_keywords': len(self.unproductive_keywords),
+            'productive_patterns': len(self.productive_patterns),
+            'english_productive_keywords': len(self.english_productive_keywords),
+            'english_unproductive_keywords': len(self.english_unproductive_keywords),
+            'intent_tags': list(self.tagger.tags),
+        }
+
+class EmailClassifier:
+    def __init__(self, rules=None):
+        # Regras (palavras-chave, padrões e respostas); ver rule_config.py
+        self.rules = rules or RuleSet(*load_rule_config())
+        self.language_detector = LanguageDetector(default='pt')
+        
+        # Modo cascata: a primeira etapa decide sozinha quando a diferença de
+        # scores chega a CASCADE_MARGIN; os demais emails seguem o pipeline completo
+        self.cascade_margin = float(os.environ.get('CASCADE_MARGIN', 4))
+        if self.cascade_margin <= 0:
+            raise ValueError(f"CASCADE_MARGIN deve ser positivo (recebido {self.cascade_margin:g})")
+        self.cascade_exits = {'quick': 0, 'full': 0}
+    
+    def apply_rules(self, rules):
+        """Publica um novo conjunto de regras (troca atômica por referência)"""
+        self.rules = rules
+    
+    # Atalhos para as regras em uso (scripts de treino, corpus sintético)
+    @property
+    def productive_keywords(self):
+        return self.rules.productive_keywords
+    
+    @property
+    def unproductive_keywords(self):
+        return self.rules.unproductive_keywords
+    
+    @property
+    def productive_patterns(self):
+        return self.rules.productive_patterns
+    
+    @property
+    def english_productive_keywords(self):
+        return self.rules.english_productive_keywords
     
-    def preprocess_text(self, text):
+    @property
+    def english_unproductive_keywords(self):
+        return self.rules.english_unproductive_keywords
+    
+    @property
+    def pipelines(self):
+        return self.rules.pipelines
+    
+    @property
+    def compiled_patterns(self):
+        return self.rules.compiled_patterns
+    
+    @property
+    def response_selector(self):
+        return self.rules.response_selector
+    
+    def detect_language(self, text):
+        """Idioma do email ('pt' ou 'en')"""
+        return self.language_detector.detect(text)
+    
+    def preprocess_text(self, text, language=None, rules=None):
         """Pré-processamento do texto do email com tratamento de erro"""
+        return ' '.join(self.preprocess_tokens(text, language, rules))
+    
+    def preprocess_tokens(self, text, language=None, rules=None):
+        """Tokens do pré-processamento (minúsculas, limpeza, stop words e stemming)"""
         if not text:
-            return ""
-        
-        # Converter para minúsculas
-        text = text.lower()
-        
-        # Remover URLs
-        text = re.sub(r'http\S+', '', text)
-        text = re.sub(r'www\.\S+', '', text)
-        
-        # Remover emails
-        text = re.sub(r'\S+@\S+', '', text)
-        
-        # Remover números de telefone
-        text = re.sub(r'\(?\d{2}\)?\s?\d{4,5}-?\d{4}', '', text)
+            return []
         
-        # Remover pontuação excessiva
-        text = re.sub(r'[^\w\s]', ' ', text)
+        pipeline = (rules or self.rules).pipelines[language or self.detect_language(text)]
+        tokens = self.clean_tokens(text, pipeline)
         
-        # Remover espaços extras
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Tokenização com tratamento de erro
-        try:
-            tokens = word_tokenize(text, language='portuguese')
-        except Exception:
-            # Fallback: split simples se word_tokenize falhar
-            tokens = text.split()
-        
-        # Remover stop words
-        filtered_tokens = [word for word in tokens if word not in stop_words and len(word) > 2]
-        
-        # Aplicar stemming se disponível
-        if stemmer is not None:
+        # Remover stop words e aplicar stemming se disponível (sem lista intermediária)
+        stop_words = pipeline.stop_words
+        if pipeline.stemmer is not None:
             try:
-                stemmed_tokens = [stemmer.stem(word) for word in filtered_tokens]
-                return ' '.join(stemmed_tokens)
+                stem = pipeline.stemmer.stem
+                return [stem(word) for word in tokens if len(word) > 2 and word not in stop_words]
             except Exception:
                 # Se stemming falhar, retornar tokens filtrados
-                return ' '.join(filtered_tokens)
-        else:
-            return ' '.join(filtered_tokens)
+                pass
+        return [word for word in tokens if len(word) > 2 and word not in stop_words]
     
-    def extract_features(self, text):
-        """Extrai características do texto para classificação"""
-        features = {}
-        
-        preprocessed = self.preprocess_text(text)
-        
-        # Tokenização segura
-        try:
-            tokens = word_tokenize(preprocessed, language='portuguese')
-        except Exception:
-            tokens = preprocessed.split()
-        
-        # Features básicas
-        features['word_count'] = len(tokens)
-        features['char_count'] = len(text)
-        features['sentence_count'] = len(re.split(r'[.!?]+', text))
-        features['has_question'] = '?' in text
-        features['has_exclamation'] = '!' in text
-        
-        # Features de urgência
-        features['urgency_score'] = sum(1 for word in tokens if word in ['urgente', 'asap', 'imediato', 'crítico'])
+    def fast_preprocess(self, text, language=None, rules=None):
+        """O mesmo texto de preprocess_text, sem o tokenizador do NLTK (motor linear)
+
+        A limpeza já tira a pontuação, então o word_tokenize equivale a separar
+        por espaços (mais as contrações que ele divide); os radicais vêm da
+        memória do pipeline.
+        """
+        if not text:
+            return ''
+        pipeline = (rules or self.rules).pipelines[language or self.detect_language(text)]
+        text = text.lower()
+        for pattern, replacement in PREPROCESS_SUBSTITUTIONS:
+            text = pattern.sub(replacement, text)
+        stop_words = pipeline.stop_words
+        stem = pipeline.cached_stem
+        return ' '.join(stem(word) for word in pipeline.split_tokens(text) if len(word) > 2 and word not in stop_words)
+    
+    @staticmethod
+    def clean_tokens(text, pipeline):
+        """Tokens do texto em minúsculas, sem URLs, emails, telefones e pontuação"""
+        text = text.lower()
+        for pattern, replacement in PREPROCESS_SUBSTITUTIONS:
+            text = pattern.sub(replacement, text)
         
-        # Features de cortesia
-        features['politeness_score'] = sum(1 for word in tokens if word in ['por favor', 'please', 'obrigado', 'thanks'])
+        # Tokenização com tratamento de erro
+        return pipeline.tokenize(text)
+    
+    def extract_features(self, text, preprocessed=None, language=None, rules=None):
+        """Extrai características do texto para classificação
+
+        `preprocessed` (texto já pré-processado, ex.: pelo motor linear) evita
+        repetir o pré-processamento; os tokens são os do próprio pipeline.
+        """
+        rules = rules or self.rules
         
-        # Contagem de palavras-chave produtivas
-        features['productive_count'] = sum(1 for word in tokens if word in self.productive_keywords)
+        if language is None:
+            language = self.detect_language(text)
+        pipeline = rules.pipelines[language]
         
-        # Contagem de palavras-chave improdutivas
-        features['unproductive_count'] = sum(1 for word in tokens if word in self.unproductive_keywords)
+        if preprocessed is None:
+            tokens = self.preprocess_tokens(text, language, rules)
+        else:
+            tokens = preprocessed.split()
         
-        # Padrões regex
-        features['pattern_matches'] = sum(1 for pattern in self.productive_patterns if re.search(pattern, text, re.IGNORECASE))
+        urgency_words = pipeline.urgency_words
+        politeness_words = pipeline.politeness_words
+        productive_keywords = pipeline.productive_keywords
+        unproductive_keywords = pipeline.unproductive_keywords
+        urgency_score = politeness_score = productive_count = unproductive_count = 0
+        for word in tokens:
+            if word in urgency_words:
+                urgency_score += 1
+            if word in politeness_words:
+                politeness_score += 1
+            if word in productive_keywords:
+                productive_count += 1
+            if word in unproductive_keywords:
+                unproductive_count += 1
         
+        return EmailFeatures(
+            language=language,
+            word_count=len(tokens),
+            char_count=len(text),
+            sentence_count=sum(1 for _ in SENTENCE_END_RE.finditer(text)) + 1,
+            has_question='?' in text,
+            has_exclamation='!' in text,
+            urgency_score=urgency_score,
+            politeness_score=politeness_score,
+            productive_count=productive_count,
+            unproductive_count=unproductive_count,
+            pattern_matches=sum(1 for pattern in rules.compiled_patterns if pattern.search(text)),
+        )
+    
+    def refresh_raw_features(self, features, text, rules=None):
+        """Cópia de `features` com as medidas do texto cru recalculadas para `text`
+
+        Usada nos acertos de quase-duplicatas: as contagens sobre tokens
+        (palavras, palavras-chave, urgência, cortesia) vêm do email que formou o
+        cluster, sem tokenizar, remover stop words e reduzir de novo.
+        """
+        rules = rules or self.rules
+        features = features.copy()
+        features.char_count = len(text)
+        features.has_question = '?' in text
+        if features.has_exclamation is not None:
+            features.has_exclamation = '!' in text
+        if features.sentence_count is not None:
+            features.sentence_count = sum(1 for _ in SENTENCE_END_RE.finditer(text)) + 1
+        features.pattern_matches = sum(1 for pattern in rules.compiled_patterns if pattern.search(text))
         return features
     
-    def classify_email(self, text):
+    def classify_email(self, text, language=None, rules=None):
         """Classifica o email como Produtivo ou Improdutivo"""
-        features = self.extract_features(text)
+        features = self.extract_features(text, language=language, rules=rules)
         
         # Pontuação para classificação
         productive_score = 0
         unproductive_score = 0
         
         # Análise de palavras-chave
-        productive_score += features['productive_count'] * 2
-        unproductive_score += features['unproductive_count'] * 2
+        productive_score += features.productive_count * 2
+        unproductive_score += features.unproductive_count * 2
         
         # Análise de padrões
-        productive_score += features['pattern_matches'] * 1.5
+        productive_score += features.pattern_matches * 1.5
         
         # Análise de estrutura
-        if features['has_question']:
+        if features.has_question:
             productive_score += 1
         
-        if features['urgency_score'] > 0:
-            productive_score += features['urgency_score'] * 2
+        if features.urgency_score > 0:
+            productive_score += features.urgency_score * 2
         
         # Análise de tamanho (emails muito curtos tendem a ser improdutivos)
-        if features['word_count'] < 10:
+        if features.word_count < 10:
             unproductive_score += 1
-        elif features['word_count'] > 30:
+        elif features.word_count > 30:
             productive_score += 0.5
         
         # Análise de cortesia excessiva (pode indicar email improdutivo)
-        if features['politeness_score'] > 2:
+        if features.politeness_score > 2:
             unproductive_score += 0.5
         
         # Decisão final
@@ -230,7 +504,7 @@ class EmailClassifier:
         
         if total_score == 0:
             # Se não há indicadores claros, usar heurísticas adicionais
-            if features['word_count'] > 20 and (features['has_question'] or 'solicit' in text.lower()):
+            if features.word_count > 20 and (features.has_question or 'solicit' in text.lower()):
                 category = 'Produtivo'
                 confidence = 0.6
             else:
@@ -247,176 +521,516 @@ class EmailClassifier:
         
         return category, confidence, features
     
-    def generate_response(self, category, email_text):
-        """Gera resposta automática baseada na categoria"""
-        if category == 'Produtivo':
-            # Analisar tipo de solicitação para personalizar resposta
-            text_lower = email_text.lower()
-            
-            if any(word in text_lower for word in ['urgente', 'asap', 'crítico', 'imediato']):
-                response = """Prezado(a),
+    def quick_scores(self, text, language, rules=None):
+        """Primeira etapa da cascata: scores sobre o texto cru, sem tokenizar
 
-Recebemos sua solicitação urgente e nossa equipe já foi notificada. 
-Estamos priorizando seu atendimento e retornaremos em até 4 horas úteis.
+        Retorna (score produtivo, score improdutivo, features aproximadas).
+        """
+        rules = rules or self.rules
+        pipeline = rules.pipelines[language]
+        text_lower = text.lower()
+        
+        features = EmailFeatures(
+            language=language,
+            word_count=len(text.split()),
+            char_count=len(text),
+            has_question='?' in text,
+            productive_count=len(pipeline.quick_productive.findall(text_lower)),
+            unproductive_count=len(pipeline.quick_unproductive.findall(text_lower)),
+            urgency_score=len(pipeline.quick_urgency.findall(text_lower)),
+            pattern_matches=sum(1 for pattern in rules.compiled_patterns if pattern.search(text)),
+        )
+        
+        productive_score = (features.productive_count * 2 + features.pattern_matches * 1.5
+                            + features.urgency_score * 2 + (1 if features.has_question else 0))
+        unproductive_score = features.unproductive_count * 2
+        return productive_score, unproductive_score, features
+    
+    def classify_cascade(self, text, margin=None):
+        """Classificação em cascata: etapa rápida, pipeline completo só se ambíguo"""
+        margin = self.cascade_margin if margin is None else margin
+        rules = self.rules
+        language = self.detect_language(text)
+        productive_score, unproductive_score, features = self.quick_scores(text, language, rules)
+        total_score = productive_score + unproductive_score
+        
+        # Sem nenhum indicador no texto cru o email é ambíguo, qualquer que seja a margem
+        if total_score > 0 and abs(productive_score - unproductive_score) >= margin:
+            self.cascade_exits['quick'] += 1
+            category = 'Produtivo' if productive_score > unproductive_score else 'Improdutivo'
+            score_diff = abs(productive_score - unproductive_score) / total_score
+            confidence = min(0.95, max(0.5, max(productive_score, unproductive_score) / total_score + score_diff * 0.3))
+            features.cascade_stage = 1
+            return category, confidence, features
+        
+        self.cascade_exits['full'] += 1
+        category, confidence, features = self.classify_email(text, language, rules)
+        features.cascade_stage = 2
+        return category, confidence, features
+    
+    def tag_intents(self, text):
+        """Marcas de intenção do email em uma única varredura: {marca: [(início, fim), ...]}"""
+        return self.rules.tagger.tag(text)
+    
+    def generate_response(self, category, email_text, tags=None):
+        """Gera resposta automática baseada na categoria e nas marcas de intenção"""
+        if tags is None:
+            tags = self.tag_intents(email_text)
+        _, response = self.response_selector.select(category, email_text, tags=tags)
+        return response
 
-Para casos críticos, entre em contato pelo telefone (11) 9999-9999.
+# Inicializar o classificador
+# Regras do classificador: padrão ou arquivo RULES_FILE. Quando o arquivo muda
+# (verificado a cada RULES_RELOAD_INTERVAL segundos; 0 desliga) ou via
+# POST /admin/reload-rules, as regras são compiladas fora das requisições e
+# trocadas de uma vez; um arquivo inválido na inicialização impede a subida.
+RULES_FILE = os.environ.get('RULES_FILE')
+_rules_start = time.perf_counter()
+classifier = EmailClassifier(RuleSet(*load_rule_config(RULES_FILE)))
+if not SERVERLESS:
+    # No modo serverless a primeira classificação reduz as palavras-chave
+    classifier.rules.warm()
+logger.info(f"Regras {classifier.rules.version} carregadas em {(time.perf_counter() - _rules_start) * 1000:.1f} ms")
 
-Atenciosamente,
-Equipe de Suporte"""
-            
-            elif any(word in text_lower for word in ['erro', 'problema', 'bug', 'falha']):
-                response = """Prezado(a),
+def compile_rules(config, version):
+    """Monta as regras já com as palavras-chave reduzidas (na thread do recarregamento)"""
+    return RuleSet(config, version).warm()
 
-Agradecemos o relato do problema. Nossa equipe técnica irá investigar a questão reportada.
+def swap_rules(rules):
+    """Publica um novo conjunto de regras e esquece as classificações das regras antigas"""
+    classifier.apply_rules(rules)
+    near_duplicates.discard_predictions('rules')
+    near_duplicates.discard_predictions('cascade')
 
-Você receberá uma atualização sobre o andamento em até 24 horas úteis.
+rule_reloader = RuleReloader(
+    RULES_FILE, compile_rules, swap_rules,
+    interval=float(os.environ.get('RULES_RELOAD_INTERVAL', 2)),
+    version=classifier.rules.version
+)
 
-Caso precise de assistência adicional, estamos à disposição.
+# Motores de classificação: regras fixas, modelo linear treinado
+# (train-model-script.py) ou regras em cascata (etapa rápida sobre o texto
+# cru e pipeline completo só para emails ambíguos). O padrão da implantação vem de CLASSIFIER_ENGINE e
+# pode ser trocado por requisição com o parâmetro "engine".
+ENGINES = ('rules', 'linear', 'cascade')
+DEFAULT_ENGINE = os.environ.get('CLASSIFIER_ENGINE', 'rules')
+LINEAR_MODEL_PATH = os.environ.get(
+    'LINEAR_MODEL_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'linear_model.json')
+)
+# 'header': só a tabela de seções na carga e os CRC32 das seções em segundo plano
+MODEL_ARTIFACT_VERIFY = os.environ.get('MODEL_ARTIFACT_VERIFY', 'header')
+# Verdadeiro quando o artefato foi reprovado e não há JSON: "linear" passa a usar as regras
+linear_failover = False
 
-Atenciosamente,
-Equipe Técnica"""
-            
-            elif any(word in text_lower for word in ['status', 'andamento', 'atualização']):
-                response = """Prezado(a),
+def load_linear_engine(path):
+    """Carrega o modelo linear (JSON ou artefato binário via mmap), se existir"""
+    if not os.path.exists(path):
+        return None
+    try:
+        rss_before = rss_kb()
+        start = time.perf_counter()
+        if is_artifact(path):
+            engine = load_artifact_engine(path, classifier.fast_preprocess, verify=MODEL_ARTIFACT_VERIFY)
+            if MODEL_ARTIFACT_VERIFY == 'header':
+                engine.verifier = BackgroundVerifier(
+                    engine.artifact, lambda error: fail_over_linear_engine(engine, path, error))
+        else:
+            engine = LinearEngine.load(path, classifier.fast_preprocess)
+        load_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Modelo linear carregado de {path} ({engine.vectorizer.n_features} colunas) "
+                    f"em {load_ms:.1f} ms, RSS +{rss_kb() - rss_before} KB")
+        return engine
+    except LinearModelError as e:
+        logger.error(f"Erro ao carregar modelo linear: {e}")
+        return None
 
-Recebemos sua solicitação de atualização. 
-Nossa equipe irá verificar o status atual e retornará com as informações em breve.
+linear_engine = load_linear_engine(LINEAR_MODEL_PATH)
 
-Tempo previsto para resposta: até 12 horas úteis.
+def swap_linear_engine(engine):
+    """Publica um novo modelo linear (troca atômica da referência)"""
+    global linear_engine
+    linear_engine = engine
+    near_duplicates.discard_predictions('linear')
+    verify_linear_engine()
 
-Atenciosamente,
-Equipe de Atendimento"""
-            
-            else:
-                response = """Prezado(a),
+def verify_linear_engine():
+    """Inicia (ou retoma após o fork) a verificação em segundo plano do artefato em uso"""
+    verifier = getattr(linear_engine, 'verifier', None)
+    if verifier is not None:
+        verifier.ensure_started()
 
-Recebemos sua mensagem e nossa equipe está analisando sua solicitação.
+def fail_over_linear_engine(engine, path, error):
+    """Tira de uso um artefato reprovado na verificação: passa ao JSON ao lado ou às regras"""
+    global linear_failover
+    logger.error(f"Artefato {path} reprovado na verificação de checksums: {error}")
+    if linear_engine is not engine:
+        return
+    json_path = os.path.splitext(path)[0] + '.json'
+    fallback = load_linear_engine(json_path) if json_path != path and not is_artifact(json_path) else None
+    if fallback is None:
+        linear_failover = True
+        logger.warning('Motor "linear" desativado: as requisições passam a usar as regras')
+    else:
+        logger.warning(f"Motor linear passou a usar {json_path}")
+    swap_linear_engine(fallback)
 
-Retornaremos com uma resposta detalhada em até 24 horas úteis.
+verify_linear_engine()
 
-Caso seja urgente, entre em contato pelo telefone (11) 9999-9999.
+# Correções dos usuários (POST /feedback) incorporadas ao modelo linear em segundo plano
+feedback_learner = FeedbackLearner(
+    LINEAR_MODEL_PATH, classifier.fast_preprocess, load_linear_engine, swap_linear_engine,
+    merge_interval=float(os.environ.get('FEEDBACK_MERGE_INTERVAL', 5)),
+    max_pending=int(os.environ.get('FEEDBACK_MAX_PENDING', 10000)),
+    fold_records=int(os.environ.get('FEEDBACK_FOLD_RECORDS', 200)),
+)
 
-Atenciosamente,
-Equipe de Atendimento"""
-        
-        else:  # Improdutivo
-            text_lower = email_text.lower()
-            
-            if any(word in text_lower for word in ['parabéns', 'felicitações', 'feliz']):
-                response = """Muito obrigado pelas felicitações!
+# Campos disponíveis nas respostas de classificação (parâmetro "fields")
+RESULT_FIELDS = ('category', 'confidence', 'suggested_response', 'reasoning', 'features', 'tags', 'engine',
+                 'cluster', 'trimming', 'timestamp')
+FILE_RESULT_FIELDS = RESULT_FIELDS + ('file_info',)
+MAX_BATCH_SIZE = 1000
+CATEGORIES = ('Produtivo', 'Improdutivo')
 
-Ficamos muito felizes com sua mensagem. 
-Desejamos tudo de bom para você também!
+def parse_fields(raw_fields, allowed=RESULT_FIELDS):
+    """Interpreta o parâmetro "fields" (lista ou texto separado por vírgulas)
 
-Estamos sempre à disposição para qualquer necessidade.
+    Retorna (campos, erro). Sem o parâmetro, todos os campos são retornados.
+    """
+    if raw_fields is None or raw_fields == '':
+        return frozenset(allowed), None
+    if isinstance(raw_fields, str):
+        raw_fields = raw_fields.split(',')
+    if not isinstance(raw_fields, list) or not all(isinstance(f, str) for f in raw_fields):
+        return None, 'Campo "fields" deve ser uma lista ou texto separado por vírgulas'
+    fields = {f.strip() for f in raw_fields if f.strip()}
+    unknown = fields - set(allowed)
+    if unknown or not fields:
+        return None, f'Campos inválidos em "fields": {", ".join(sorted(unknown)) or "(vazio)"}. Use: {", ".join(allowed)}'
+    return frozenset(fields), None
 
-Com carinho,
-Equipe"""
-            
-            elif any(word in text_lower for word in ['obrigado', 'obrigada', 'agradecimento', 'thanks']):
-                response = """De nada! Foi um prazer ajudar.
+def parse_engine(raw_engine):
+    """Interpreta o parâmetro "engine"; retorna (motor, erro)"""
+    engine = raw_engine or DEFAULT_ENGINE
+    if engine not in ENGINES:
+        return None, f'Motor de classificação inválido: {engine}. Use: {", ".join(ENGINES)}'
+    if engine == 'linear' and linear_engine is None:
+        if linear_failover:
+            return 'rules', None
+        return None, 'Motor "linear" indisponível: nenhum modelo treinado foi carregado'
+    return engine, None
 
-Agradecemos pelo feedback positivo.
-Caso precise de algo mais, não hesite em nos contatar.
+def parse_category(raw_category):
+    """Valida a categoria correta informada em uma correção; retorna (categoria, erro)"""
+    if raw_category not in CATEGORIES:
+        return None, f'Campo "category" deve ser um de: {", ".join(CATEGORIES)}'
+    return raw_category, None
 
-Atenciosamente,
-Equipe de Atendimento"""
-            
-            elif any(word in text_lower for word in ['natal', 'ano novo', 'feriado']):
-                response = """Muito obrigado pelas felicitações de fim de ano!
+def needs_features(fields):
+    """Indica se os campos pedidos dependem do dicionário de features"""
+    return 'features' in fields or 'reasoning' in fields
 
-Desejamos a você e sua família um período repleto de alegria e prosperidade.
+def predict(email_text, engine, need_features=True):
+    """Classifica com o motor escolhido; retorna (categoria, confiança, features)
 
-Continuaremos trabalhando para oferecer o melhor atendimento em 2025.
+    No motor linear as features só são extraídas quando `need_features` é
+    verdadeiro, reaproveitando o texto já pré-processado.
+    """
+    if engine == 'linear':
+        category, confidence, preprocessed = linear_engine.predict(email_text)
+        features = classifier.extract_features(email_text, preprocessed) if need_features else None
+        return category, confidence, features
+    if engine == 'cascade':
+        return classifier.classify_cascade(email_text)
+    return classifier.classify_email(email_text)
 
-Feliz Ano Novo!
-Equipe"""
-            
-            else:
-                response = """Obrigado pelo contato!
+# Quase-duplicatas (correntes, mala direta) reaproveitam a classificação do cluster
+near_duplicates = NearDuplicateIndex(
+    threshold=float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.85)),
+    max_entries=int(os.environ.get('NEAR_DUPLICATE_MAX_ENTRIES', 10000)),
+    ttl=float(os.environ.get('NEAR_DUPLICATE_TTL', 3600)),
+)
 
-Sua mensagem é muito importante para nós.
-Caso precise de alguma assistência específica, não hesite em nos informar.
+# Histórico citado, avisos legais e assinaturas são cortados antes da classificação
+email_trimmer = EmailTrimmer(
+    head_chars=int(os.environ.get('TRIM_HEAD_CHARS', 4000)),
+    tail_chars=int(os.environ.get('TRIM_TAIL_CHARS', 1000)),
+    enabled=os.environ.get('TRIM_EMAILS', '1') != '0',
+)
 
-Estamos sempre à disposição.
+# Registro durável das classificações (SQLite WAL, gravado em lote em segundo
+# plano); CLASSIFICATION_STORE_PATH vazio desliga
+classification_store = ClassificationStore(
+    os.environ.get('CLASSIFICATION_STORE_PATH',
+                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'classifications.db')),
+    durability=os.environ.get('CLASSIFICATION_STORE_DURABILITY', 'normal'),
+    max_pending=int(os.environ.get('CLASSIFICATION_STORE_MAX_PENDING', 10000)),
+    batch_size=int(os.environ.get('CLASSIFICATION_STORE_BATCH_SIZE', 200)),
+    flush_interval=float(os.environ.get('CLASSIFICATION_STORE_FLUSH_INTERVAL', 1.0)),
+)
+atexit.register(classification_store.close)
 
-Atenciosamente,
-Equipe de Atendimento"""
-        
-        return response
+# Contadores compartilhados entre os workers (arquivo mapeado em memória) para o /stats
+shared_stats = SharedStats(os.environ.get('STATS_FILE') or None)
 
-# Inicializar o classificador
-classifier = EmailClassifier()
+def lookup_cluster(email_text, engine):
+    """Procura quase-duplicatas do texto
 
-def fetch_hotmail_emails(limit=5):
-    """Busca últimos emails do Hotmail via IMAP"""
-    try:
-        imap_server = "outlook.office365.com"
-        email_user = "andre_machado92@hotmail.com"
-        email_pass = os.environ.get("HOTMAIL_PASSWORD")  # use variável de ambiente
-
-        mail = imaplib.IMAP4_SSL(imap_server)
-        mail.login(email_user, email_pass)
-        mail.select("inbox")
-
-        # Buscar os últimos emails
-        status, messages = mail.search(None, "ALL")
-        email_ids = messages[0].split()
-        latest_ids = email_ids[-limit:]
-
-        email_list = []
-        for num in reversed(latest_ids):
-            status, data = mail.fetch(num, "(RFC822)")
-            msg = email.message_from_bytes(data[0][1])
-
-            subject, encoding = decode_header(msg["Subject"])[0]
-            if isinstance(subject, bytes):
-                subject = subject.decode(encoding or "utf-8")
-
-            from_ = msg.get("From")
-
-            # Pegar corpo
-            body = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        try:
-                            body = part.get_payload(decode=True).decode()
-                            break
-                        except:
-                            continue
-            else:
-                try:
-                    body = msg.get_payload(decode=True).decode()
-                except:
-                    body = msg.get_payload()
+    Retorna (impressão, cluster, similaridade, predição do cluster para o
+    motor pedido); os campos ficam None quando não há cluster ou predição.
+    """
+    if not near_duplicates.enabled:
+        return None, None, None, None
+    fingerprint = near_duplicates.fingerprint(email_text)
+    if fingerprint is None:
+        return None, None, None, None
+    cluster, similarity = near_duplicates.match(fingerprint)
+    if cluster is None:
+        return fingerprint, None, None, None
+    return fingerprint, cluster, similarity, cluster.predictions.get(engine)
 
-            email_list.append({
-                "from": from_,
-                "subject": subject,
-                "body": body
-            })
+def classify_clustered(email_text, engine, need_features, prediction=None, lookup=None):
+    """Classifica reaproveitando o cluster de quase-duplicatas; retorna (predição, cluster)
 
-        mail.logout()
-        return email_list
+    Em um acerto o pipeline de classificação não roda: categoria, confiança e
+    as contagens sobre tokens vêm do cluster, e só as medidas do texto cru
+    (tamanho, pontuação, padrões) são recalculadas, se as features forem pedidas.
+    """
+    fingerprint, cluster, similarity, cached = lookup or lookup_cluster(email_text, engine)
+    if fingerprint is None:
+        return prediction or predict(email_text, engine, need_features), None
+    
+    shared_stats.record_cache(cached is not None)
+    if cached is not None:
+        category, confidence, features = cached
+        if not need_features:
+            features = None
+        elif features is None:
+            # Quem formou o cluster não pediu features: extrai uma vez e guarda
+            features = classifier.extract_features(email_text)
+            cluster.predictions[engine] = (category, confidence, features)
+        else:
+            features = classifier.refresh_raw_features(features, email_text)
+        prediction = (category, confidence, features)
+    else:
+        if prediction is None:
+            prediction = predict(email_text, engine, need_features)
+        if cluster is None:
+            cluster, similarity = near_duplicates.add(fingerprint), None
+        cluster.predictions.setdefault(engine, prediction)
+    
+    return prediction, {
+        'id': cluster.cluster_id,
+        'duplicate': similarity is not None,
+        'similarity': round(similarity, 3) if similarity is not None else None,
+        'size': cluster.size
+    }
+
+def build_classification_result(email_text, fields, engine='rules', prediction=None, lookup=None, trim=None,
+                                source='classify'):
+    """Classifica o texto e monta apenas os campos pedidos
 
+    Resposta sugerida, raciocínio e detalhes das features só são calculados
+    quando fazem parte de `fields`. O texto passa antes pelo corte de histórico
+    citado, avisos e assinatura (`trim`, se já foi feito pelo chamador). A
+    classificação vai para o registro durável com a origem `source`.
+    """
+    start = time.perf_counter()
+    original_text = email_text
+    if trim is None:
+        trim = email_trimmer.trim(email_text)
+    email_text = trim.text
+    
+    prediction, cluster = classify_clustered(email_text, engine, needs_features(fields), prediction, lookup)
+    category, confidence, features = prediction
+    classification_store.record(original_text, category, confidence, features,
+                                (time.perf_counter() - start) * 1000, source, engine)
+    shared_stats.record_classification(category, confidence)
+    
+    # Marcas de intenção: uma varredura serve resposta, raciocínio e o campo "tags"
+    tags = None
+    if 'tags' in fields or 'suggested_response' in fields or 'reasoning' in fields:
+        tags = classifier.tag_intents(email_text)
+    
+    result = {}
+    if 'category' in fields:
+        result['category'] = category
+    if 'confidence' in fields:
+        result['confidence'] = round(confidence, 3)
+    if 'suggested_response' in fields:
+        result['suggested_response'] = classifier.generate_response(category, email_text, tags)
+    if 'reasoning' in fields:
+        result['reasoning'] = generate_reasoning(category, features, tags)
+    if 'features' in fields:
+        result['features'] = {
+            'word_count': features['word_count'],
+            'char_count': features['char_count'],
+            'productive_keywords': features['productive_count'],
+            'unproductive_keywords': features['unproductive_count'],
+            'has_question': features['has_question'],
+            'urgency_indicators': features['urgency_score'],
+            'language': features['language']
+        }
+    if 'tags' in fields:
+        result['tags'] = summarize_tags(tags)
+    if 'engine' in fields:
+        result['engine'] = engine
+    if 'cluster' in fields:
+        result['cluster'] = cluster
+    if 'trimming' in fields:
+        result['trimming'] = trim.summary()
+    if 'timestamp' in fields:
+        result['timestamp'] = datetime.now().isoformat()
+    
+    return category, confidence, result
+
+# Conta usada pelo /fetch-emails e pelos jobs 'mailbox'. O mail_fetcher (e o
+# imaplib) só é importado quando uma caixa é lida.
+def default_mail_account():
+    from mail_fetcher import MailAccount
+    
+    return MailAccount('hotmail', 'outlook.office365.com', 'andre_machado92@hotmail.com',
+                       password_env='HOTMAIL_PASSWORD')  # use variável de ambiente
+
+def fetch_hotmail_emails(limit=5):
+    """Busca últimos emails do Hotmail via IMAP"""
+    try:
+        from attachments import iter_attachments
+        from mail_fetcher import fetch_latest
+        
+        return [
+            {'from': message['from'], 'subject': message['subject'], 'body': message['body'],
+             'attachments': [filename for filename, _, _ in iter_attachments(message['message'])]}
+            for message in fetch_latest(default_mail_account(), limit)
+        ]
+    
     except Exception as e:
         logger.error(f"Erro ao buscar emails: {e}")
         return []
 
 
-def extract_text_from_pdf(pdf_file):
-    """Extrai texto de arquivo PDF"""
+def extract_text_from_pdf(pdf_file, deadline=None):
+    """Extrai texto de arquivo PDF
+
+    Com `deadline` (instante de time.monotonic()), para entre as páginas
+    quando o prazo passa e retorna o texto extraído até ali.
+    """
     try:
+        import PyPDF2  # só quando um PDF chega (cold start do modo serverless)
+        
         pdf_reader = PyPDF2.PdfReader(pdf_file)
         text = ""
         for page in pdf_reader.pages:
+            if deadline is not None and time.monotonic() > deadline:
+                break
             text += page.extract_text()
         return text
     except Exception as e:
         logger.error(f"Erro ao extrair texto do PDF: {str(e)}")
         return None
 
+ALLOWED_FILE_EXTENSIONS = ('.txt', '.pdf')
+
+def check_file_extension(filename):
+    """Mensagem de erro se a extensão do arquivo não for suportada, senão None"""
+    if os.path.splitext(filename)[1].lower() not in ALLOWED_FILE_EXTENSIONS:
+        return f'Tipo de arquivo não suportado. Use: {", ".join(ALLOWED_FILE_EXTENSIONS)}'
+    return None
+
+def extract_file_text(filename, raw):
+    """Extrai o texto de um arquivo .txt ou .pdf; retorna (texto, erro)"""
+    if os.path.splitext(filename)[1].lower() == '.pdf':
+        email_text = extract_text_from_pdf(io.BytesIO(raw))
+        if email_text is None:
+            return None, 'Erro ao extrair texto do PDF'
+    else:
+        email_text = raw.decode('utf-8')
+    
+    if not email_text.strip():
+        return None, 'Arquivo está vazio ou não contém texto legível'
+    return email_text, None
+
+def file_info(filename, email_text):
+    return {
+        'filename': filename,
+        'type': os.path.splitext(filename)[1].lower(),
+        'size': len(email_text)
+    }
+
+# Anexos PDF/.txt das mensagens das caixas de email (opcional): extraídos em um
+# pool de threads com cache por hash do conteúdo e classificados com peso próprio
+ATTACHMENT_WEIGHT = float(os.environ.get('ATTACHMENT_WEIGHT', 0.3))
+NO_CLUSTER = (None, None, None, None)
+
+def load_attachment_extractor():
+    if os.environ.get('ATTACHMENTS', '0') != '1':
+        return None
+    from attachments import AttachmentExtractor
+    
+    return AttachmentExtractor(
+        extract_text_from_pdf,
+        workers=int(os.environ.get('ATTACHMENT_WORKERS', 2)),
+        max_bytes=int(os.environ.get('ATTACHMENT_MAX_BYTES', 5 * 1024 * 1024)),
+        timeout=float(os.environ.get('ATTACHMENT_TIMEOUT', 10)),
+        max_chars=int(os.environ.get('ATTACHMENT_MAX_CHARS', 20000)),
+        cache_size=int(os.environ.get('ATTACHMENT_CACHE_SIZE', 512)),
+    )
+
+attachment_extractor = load_attachment_extractor()
+
+def productive_probability(category, confidence):
+    return confidence if category == 'Produtivo' else 1 - confidence
+
+def blend_predictions(body_prediction, attachment_prediction, weight):
+    """Combina as predições do corpo e dos anexos pela probabilidade de "Produtivo"
+
+    Os anexos contam com peso `weight` (0 a 1); as features são as do corpo.
+    """
+    probability = ((1 - weight) * productive_probability(*body_prediction[:2])
+                   + weight * productive_probability(*attachment_prediction[:2]))
+    category = 'Produtivo' if probability >= 0.5 else 'Improdutivo'
+    return category, max(probability, 1 - probability), body_prediction[2]
+
+def classify_email_message(body, message, fields, engine, source):
+    """Classifica um email lido da caixa: o corpo e, se habilitado, os anexos
+
+    Sem anexos com texto o corpo segue o caminho normal. Com anexos, corpo e
+    anexos são classificados separadamente e combinados com peso
+    ATTACHMENT_WEIGHT (só os anexos, se o corpo estiver vazio). Retorna o
+    resultado ou None se não houver texto nenhum.
+    """
+    attachments = []
+    if attachment_extractor is not None and message is not None:
+        from attachments import iter_attachments
+        
+        attachments = attachment_extractor.extract(iter_attachments(message))
+    attachment_text = '\n\n'.join(a['text'] for a in attachments if a['text'])
+    
+    if not attachment_text:
+        if not body:
+            return None
+        _, _, result = build_classification_result(body, fields, engine, source=source)
+    else:
+        attachment_prediction = predict(attachment_text, engine, need_features=not body)
+        if body:
+            trim = email_trimmer.trim(body)
+            body_prediction = predict(trim.text, engine, needs_features(fields))
+            weight = ATTACHMENT_WEIGHT
+        else:
+            trim, body_prediction, weight = None, attachment_prediction, 1.0
+        prediction = blend_predictions(body_prediction, attachment_prediction, weight)
+        _, _, result = build_classification_result(body or attachment_text, fields, engine, prediction=prediction,
+                                                   lookup=NO_CLUSTER, trim=trim, source=source)
+        result['attachment_classification'] = {
+            'category': attachment_prediction[0],
+            'confidence': round(attachment_prediction[1], 3),
+            'weight': weight,
+        }
+    
+    if attachments:
+        result['attachments'] = [{key: value for key, value in a.items() if key != 'text'} for a in attachments]
+    return result
+
 @app.route('/fetch-emails', methods=['GET'])
 def fetch_emails():
     """Endpoint para buscar emails reais do Hotmail"""
@@ -434,6 +1048,13 @@ def index():
     <ul>
         <li><strong>POST /classify</strong> - Classifica email via texto direto</li>
         <li><strong>POST /classify-file</strong> - Classifica email via upload de arquivo</li>
+        <li><strong>POST /classify-batch</strong> - Classifica uma lista de textos</li>
+        <li><strong>POST /feedback</strong> - Corrige a categoria de um email (aprendizado online)</li>
+        <li><strong>POST /jobs</strong> - Enfileira uma classificação pesada (texto, arquivo ou caixa de entrada)</li>
+        <li><strong>GET /jobs/&lt;id&gt;</strong> - Status, progresso e resultado de um job</li>
+        <li><strong>GET /mailboxes/recent</strong> - Últimos emails classificados pela leitura das caixas</li>
+        <li><strong>GET /mailboxes/events</strong> - Stream SSE dos emails classificados conforme chegam</li>
+        <li><strong>GET /store/export</strong> - Exporta o registro de classificações (CSV, JSONL, Parquet, Arrow; requer X-Admin-Token)</li>
         <li><strong>GET /health</strong> - Verifica status da API</li>
         <li><strong>GET /stats</strong> - Estatísticas de uso</li>
     </ul>
@@ -473,30 +1094,16 @@ def classify_text():
                 'error': 'Texto do email não pode estar vazio'
             }), 400
         
-        # Classificar email
-        category, confidence, features = classifier.classify_email(email_text)
-        
-        # Gerar resposta automática
-        suggested_response = classifier.generate_response(category, email_text)
-        
-        # Gerar explicação do raciocínio
-        reasoning = generate_reasoning(category, features, email_text)
+        fields, error = parse_fields(data.get('fields', request.args.get('fields')))
+        if not error:
+            engine, error = parse_engine(data.get('engine', request.args.get('engine')))
+        if error:
+            return jsonify({
+                'error': error
+            }), 400
         
-        result = {
-            'category': category,
-            'confidence': round(confidence, 3),
-            'suggested_response': suggested_response,
-            'reasoning': reasoning,
-            'features': {
-                'word_count': features['word_count'],
-                'char_count': features['char_count'],
-                'productive_keywords': features['productive_count'],
-                'unproductive_keywords': features['unproductive_count'],
-                'has_question': features['has_question'],
-                'urgency_indicators': features['urgency_score']
-            },
-            'timestamp': datetime.now().isoformat()
-        }
+        # Classificar email (apenas os campos pedidos são calculados)
+        category, confidence, result = build_classification_result(email_text, fields, engine)
         
         logger.info(f"Email classificado como: {category} (confiança: {confidence:.3f})")
         
@@ -524,55 +1131,33 @@ def classify_file():
                 'error': 'Nenhum arquivo selecionado'
             }), 400
         
-        # Verificar extensão do arquivo
-        allowed_extensions = {'.txt', '.pdf'}
-        file_extension = os.path.splitext(file.filename)[1].lower()
+        fields, error = parse_fields(request.form.get('fields', request.args.get('fields')), FILE_RESULT_FIELDS)
+        if not error:
+            engine, error = parse_engine(request.form.get('engine', request.args.get('engine')))
+        if error:
+            return jsonify({
+                'error': error
+            }), 400
         
-        if file_extension not in allowed_extensions:
+        error = check_file_extension(file.filename)
+        if error:
             return jsonify({
-                'error': f'Tipo de arquivo não suportado. Use: {", ".join(allowed_extensions)}'
+                'error': error
             }), 400
         
         # Extrair texto do arquivo
-        if file_extension == '.txt':
-            email_text = file.read().decode('utf-8')
-        elif file_extension == '.pdf':
-            email_text = extract_text_from_pdf(io.BytesIO(file.read()))
-            if email_text is None:
-                return jsonify({
-                    'error': 'Erro ao extrair texto do PDF'
-                }), 400
-        
-        if not email_text.strip():
+        email_text, error = extract_file_text(file.filename, file.read())
+        if error:
             return jsonify({
-                'error': 'Arquivo está vazio ou não contém texto legível'
+                'error': error
             }), 400
         
         # Classificar email (reutilizando a lógica do endpoint de texto)
-        category, confidence, features = classifier.classify_email(email_text)
-        suggested_response = classifier.generate_response(category, email_text)
-        reasoning = generate_reasoning(category, features, email_text)
+        category, confidence, result = build_classification_result(email_text, fields, engine,
+                                                                   source='classify-file')
         
-        result = {
-            'category': category,
-            'confidence': round(confidence, 3),
-            'suggested_response': suggested_response,
-            'reasoning': reasoning,
-            'file_info': {
-                'filename': file.filename,
-                'type': file_extension,
-                'size': len(email_text)
-            },
-            'features': {
-                'word_count': features['word_count'],
-                'char_count': features['char_count'],
-                'productive_keywords': features['productive_count'],
-                'unproductive_keywords': features['unproductive_count'],
-                'has_question': features['has_question'],
-                'urgency_indicators': features['urgency_score']
-            },
-            'timestamp': datetime.now().isoformat()
-        }
+        if 'file_info' in fields:
+            result['file_info'] = file_info(file.filename, email_text)
         
         logger.info(f"Arquivo {file.filename} classificado como: {category}")
         
@@ -584,7 +1169,598 @@ def classify_file():
             'error': 'Erro interno do servidor'
         }), 500
 
-def generate_reasoning(category, features, email_text):
+@app.route('/classify-batch', methods=['POST'])
+def classify_batch():
+    """Endpoint para classificação de vários textos em uma requisição"""
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('texts'), list):
+            return jsonify({
+                'error': 'Campo "texts" (lista de textos) é obrigatório'
+            }), 400
+        
+        texts = data['texts']
+        if len(texts) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'Máximo de {MAX_BATCH_SIZE} textos por requisição'
+            }), 400
+        
+        fields, error = parse_fields(data.get('fields', request.args.get('fields')))
+        if not error:
+            engine, error = parse_engine(data.get('engine', request.args.get('engine')))
+        if error:
+            return jsonify({
+                'error': error
+            }), 400
+        
+        email_texts = [text.strip() if isinstance(text, str) else '' for text in texts]
+        trims = [email_trimmer.trim(text) if text else None for text in email_texts]
+        
+        # Quase-duplicatas reaproveitam o cluster; no motor linear as demais
+        # viram uma matriz CSR e um único produto matriz-vetor
+        lookups = [lookup_cluster(trim.text, engine) if trim else None for trim in trims]
+        predictions = iter(())
+        if engine == 'linear':
+            need_features = needs_features(fields)
+            misses = [trim.text for trim, lookup in zip(trims, lookups) if trim and lookup[3] is None]
+            # Features extraídas uma a uma, conforme cada resultado é montado
+            predictions = (
+                (category, confidence,
+                 classifier.extract_features(text, preprocessed) if need_features else None)
+                for text, (category, confidence, preprocessed)
+                in zip(misses, linear_engine.predict_batch(misses))
+            )
+        
+        results = []
+        for email_text, trim, lookup in zip(email_texts, trims, lookups):
+            if not email_text:
+                results.append({'error': 'Texto do email não pode estar vazio'})
+                continue
+            prediction = next(predictions, None) if lookup[3] is None else None
+            _, _, result = build_classification_result(email_text, fields, engine, prediction, lookup, trim,
+                                                       source='classify-batch')
+            results.append(result)
+        
+        logger.info(f"Lote de {len(texts)} email(s) classificado")
+        
+        return jsonify({
+            'count': len(results),
+            'results': results
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro na classificação em lote: {str(e)}")
+        return jsonify({
+            'error': 'Erro interno do servidor'
+        }), 500
+
+@app.route('/cascade/stats')
+def cascade_stats():
+    """Saídas por etapa do modo cascata neste worker"""
+    exits = dict(classifier.cascade_exits)
+    total = sum(exits.values())
+    return jsonify({
+        'margin': classifier.cascade_margin,
+        'exits': exits,
+        'quick_exit_ratio': round(exits['quick'] / total, 4) if total else None
+    })
+
+@app.before_request
+def start_feedback_merge():
+    """Mantém a thread de merge ativa em cada worker para recarregar o modelo"""
+    if linear_engine is not None:
+        feedback_learner.ensure_started()
+
+@app.before_request
+def start_artifact_verification():
+    """Conclui em cada worker a verificação dos checksums do artefato iniciada antes do fork"""
+    verify_linear_engine()
+
+@app.before_request
+def start_rules_reload():
+    """Mantém a verificação do arquivo de regras ativa em cada worker"""
+    rule_reloader.ensure_started()
+
+def check_admin_token():
+    """Erro (resposta, status) se o token administrativo não confere, senão None"""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({
+            'error': 'Endpoints administrativos desabilitados (defina ADMIN_TOKEN)'
+        }), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({
+            'error': 'Token administrativo inválido'
+        }), 401
+    return None
+
+@app.route('/admin/reload-rules', methods=['POST'])
+def reload_rules():
+    """Endpoint para recarregar as regras do arquivo RULES_FILE neste worker"""
+    try:
+        error = check_admin_token()
+        if error:
+            return error
+        
+        if not RULES_FILE:
+            return jsonify({
+                'error': 'Nenhum arquivo de regras configurado (RULES_FILE)'
+            }), 400
+        
+        try:
+            rules = rule_reloader.reload()
+        except RuleConfigError as e:
+            return jsonify({
+                'error': str(e),
+                'version': rule_reloader.version
+            }), 400
+        
+        return jsonify({
+            'status': 'reloaded',
+            'pid': os.getpid(),
+            'reload_ms': round(rule_reloader.last_reload_ms, 3),
+            'rules': rules.summary()
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro ao recarregar regras: {str(e)}")
+        return jsonify({
+            'error': 'Erro interno do servidor'
+        }), 500
+
+@app.route('/admin/rules')
+def rules_status():
+    """Versão e tamanho das regras em uso neste worker"""
+    error = check_admin_token()
+    if error:
+        return error
+    status = rule_reloader.status()
+    status['pid'] = os.getpid()
+    status['rules'] = classifier.rules.summary()
+    return jsonify(status)
+
+@app.route('/feedback', methods=['POST'])
+def submit_feedback():
+    """Endpoint para correção de uma classificação pelo usuário"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'text' not in data or 'category' not in data:
+            return jsonify({
+                'error': 'Campos "text" e "category" são obrigatórios'
+            }), 400
+        
+        email_text = data['text'].strip() if isinstance(data['text'], str) else ''
+        if not email_text:
+            return jsonify({
+                'error': 'Texto do email não pode estar vazio'
+            }), 400
+        
+        category, error = parse_category(data['category'])
+        if not error and linear_engine is None:
+            error = 'Motor "linear" indisponível: nenhum modelo treinado foi carregado'
+        if error:
+            return jsonify({
+                'error': error
+            }), 400
+        
+        if not feedback_learner.submit(email_text, category):
+            return jsonify({
+                'error': 'Fila de correções cheia, tente novamente em instantes'
+            }), 503
+        
+        logger.info(f"Correção recebida: {category}")
+        
+        return jsonify({
+            'status': 'accepted',
+            'category': category,
+            'merge_interval': feedback_learner.merge_interval
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Erro ao registrar correção: {str(e)}")
+        return jsonify({
+            'error': 'Erro interno do servidor'
+        }), 500
+
+@app.route('/feedback/stats')
+def feedback_stats():
+    """Métricas do aprendizado online deste worker"""
+    return jsonify(feedback_learner.metrics())
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 5000))
+
+@app.route('/store/stats')
+def store_stats():
+    """Métricas do registro durável de classificações deste worker"""
+    return jsonify(classification_store.metrics())
+
+@app.route('/store/export')
+def store_export():
+    """Endpoint para exportar o registro de classificações em streaming
+
+    Parâmetros: format (csv, jsonl, parquet, arrow), since/until (datas ISO,
+    until exclusivo), category e batch_size (linhas por lote/row group).
+    """
+    try:
+        error = check_admin_token()
+        if error:
+            return error
+        
+        fmt = request.args.get('format', 'csv')
+        try:
+            batch_size = int(request.args.get('batch_size', EXPORT_BATCH_SIZE))
+        except ValueError:
+            batch_size = 0
+        category = request.args.get('category')
+        if category:
+            category, error = parse_category(category)
+            if error:
+                return jsonify({
+                    'error': error
+                }), 400
+        
+        # O que este worker ainda não gravou entra na exportação
+        classification_store.flush()
+        chunks = export_classifications(classification_store.path, fmt, request.args.get('since'),
+                                        request.args.get('until'), category, batch_size)
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        filename = f"classificacoes-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+    
+    except ExportError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Erro ao exportar classificações: {str(e)}")
+        return jsonify({
+            'error': 'Erro interno do servidor'
+        }), 500
+
+# Jobs assíncronos: PDFs grandes e sincronização da caixa de entrada rodam em
+# um pool de threads por worker, fora da requisição, a partir de uma fila SQLite.
+# No modo serverless a função congela entre requisições e não há threads de
+# fundo: /jobs fica desativado
+JOBS_ENABLED = not SERVERLESS
+JOBS_DISABLED_ERROR = 'Jobs assíncronos desativados no modo serverless'
+JOB_TYPES = ('text', 'file', 'mailbox')
+MAX_MAILBOX_JOB_LIMIT = 200
+job_queue = JobQueue(
+    os.environ.get('JOBS_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'jobs.db')),
+    visibility_timeout=float(os.environ.get('JOB_VISIBILITY_TIMEOUT', 300)),
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+)
+
+def run_text_job(payload, data, progress):
+    _, _, result = build_classification_result(payload['text'], frozenset(payload['fields']),
+                                               payload['engine'], source='job')
+    return result
+
+def run_file_job(payload, data, progress):
+    email_text, error = extract_file_text(payload['filename'], data)
+    if error:
+        raise JobError(error)
+    progress(0.5)
+    fields = frozenset(payload['fields'])
+    _, _, result = build_classification_result(email_text, fields, payload['engine'], source='job')
+    if 'file_info' in fields:
+        result['file_info'] = file_info(payload['filename'], email_text)
+    return result
+
+def run_mailbox_job(payload, data, progress):
+    from mail_fetcher import fetch_latest
+    
+    emails = fetch_latest(default_mail_account(), payload['limit'])
+    fields = frozenset(payload['fields'])
+    results = []
+    for position, message in enumerate(emails, 1):
+        body = message['body'].strip() if isinstance(message['body'], str) else ''
+        result = classify_email_message(body, message['message'], fields, payload['engine'], 'job')
+        if result is None:
+            result = {'error': 'Texto do email não pode estar vazio'}
+        result['email'] = {'from': message['from'], 'subject': message['subject']}
+        results.append(result)
+        progress(position / len(emails))
+    return {'count': len(results), 'results': results}
+
+job_pool = JobWorkerPool(
+    job_queue,
+    {'text': run_text_job, 'file': run_file_job, 'mailbox': run_mailbox_job},
+    workers=int(os.environ.get('JOB_WORKERS', 2)) if JOBS_ENABLED else 0,
+    poll_interval=float(os.environ.get('JOB_POLL_INTERVAL', 1.0)),
+)
+
+@app.before_request
+def start_job_workers():
+    """Mantém o pool de jobs ativo em cada worker"""
+    if JOBS_ENABLED:
+        job_pool.ensure_started()
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Endpoint para enfileirar uma classificação pesada; retorna o ID do job"""
+    if not JOBS_ENABLED:
+        return jsonify({
+            'error': JOBS_DISABLED_ERROR
+        }), 404
+    try:
+        data = request.form if request.files else (request.get_json(silent=True) or {})
+        job_type = data.get('type', 'file' if request.files else None)
+        if job_type not in JOB_TYPES:
+            return jsonify({
+                'error': f'Campo "type" deve ser um de: {", ".join(JOB_TYPES)}'
+            }), 400
+        
+        fields, error = parse_fields(data.get('fields', request.args.get('fields')),
+                                     FILE_RESULT_FIELDS if job_type == 'file' else RESULT_FIELDS)
+        if not error:
+            engine, error = parse_engine(data.get('engine', request.args.get('engine')))
+        if error:
+            return jsonify({
+                'error': error
+            }), 400
+        
+        payload = {'fields': sorted(fields), 'engine': engine}
+        raw = None
+        if job_type == 'text':
+            email_text = data['text'].strip() if isinstance(data.get('text'), str) else ''
+            if not email_text:
+                return jsonify({
+                    'error': 'Campo "text" é obrigatório e não pode estar vazio'
+                }), 400
+            payload['text'] = email_text
+        elif job_type == 'file':
+            file = request.files.get('file')
+            if file is None or file.filename == '':
+                return jsonify({
+                    'error': 'Arquivo não fornecido'
+                }), 400
+            error = check_file_extension(file.filename)
+            if error:
+                return jsonify({
+                    'error': error
+                }), 400
+            payload['filename'] = file.filename
+            raw = file.read()
+        else:
+            try:
+                limit = int(data.get('limit', 5))
+            except (TypeError, ValueError):
+                limit = 0
+            if not 1 <= limit <= MAX_MAILBOX_JOB_LIMIT:
+                return jsonify({
+                    'error': f'Campo "limit" deve estar entre 1 e {MAX_MAILBOX_JOB_LIMIT}'
+                }), 400
+            payload['limit'] = limit
+        
+        job_id = job_queue.enqueue(job_type, payload, raw)
+        job_pool.ensure_started()
+        logger.info(f"Job {job_id} ({job_type}) enfileirado")
+        
+        return jsonify({
+            'id': job_id,
+            'type': job_type,
+            'status': 'queued',
+            'url': f'/jobs/{job_id}'
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar job: {str(e)}")
+        return jsonify({
+            'error': 'Erro interno do servidor'
+        }), 500
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Endpoint para status, progresso e resultado de um job"""
+    if not JOBS_ENABLED:
+        return jsonify({
+            'error': JOBS_DISABLED_ERROR
+        }), 404
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({
+                'error': 'Job não encontrado'
+            }), 404
+        return jsonify(job)
+    
+    except Exception as e:
+        logger.error(f"Erro ao consultar job: {str(e)}")
+        return jsonify({
+            'error': 'Erro interno do servidor'
+        }), 500
+
+@app.route('/jobs/stats')
+def jobs_stats():
+    """Profundidade da fila, latência dos jobs e contadores do pool deste worker"""
+    if not JOBS_ENABLED:
+        return jsonify({
+            'error': JOBS_DISABLED_ERROR
+        }), 404
+    stats = job_queue.metrics()
+    stats['pool'] = job_pool.metrics()
+    return jsonify(stats)
+
+# Leitura de várias caixas de email (MAILBOX_ACCOUNTS_FILE): consulta periódica
+# (MAILBOX_MODE=poll) ou sessões IMAP IDLE (MAILBOX_MODE=idle). As mensagens novas
+# passam pelo mesmo pipeline de classificação, com origem 'mailbox', e viram
+# eventos do stream SSE /mailboxes/events
+MAILBOX_ACCOUNTS_FILE = os.environ.get('MAILBOX_ACCOUNTS_FILE')
+MAILBOX_MODES = ('poll', 'idle')
+MAILBOX_MODE = os.environ.get('MAILBOX_MODE', 'poll')
+MAILBOX_ENGINE = os.environ.get('MAILBOX_ENGINE', DEFAULT_ENGINE)
+MAILBOX_RESULT_FIELDS = frozenset(('category', 'confidence', 'suggested_response', 'tags', 'timestamp'))
+MAILBOX_LOCK_FILE = os.environ.get('MAILBOX_LOCK_FILE',
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'mailbox-poller.lock'))
+SSE_MAX_SECONDS = float(os.environ.get('SSE_MAX_SECONDS', 300))
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 0.5))
+# Cada stream ocupa uma thread do worker: o limite deixa threads para /classify.
+# No modo serverless o stream manteria a função rodando: fica desativado
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 2))
+SSE_ENABLED = not SERVERLESS
+sse_streams = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+event_log = EventLog(
+    os.environ.get('EVENTS_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'events.db')),
+    retention=int(os.environ.get('EVENTS_RETENTION', 1000)),
+)
+
+def classify_mailbox_message(account, uid, message):
+    body = message['body'].strip() if isinstance(message['body'], str) else ''
+    result = classify_email_message(body, message['message'], MAILBOX_RESULT_FIELDS, MAILBOX_ENGINE, 'mailbox')
+    if result is None:
+        return
+    result['email'] = {'account': account.name, 'uid': uid, 'from': message['from'],
+                       'subject': message['subject'], 'received_at': message['received_at']}
+    event_log.publish('classification', result)
+
+def load_mailbox_service(path, mode):
+    """Cria o poller ou o watcher IDLE das contas do arquivo
+
+    No modo idle sem arquivo a conta padrão (/fetch-emails) é observada.
+    Retorna None sem contas ou com configuração inválida.
+    """
+    if mode not in MAILBOX_MODES:
+        logger.error(f"MAILBOX_MODE inválido: {mode} (use {', '.join(MAILBOX_MODES)})")
+        return None
+    if not path and mode != 'idle':
+        return None
+    from mail_fetcher import MailboxConfigError, MailboxPoller, MailboxWatcher, load_accounts
+    
+    if path:
+        try:
+            accounts = load_accounts(path)
+        except MailboxConfigError as e:
+            logger.error(f"Erro ao carregar contas de email: {e}")
+            return None
+        logger.info(f"{len(accounts)} conta(s) de email carregada(s) de {path}")
+    else:
+        accounts = [default_mail_account()]
+    
+    if mode == 'idle':
+        return MailboxWatcher(
+            accounts, classify_mailbox_message,
+            idle_timeout=float(os.environ.get('MAILBOX_IDLE_TIMEOUT', 300)),
+            base_backoff=float(os.environ.get('MAILBOX_BACKOFF', 5)),
+            max_backoff=float(os.environ.get('MAILBOX_MAX_BACKOFF', 600)),
+            lock_path=MAILBOX_LOCK_FILE,
+        )
+    return MailboxPoller(
+        accounts, classify_mailbox_message,
+        max_connections=int(os.environ.get('MAILBOX_MAX_CONNECTIONS', 8)),
+        base_backoff=float(os.environ.get('MAILBOX_BACKOFF', 5)),
+        max_backoff=float(os.environ.get('MAILBOX_MAX_BACKOFF', 600)),
+        lock_path=MAILBOX_LOCK_FILE,
+    )
+
+mailbox_service = load_mailbox_service(MAILBOX_ACCOUNTS_FILE, MAILBOX_MODE)
+
+@app.before_request
+def start_mailbox_service():
+    """Mantém a leitura das caixas ativa (em um único worker, o que obtiver o lock)"""
+    if mailbox_service is not None:
+        mailbox_service.ensure_started()
+
+@app.route('/mailboxes/stats')
+def mailboxes_stats():
+    """Vazão, atraso, erros e recuo de cada conta lida"""
+    if mailbox_service is None:
+        return jsonify({
+            'error': 'Nenhuma caixa de email configurada (MAILBOX_ACCOUNTS_FILE ou MAILBOX_MODE=idle)'
+        }), 404
+    stats = mailbox_service.metrics()
+    stats['events'] = SSE_ENABLED
+    return jsonify(stats)
+
+@app.route('/stems/stats')
+def stems_stats():
+    """Acertos da tabela de radicais e palavras que caíram no stemmer (para regerar a tabela)"""
+    table_stemmer = stemmer.get()
+    if not isinstance(table_stemmer, TableStemmer):
+        return jsonify({
+            'error': 'Tabela de radicais não carregada (ver STEM_TABLE_PATH)'
+        }), 404
+    return jsonify(table_stemmer.metrics())
+
+@app.route('/attachments/stats')
+def attachments_stats():
+    """Cache e extrações de anexos deste worker"""
+    if attachment_extractor is None:
+        return jsonify({
+            'error': 'Processamento de anexos desligado (ATTACHMENTS=1 liga)'
+        }), 404
+    return jsonify(attachment_extractor.metrics())
+
+@app.route('/mailboxes/recent')
+def mailboxes_recent():
+    """Últimas mensagens classificadas pela leitura das caixas"""
+    try:
+        last_id = event_log.last_id()
+        events = event_log.since(max(0, last_id - 100), limit=100)
+        return jsonify({'results': [json.loads(payload) for _, kind, payload in reversed(events)
+                                    if kind == 'classification']})
+    
+    except Exception as e:
+        logger.error(f"Erro ao ler eventos: {str(e)}")
+        return jsonify({
+            'error': 'Erro interno do servidor'
+        }), 500
+
+@app.route('/mailboxes/events')
+def mailboxes_events():
+    """Stream SSE com cada email classificado pela leitura das caixas
+
+    Retoma a partir do cabeçalho Last-Event-ID (enviado pelo EventSource ao
+    reconectar) ou do parâmetro "last_id"; sem eles, só eventos novos. A
+    conexão é encerrada após SSE_MAX_SECONDS e o navegador reconecta sozinho.
+    Sem caixas configuradas ou no modo serverless responde 404; acima de
+    SSE_MAX_STREAMS conexões neste worker, 503.
+    """
+    if mailbox_service is None or not SSE_ENABLED:
+        return jsonify({
+            'error': 'Stream de eventos indisponível: nenhuma caixa de email configurada ou modo serverless'
+        }), 404
+    
+    raw_last_id = request.headers.get('Last-Event-ID', request.args.get('last_id'))
+    try:
+        last_id = int(raw_last_id) if raw_last_id not in (None, '') else event_log.last_id()
+    except ValueError:
+        return jsonify({
+            'error': 'Last-Event-ID deve ser um número inteiro'
+        }), 400
+    
+    def stream(last_id):
+        yield 'retry: 3000\n\n'
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            events = event_log.since(last_id)
+            for event_id, kind, payload in events:
+                yield f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+                last_id = event_id
+            if events:
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() - last_sent >= 15:
+                # Comentário SSE: mantém proxies e o navegador cientes da conexão
+                yield ': ping\n\n'
+                last_sent = time.monotonic()
+            time.sleep(SSE_POLL_INTERVAL)
+    
+    if not sse_streams.acquire(blocking=False):
+        return jsonify({
+            'error': 'Limite de streams de eventos atingido, tente novamente em instantes'
+        }), 503
+    response = Response(stream_with_context(stream(last_id)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Libera a vaga quando o servidor fecha a resposta (fim do stream ou cliente desconectado)
+    response.call_on_close(sse_streams.release)
+    return response
+
+def generate_reasoning(category, features, tags):
     """Gera explicação do raciocínio da classificação"""
     reasons = []
     
@@ -597,9 +1773,15 @@ def generate_reasoning(category, features, email_text):
     if features['has_question']:
         reasons.append("Contém pergunta(s), indicando necessidade de resposta")
     
-    if features['urgency_score'] > 0:
+    if features['urgency_score'] > 0 or 'urgency' in tags:
         reasons.append("Apresenta indicadores de urgência")
     
+    if 'problem' in tags:
+        reasons.append("Relata problema ou erro")
+    
+    if 'status' in tags:
+        reasons.append("Pede atualização de status ou andamento")
+    
     if features['pattern_matches'] > 0:
         reasons.append("Corresponde a padrões típicos de emails produtivos")
     
@@ -608,35 +1790,57 @@ def generate_reasoning(category, features, email_text):
     elif features['word_count'] > 30:
         reasons.append("Email detalhado, indicando solicitação formal")
     
-    # Análise contextual específica
-    text_lower = email_text.lower()
-    if any(word in text_lower for word in ['obrigado', 'obrigada', 'thanks']):
+    # Análise contextual específica (marcas de intenção)
+    if 'thanks' in tags:
         reasons.append("Contém agradecimentos")
     
-    if any(word in text_lower for word in ['parabéns', 'felicitações']):
+    if 'congratulations' in tags:
         reasons.append("Contém felicitações")
     
+    if 'greeting' in tags and len(tags) == 1:
+        reasons.append("Contém apenas saudação")
+    
     if not reasons:
         reasons.append("Classificação baseada na análise geral do conteúdo e estrutura")
     
     return "; ".join(reasons) + "."
 
+@app.after_request
+def count_request(response):
+    """Conta a requisição nos contadores compartilhados (por endpoint e status)
+
+    As consultas ao próprio /stats não entram, para o monitoramento não inflar
+    o tráfego nem invalidar o ETag.
+    """
+    if request.path != '/stats':
+        shared_stats.record_request(request.path.strip('/'), response.status_code)
+    return response
+
+# Parte fixa do /stats; os contadores vêm da memória compartilhada entre workers
+STATS_INFO = {
+    'api_version': '1.0.0',
+    'supported_formats': ['.txt', '.pdf'],
+    'classification_categories': ['Produtivo', 'Improdutivo'],
+    'features': {
+        'nlp_processing': True,
+        'keyword_analysis': True,
+        'pattern_matching': True,
+        'automatic_responses': True,
+        'field_selection': True,
+        'batch_classification': True
+    }
+}
+
 @app.route('/stats')
 def get_stats():
-    """Endpoint para estatísticas da API"""
-    return jsonify({
-        'api_version': '1.0.0',
-        'supported_formats': ['.txt', '.pdf'],
-        'classification_categories': ['Produtivo', 'Improdutivo'],
-        'features': {
-            'nlp_processing': True,
-            'keyword_analysis': True,
-            'pattern_matching': True,
-            'automatic_responses': True
-        },
-        'uptime': datetime.now().isoformat()
-    })
-
+    """Endpoint para estatísticas da API (todos os workers)"""
+    stats = shared_stats.snapshot()
+    stats['started_at'] = datetime.fromtimestamp(stats['started_at']).isoformat()
+    payload = json.dumps(dict(STATS_INFO, **stats)).encode('utf-8')
+    response = Response(payload, mimetype='application/json')
+    response.set_etag(hashlib.sha1(payload).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 if __name__ == '__main__':
     # Configuração para desenvolvimento
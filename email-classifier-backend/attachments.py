@@ -0,0 +1,205 @@
+"""
+Texto dos anexos (PDF e .txt) para a classificação
+Muitos emails produtivos dizem só "segue a fatura em anexo": o conteúdo está
+no PDF. Os anexos de uma mensagem são extraídos em paralelo por um pool de
+threads, cada um com limite de tamanho e de tempo. O texto extraído fica em
+um cache LRU indexado pelo SHA-256 do conteúdo, então o mesmo anexo enviado a
+muitas pessoas é lido uma vez; pedidos simultâneos do mesmo anexo esperam a
+mesma extração.
+
+O limite de tempo é cooperativo (verificado entre as páginas do PDF, que para
+com o texto lido até ali) e também vale para quem espera: passado o prazo, o
+anexo é dado como 'timeout' mesmo que a thread ainda esteja em uma página.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from email.header import decode_header, make_header
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_EXTENSIONS = ('.pdf', '.txt')
+CONTENT_TYPE_EXTENSIONS = {'application/pdf': '.pdf', 'text/plain': '.txt'}
+
+# Situação de cada anexo no resultado
+STATUSES = ('ok', 'cached', 'timeout', 'too_large', 'unsupported', 'empty', 'error')
+
+
+def iter_attachments(message):
+    """Anexos de uma mensagem (email.message.Message): [(nome, extensão, conteúdo)]"""
+    attachments = []
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        filename = part.get_filename()
+        if not filename:
+            continue
+        try:
+            filename = str(make_header(decode_header(filename)))
+        except Exception:
+            pass
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in ATTACHMENT_EXTENSIONS:
+            extension = CONTENT_TYPE_EXTENSIONS.get(part.get_content_type(), extension)
+        attachments.append((filename, extension, part.get_payload(decode=True) or b''))
+    return attachments
+
+
+class AttachmentExtractor:
+    """Extrai o texto dos anexos em paralelo, com cache por hash do conteúdo
+
+    `extract_pdf(arquivo, deadline)` é a extração de PDF do app; `deadline` é
+    um instante de time.monotonic() depois do qual ela deve parar.
+    """
+
+    def __init__(self, extract_pdf, workers=2, max_bytes=5 * 1024 * 1024, timeout=10.0,
+                 max_chars=20000, cache_size=512):
+        self.extract_pdf = extract_pdf
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+        self.hits = 0
+        self.misses = 0
+        self.extracted = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.errors = 0
+        self.extract_seconds = 0.0
+
+    def _pool(self):
+        # Threads não sobrevivem a fork: cada processo cria o seu pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='attachments')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def extract(self, attachments):
+        """Extrai o texto de [(nome, extensão, conteúdo)]
+
+        Retorna uma lista na mesma ordem com nome, tipo, tamanho, situação
+        (ver STATUSES), número de caracteres e o texto ('text', vazio quando
+        não há texto aproveitável).
+        """
+        results = []
+        pending = []
+        for filename, extension, raw in attachments:
+            info = {'filename': filename, 'type': extension, 'size': len(raw), 'status': None, 'text': ''}
+            results.append(info)
+            if extension not in ATTACHMENT_EXTENSIONS:
+                info['status'] = 'unsupported'
+            elif len(raw) > self.max_bytes:
+                info['status'] = 'too_large'
+                self.rejected += 1
+            else:
+                pending.append((info, self._submit(extension, raw)))
+
+        # Cada anexo tem `timeout` segundos a partir de quando uma thread o
+        # pega; os que esperam na fila ganham o tempo das rodadas anteriores
+        rounds = -(-len(pending) // self.workers) if pending else 0
+        deadline = time.monotonic() + self.timeout * rounds + 0.5
+        for info, (future, cached) in pending:
+            try:
+                status, text = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                status, text = 'timeout', ''
+            except Exception as e:
+                logger.warning(f"Erro ao extrair o anexo {info['filename']}: {e}")
+                status, text = 'error', ''
+            if status == 'timeout':
+                self.timeouts += 1
+            info['status'] = 'cached' if cached and status == 'ok' else status
+            info['text'] = text
+        for info in results:
+            info['chars'] = len(info['text'])
+        return results
+
+    def _submit(self, extension, raw):
+        """Retorna (future, veio do cache); extrações iguais em andamento são compartilhadas"""
+        key = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                future = _done_future(self._cache[key])
+                return future, True
+            future = self._inflight.get(key)
+            if future is not None:
+                self.hits += 1
+                return future, True
+            self.misses += 1
+            future = self._pool().submit(self._extract, key, extension, raw)
+            self._inflight[key] = future
+        return future, False
+
+    def _extract(self, key, extension, raw):
+        start = time.monotonic()
+        try:
+            if extension == '.pdf':
+                text = self.extract_pdf(io.BytesIO(raw), start + self.timeout)
+                if text is None:
+                    result = ('error', '')
+                else:
+                    timed_out = time.monotonic() > start + self.timeout
+                    result = ('timeout' if timed_out else 'ok', text)
+            else:
+                result = ('ok', raw.decode('utf-8', errors='replace'))
+            status, text = result
+            text = text.strip()[:self.max_chars]
+            if status == 'ok' and not text:
+                status = 'empty'
+            result = (status, text)
+            if status == 'error':
+                self.errors += 1
+            else:
+                self.extracted += 1
+        except Exception as e:
+            logger.warning(f"Erro ao extrair anexo: {e}")
+            self.errors += 1
+            result = ('error', '')
+        self.extract_seconds += time.monotonic() - start
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            # Um estouro de tempo pode ser carga momentânea: não fica no cache
+            if result[0] != 'timeout':
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def metrics(self):
+        """Cache, extrações e limites estourados deste worker"""
+        lookups = self.hits + self.misses
+        return {
+            'pid': os.getpid(),
+            'workers': self.workers,
+            'cached': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'extracted': self.extracted,
+            'timeouts': self.timeouts,
+            'too_large': self.rejected,
+            'errors': self.errors,
+            'avg_extract_ms': round(self.extract_seconds * 1000 / self.misses, 1) if self.misses else None,
+        }
+
+
+def _done_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Baseline de performance do pipeline de classificação
+Grava os tempos das funções críticas em um arquivo de baseline versionado e
+compara execuções futuras com ele, falhando (exit 1) em caso de regressão.
+O comando `allocations` mede a memória por email com tracemalloc.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from app import classifier, generate_reasoning  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, 'benchmarks', 'baseline.json')
+BASELINE_FORMAT_VERSION = 1
+
+BENCH_EMAILS = [
+    "Estou com problema urgente no sistema de login. Preciso de ajuda imediatamente!",
+    "Parabéns pela excelente apresentação! Foi muito inspiradora.",
+    "Boa tarde! Gostaria de saber o status do meu pedido #12345. Quando ficará pronto?",
+    "Muito obrigado pela ajuda de ontem. Vocês são fantásticos!",
+    "Feliz Natal para toda equipe! Que 2024 seja um ano próspero para todos.",
+    "Prezados, segue em anexo o relatório mensal com os indicadores do projeto. "
+    "Por favor, aprovem até sexta-feira, pois o prazo do contrato com o cliente vence "
+    "na próxima semana. Qualquer dúvida sobre o orçamento ou sobre a fatura pendente, "
+    "entrem em contato pelo telefone (11) 98765-4321 ou pelo site www.exemplo.com.br. " * 4,
+]
+
+# Valores críticos da distribuição t de Student (bicaudal, 95%) por graus de liberdade
+T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+    9: 2.262, 10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086, 25: 2.060, 30: 2.042,
+}
+
+
+def _bench_pipeline(text):
+    category, confidence, features = classifier.classify_email(text)
+    # Como em /classify: uma varredura de marcas serve resposta e raciocínio
+    tags = classifier.tag_intents(text)
+    classifier.generate_response(category, text, tags)
+    generate_reasoning(category, features, tags)
+
+
+def _prepare_reasoning_inputs():
+    """(categoria, confiança, features, marcas) de cada email"""
+    return {text: classifier.classify_email(text) + (classifier.tag_intents(text),) for text in BENCH_EMAILS}
+
+
+_CLASSIFIED = _prepare_reasoning_inputs()
+
+# Funções do caminho crítico medidas individualmente
+BENCHMARKS = {
+    'preprocess_text': classifier.preprocess_text,
+    'extract_features': classifier.extract_features,
+    'classify_email': classifier.classify_email,
+    'generate_response': lambda text: classifier.generate_response(_CLASSIFIED[text][0], text, _CLASSIFIED[text][3]),
+    'generate_reasoning': lambda text: generate_reasoning(_CLASSIFIED[text][0], _CLASSIFIED[text][2],
+                                                          _CLASSIFIED[text][3]),
+    'pipeline': _bench_pipeline,
+}
+
+
+def t_critical(df):
+    """Valor crítico t para intervalo de confiança de 95%"""
+    if df <= 0:
+        return float('inf')
+    for limit in sorted(T_CRITICAL_95):
+        if df <= limit:
+            return T_CRITICAL_95[limit]
+    return 1.96
+
+
+def measure(func, runs, iterations):
+    """Mede o tempo médio por email (µs) em várias execuções independentes"""
+    # Aquecimento (caches de regex, imports tardios, etc.)
+    for text in BENCH_EMAILS:
+        func(text)
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for text in BENCH_EMAILS:
+                func(text)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / (iterations * len(BENCH_EMAILS)) * 1e6)
+
+    mean = statistics.mean(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    half_width = t_critical(len(samples) - 1) * stdev / math.sqrt(len(samples))
+    return {
+        'mean_us': round(mean, 3),
+        'stdev_us': round(stdev, 3),
+        'ci95_low_us': round(mean - half_width, 3),
+        'ci95_high_us': round(mean + half_width, 3),
+        'samples_us': [round(s, 3) for s in samples],
+    }
+
+
+def run_benchmarks(names, runs, iterations):
+    """Executa os benchmarks selecionados"""
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name], runs, iterations)
+        r = results[name]
+        print(f"   {name:<20} {r['mean_us']:>10.1f} µs  ±{r['mean_us'] - r['ci95_low_us']:.1f}")
+    return results
+
+
+def measure_allocations(func, iterations):
+    """Memória por email (tracemalloc): pico durante a chamada e o que fica retido no resultado"""
+    for text in BENCH_EMAILS:
+        func(text)
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        results = []
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(iterations):
+            for text in BENCH_EMAILS:
+                tracemalloc.reset_peak()
+                current = tracemalloc.get_traced_memory()[0]
+                results.append(func(text))
+                peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_bytes': round(statistics.mean(peaks)),
+        'retained_bytes': round(retained / len(results)),
+    }
+
+
+def allocations(names, iterations):
+    """Imprime a memória por email das funções selecionadas"""
+    print(f"🧮 Memória por email ({iterations} iterações, tracemalloc)...")
+    print(f"\n{'Função':<20} {'Pico':>10} {'Retido':>10}")
+    for name in names:
+        r = measure_allocations(BENCHMARKS[name], iterations)
+        print(f"{name:<20} {r['peak_bytes']:>8,} B {r['retained_bytes']:>8,} B")
+
+
+def current_commit():
+    """Hash curto do commit atual"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def record(path, names, runs, iterations):
+    """Grava uma nova baseline"""
+    print(f"📏 Gravando baseline ({runs} execuções x {iterations} iterações)...")
+    results = run_benchmarks(names, runs, iterations)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': BASELINE_FORMAT_VERSION,
+            'recorded_at': datetime.now().isoformat(),
+            'commit': current_commit(),
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'config': {'runs': runs, 'iterations': iterations, 'emails': len(BENCH_EMAILS)},
+            'results': results,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"💾 Baseline salva em {path}")
+
+
+def compare(path, names, threshold):
+    """Compara a execução atual com a baseline; retorna o número de regressões
+
+    Uma função só é considerada regressão quando a média piora além do limite
+    *e* os intervalos de confiança não se sobrepõem, para não acusar ruído.
+    """
+    if not os.path.exists(path):
+        print(f"❌ Baseline não encontrada: {path} (rode com 'record' primeiro)")
+        return -1
+
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    if baseline.get('format_version') != BASELINE_FORMAT_VERSION:
+        print(f"❌ Versão de baseline incompatível: {baseline.get('format_version')} "
+              f"(esperado {BASELINE_FORMAT_VERSION}). Grave uma nova baseline.")
+        return -1
+
+    config = baseline['config']
+    print(f"📏 Comparando com baseline do commit {baseline['commit']} ({baseline['recorded_at'][:19]})")
+    if baseline.get('machine') != platform.platform():
+        print(f"⚠️ Baseline gravada em outra máquina ({baseline.get('machine')})")
+
+    names = [n for n in names if n in baseline['results']]
+    current = run_benchmarks(names, config['runs'], config['iterations'])
+
+    regressions = 0
+    print(f"\n{'Função':<20} {'Baseline µs':>12} {'Atual µs':>10} {'Variação':>9}  Status")
+    for name in names:
+        base = baseline['results'][name]
+        now = current[name]
+        change = (now['mean_us'] - base['mean_us']) / base['mean_us'] if base['mean_us'] else 0.0
+        significant = now['ci95_low_us'] > base['ci95_high_us'] or now['ci95_high_us'] < base['ci95_low_us']
+
+        if change > threshold and significant:
+            status = "❌ REGRESSÃO"
+            regressions += 1
+        elif change < -threshold and significant:
+            status = "🚀 melhora"
+        else:
+            status = "✅ ok"
+        print(f"{name:<20} {base['mean_us']:>12.1f} {now['mean_us']:>10.1f} {change * 100:>+8.1f}%  {status}")
+
+    return regressions
+
+
+def main():
+    """Função principal do script de baseline"""
+    parser = argparse.ArgumentParser(description="Baseline de performance do classificador")
+    parser.add_argument("command", choices=['record', 'compare', 'allocations'],
+                        help="Gravar ou comparar baseline, ou medir a memória por email")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Arquivo de baseline")
+    parser.add_argument("--runs", type=int, default=10, help="Execuções independentes (record)")
+    parser.add_argument("--iterations", type=int, default=50, help="Iterações por execução (record)")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Piora relativa máxima tolerada (0.10 = 10%%)")
+    parser.add_argument("--only", nargs='+', choices=sorted(BENCHMARKS), help="Limita as funções medidas")
+
+    args = parser.parse_args()
+    names = args.only or list(BENCHMARKS)
+
+    if args.command == 'allocations':
+        allocations(names, args.iterations)
+        return
+
+    if args.command == 'record':
+        record(args.baseline, names, args.runs, args.iterations)
+        return
+
+    regressions = compare(args.baseline, names, args.threshold)
+    if regressions < 0:
+        sys.exit(2)
+    if regressions:
+        print(f"\n🚨 {regressions} função(ões) com regressão acima de {args.threshold:.0%}")
+        sys.exit(1)
+    print("\n🎉 Nenhuma regressão de performance detectada")
+
+
+if __name__ == "__main__":
+    main()
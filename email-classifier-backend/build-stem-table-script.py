@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Geração da tabela de radicais do pipeline em português
+Passa o RSLPStemmer uma vez sobre o vocabulário de um corpus (os mesmos tokens
+que preprocess_text reduz) e grava palavra → radical em STEM_TABLE_PATH. Em
+produção o app responde pela tabela e só chama o RSLP nas palavras que ficaram
+de fora; elas aparecem em /stems/stats e no log e podem voltar com --words.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import chain
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from app import classifier, rslp_stemmer, STEM_TABLE_PATH  # noqa: E402
+from stem_table import build_stems, collect_vocabulary, load_table, save_table  # noqa: E402
+
+
+def iter_corpus(path):
+    """Itera sobre os textos de um arquivo JSONL (campo "text")"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                text = json.loads(line).get('text')
+                if text:
+                    yield text
+
+
+def iter_generated(count, seed):
+    """Itera sobre um corpus sintético gerado na hora"""
+    from synthetic_corpus import CorpusGenerator
+
+    generator = CorpusGenerator(seed=seed)
+    for item in generator.iter_emails(count):
+        yield item['body']
+
+
+def iter_words(path):
+    """Palavras avulsas, uma por linha (ex.: top_unseen do /stems/stats)"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            word = line.strip().lower()
+            if word and not word.startswith('#'):
+                yield word
+
+
+def main():
+    """Função principal da geração da tabela"""
+    parser = argparse.ArgumentParser(description="Gera a tabela de radicais (RSLP) a partir de um corpus")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Corpus em JSONL (campo \"text\")")
+    source.add_argument("--generate", type=int, metavar="N", help="Usa N emails sintéticos")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do corpus sintético")
+    parser.add_argument("--words", action="append", default=[],
+                        help="Arquivo com palavras extras, uma por linha (pode repetir)")
+    parser.add_argument("--min-count", type=int, default=1,
+                        help="Ocorrências mínimas no corpus para a palavra entrar na tabela")
+    parser.add_argument("--output", default=STEM_TABLE_PATH, help="Arquivo da tabela")
+    args = parser.parse_args()
+
+    stemmer = rslp_stemmer.get()
+    if stemmer is None:
+        print("❌ RSLPStemmer indisponível: rode python setup-nltk-script.py")
+        sys.exit(1)
+
+    pipeline = classifier.pipelines['pt']
+    stop_words = pipeline.stop_words
+
+    def tokens(text):
+        if classifier.detect_language(text) != 'pt':
+            return ()
+        return [word for word in classifier.clean_tokens(text, pipeline) if len(word) > 2 and word not in stop_words]
+
+    texts = iter_corpus(args.corpus) if args.corpus else iter_generated(args.generate, args.seed)
+    print("📚 Coletando o vocabulário em português...")
+    start = time.perf_counter()
+    words = set(collect_vocabulary(texts, tokens, args.min_count))
+    corpus_words = len(words)
+    # Palavras-chave das regras também passam pelo stemmer na subida
+    words.update(chain.from_iterable(pipeline.keywords))
+    for path in args.words:
+        words.update(iter_words(path))
+    print(f"   {corpus_words:,} palavras do corpus, {len(words) - corpus_words:,} extras "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    stems = build_stems(words, stemmer)
+    elapsed = time.perf_counter() - start
+    print(f"✂️  {len(stems):,} radicais calculados em {elapsed:.1f}s "
+          f"({elapsed / len(stems) * 1e6 if stems else 0:.1f} µs/palavra)")
+
+    save_table(args.output, stems, 'rslp')
+    loaded, _ = load_table(args.output)
+    if loaded != stems:
+        print("❌ A tabela relida não confere com os radicais calculados")
+        sys.exit(1)
+    print(f"\n💾 Tabela salva em {args.output} ({os.path.getsize(args.output) / 1024:,.1f} KB)")
+    print("   O app carrega a tabela de STEM_TABLE_PATH na subida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Exportação do registro de classificações (CSV, JSONL, Parquet e Arrow IPC)
+As linhas são lidas do banco em lotes de `batch_size` (um cursor, sem
+carregar a tabela inteira) e cada lote vira um pedaço do arquivo de saída:
+nos formatos colunares, um row group (Parquet) ou um record batch (Arrow).
+Os geradores devolvem bytes conforme os lotes ficam prontos, então a mesma
+função alimenta o script de linha de comando e a resposta HTTP em streaming.
+
+Parquet e Arrow dependem do pyarrow, que é opcional (ImportError vira
+ExportError com a instrução de instalação).
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+FORMATS = {
+    # O Flask acrescenta "; charset=utf-8" aos tipos text/*
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+COLUMNS = ('id', 'created_at', 'input_hash', 'source', 'engine', 'category', 'confidence', 'latency_ms', 'chars')
+
+# Features gravadas pelo classificador; nos formatos tabulares viram colunas "feature_<nome>"
+FEATURE_COLUMNS = (
+    ('language', 'string'),
+    ('word_count', 'int'),
+    ('char_count', 'int'),
+    ('sentence_count', 'int'),
+    ('has_question', 'bool'),
+    ('has_exclamation', 'bool'),
+    ('urgency_score', 'int'),
+    ('politeness_score', 'int'),
+    ('productive_count', 'int'),
+    ('unproductive_count', 'int'),
+    ('pattern_matches', 'int'),
+)
+
+
+class ExportError(ValueError):
+    """Parâmetros de exportação inválidos ou formato indisponível"""
+
+
+def parse_time(value, name):
+    """Valida uma data/hora ISO (ex.: 2024-05-01 ou 2024-05-01T12:00) e a normaliza para comparação"""
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ExportError(f'"{name}" deve ser uma data ISO (ex.: 2024-05-01 ou 2024-05-01T12:00:00)') from None
+
+
+def iter_batches(path, since=None, until=None, category=None, batch_size=5000):
+    """Lotes de linhas (tuplas de COLUMNS + features em JSON) em ordem cronológica
+
+    `since` é inclusivo e `until`, exclusivo (datas ISO já normalizadas). Com
+    intervalo a leitura segue o índice de created_at; sem ele, a ordem das
+    linhas na tabela. Em nenhum dos casos o SQLite precisa ordenar em memória.
+    """
+    try:
+        connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=30)
+    except sqlite3.OperationalError as e:
+        raise ExportError(f'Registro de classificações indisponível: {e}') from e
+    try:
+        conditions, params = [], []
+        if since:
+            conditions.append('created_at >= ?')
+            params.append(since)
+        if until:
+            conditions.append('created_at < ?')
+            params.append(until)
+        if category:
+            conditions.append('category = ?')
+            params.append(category)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order = 'created_at' if since or until else 'id'
+        cursor = connection.execute(
+            f"SELECT {', '.join(COLUMNS)}, features FROM classifications {where} ORDER BY {order}", params
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        connection.close()
+
+
+def _feature_values(raw_features):
+    features = json.loads(raw_features) if raw_features else {}
+    return [features.get(name) for name, _ in FEATURE_COLUMNS]
+
+
+def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS + tuple(f'feature_{name}' for name, _ in FEATURE_COLUMNS))
+    for rows in batches:
+        for row in rows:
+            writer.writerow(list(row[:-1]) + _feature_values(row[-1]))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def export_jsonl(batches):
+    for rows in batches:
+        lines = []
+        for row in rows:
+            record = dict(zip(COLUMNS, row[:-1]))
+            record['features'] = json.loads(row[-1]) if row[-1] else None
+            lines.append(json.dumps(record, ensure_ascii=False))
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Arquivo só de escrita que acumula os bytes até serem retirados"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(pa):
+    types = {'string': pa.string(), 'int': pa.int64(), 'bool': pa.bool_()}
+    return pa.schema(
+        [('id', pa.int64()), ('created_at', pa.timestamp('us')), ('input_hash', pa.string()),
+         ('source', pa.dictionary(pa.int8(), pa.string())), ('engine', pa.dictionary(pa.int8(), pa.string())),
+         ('category', pa.dictionary(pa.int8(), pa.string())), ('confidence', pa.float64()),
+         ('latency_ms', pa.float64()), ('chars', pa.int64())]
+        + [(f'feature_{name}', types[kind]) for name, kind in FEATURE_COLUMNS]
+    )
+
+
+def _record_batch(pa, schema, rows):
+    columns = list(zip(*rows))
+    features = list(zip(*(_feature_values(raw) for raw in columns[-1])))
+    values = list(columns[:-1]) + features
+    values[1] = [datetime.fromisoformat(value) for value in values[1]]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema
+    )
+
+
+def _require_pyarrow(fmt):
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportError(f'Formato "{fmt}" requer o pyarrow (pip install pyarrow)') from None
+    return pyarrow
+
+
+def export_columnar(batches, fmt):
+    """Parquet (um row group por lote) ou Arrow IPC em stream (um record batch por lote)"""
+    pa = _require_pyarrow(fmt)
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pa.parquet.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for rows in batches:
+            batch = _record_batch(pa, schema, rows)
+            if fmt == 'parquet':
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=len(rows))
+            else:
+                writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export(path, fmt, since=None, until=None, category=None, batch_size=5000):
+    """Retorna o gerador de bytes do arquivo exportado
+
+    Os parâmetros são validados aqui, antes do primeiro byte, para que a rota
+    HTTP ainda possa responder 400.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f'Formato inválido: {fmt}. Use: {", ".join(FORMATS)}')
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise ExportError('"batch_size" deve ser um inteiro positivo')
+    if fmt in ('parquet', 'arrow'):
+        _require_pyarrow(fmt)
+    since, until = parse_time(since, 'since'), parse_time(until, 'until')
+    if not path or not os.path.exists(path):
+        raise ExportError('Registro de classificações não encontrado (CLASSIFICATION_STORE_PATH)')
+    batches = iter_batches(path, since, until, category, batch_size)
+    if fmt == 'csv':
+        return export_csv(batches)
+    if fmt == 'jsonl':
+        return export_jsonl(batches)
+    return export_columnar(batches, fmt)
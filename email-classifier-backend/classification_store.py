@@ -0,0 +1,227 @@
+"""
+Registro durável das classificações (SQLite em modo WAL)
+Cada classificação vira uma linha com o hash do texto, categoria, confiança,
+features, latência e origem. A requisição só anexa o registro a uma fila em
+memória (deque limitada, sem locks nem disco); uma thread de fundo por
+processo drena a fila em transações de vários registros. Com a fila cheia o
+registro é descartado e contado, nunca bloqueia a requisição.
+
+Política de durabilidade (CLASSIFICATION_STORE_DURABILITY):
+- off: sem fsync, o mais rápido; uma queda do sistema pode corromper o final do log
+- normal: WAL com synchronous=NORMAL; sobrevive a queda do processo, uma
+  queda de energia pode perder as últimas transações (padrão)
+- full: fsync a cada lote; perde no máximo o que ainda estava na fila
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_LEVELS = {'off': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    source TEXT NOT NULL,
+    engine TEXT,
+    category TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    latency_ms REAL,
+    chars INTEGER,
+    features TEXT
+);
+CREATE INDEX IF NOT EXISTS classifications_created_at ON classifications (created_at);
+CREATE INDEX IF NOT EXISTS classifications_input_hash ON classifications (input_hash);
+"""
+
+INSERT = ("INSERT INTO classifications (created_at, input_hash, source, engine, category, confidence, "
+          "latency_ms, chars, features) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def input_hash(text):
+    """SHA-256 do texto classificado (o texto em si não é gravado)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def connect(path, durability='normal'):
+    """Abre o banco em modo WAL e cria a tabela se preciso"""
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Durabilidade inválida: {durability} (use {', '.join(DURABILITY_LEVELS)})")
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(f'PRAGMA synchronous={DURABILITY_LEVELS[durability]}')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class ClassificationStore:
+    """Fila limitada + escritor em lote em segundo plano
+
+    `record()` é o único método chamado no caminho da requisição. A thread
+    grava quando a fila chega a `batch_size` registros ou a cada
+    `flush_interval` segundos, o que vier primeiro.
+    """
+
+    def __init__(self, path, durability='normal', max_pending=10000, batch_size=200, flush_interval=1.0):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Durabilidade inválida: {durability} (use {', '.join(DURABILITY_LEVELS)})")
+        self.path = path
+        self.durability = durability
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.lost = 0
+        self.failures = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+        self.last_batch_ms = None
+        self.last_error = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def record(self, text, category, confidence, features, latency_ms, source, engine=None):
+        """Enfileira uma classificação; retorna False se ela foi descartada"""
+        if not self.enabled:
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Fila do registro de classificações cheia: {self.dropped} registro(s) descartado(s)")
+            return False
+        self._pending.append((datetime.now().isoformat(), text, source, engine, category,
+                              confidence, latency_ms, features))
+        self.enqueued += 1
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+        self.ensure_started()
+        return True
+
+    def ensure_started(self):
+        """Inicia a thread de gravação neste processo (também após fork)"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='classification-store', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro ao gravar classificações: {e}")
+
+    def flush(self):
+        """Grava tudo o que está na fila, em transações de até `batch_size` registros"""
+        with self._write_lock:
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popleft())
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        rows = [
+            (created_at, input_hash(text), source, engine, category, round(confidence, 4),
+             round(latency_ms, 3) if latency_ms is not None else None, len(text),
+             json.dumps(dict(features), ensure_ascii=False) if features is not None else None)
+            for created_at, text, source, engine, category, confidence, latency_ms, features in batch
+        ]
+        start = time.perf_counter()
+        try:
+            connection = self._connect()
+            with connection:
+                connection.executemany(INSERT, rows)
+        except (sqlite3.Error, OSError) as e:
+            # Os registros do lote são perdidos; o log segue para os próximos
+            self.failures += 1
+            self.lost += len(batch)
+            self.last_error = str(e)
+            self._close_connection()
+            raise
+        elapsed = time.perf_counter() - start
+        self.written += len(batch)
+        self.batches += 1
+        self.write_seconds += elapsed
+        self.last_batch_ms = elapsed * 1000
+
+    def _connect(self):
+        # Conexões SQLite não sobrevivem a fork: cada processo abre a sua (o uso
+        # é serializado por _write_lock, então a thread de saída pode reaproveitá-la)
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = connect(self.path, self.durability)
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _close_connection(self):
+        if self._connection is not None and self._connection_pid == os.getpid():
+            try:
+                self._connection.close()
+            except sqlite3.Error:
+                pass
+        self._connection = None
+
+    def close(self):
+        """Grava o que restou na fila (chamado na saída do processo)"""
+        if not self.enabled:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Erro ao gravar classificações pendentes: {e}")
+        self._close_connection()
+
+    def metrics(self):
+        """Contadores de gravação e descarte deste worker
+
+        `dropped` conta registros descartados com a fila cheia e `lost`, os de
+        lotes cuja gravação falhou.
+        """
+        return {
+            'pid': os.getpid(),
+            'enabled': self.enabled,
+            'durability': self.durability,
+            'pending': len(self._pending),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'lost': self.lost,
+            'failures': self.failures,
+            'batches': self.batches,
+            'avg_batch_size': round(self.written / self.batches, 1) if self.batches else None,
+            'last_batch_ms': round(self.last_batch_ms, 3) if self.last_batch_ms is not None else None,
+            'avg_batch_ms': round(self.write_seconds * 1000 / self.batches, 3) if self.batches else None,
+            'last_error': self.last_error,
+        }
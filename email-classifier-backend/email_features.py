@@ -0,0 +1,69 @@
+"""
+Features extraídas de um email para a classificação
+Cada email classificado gera um registro de features, que fica vivo na fila do
+registro de classificações, nos lotes do /classify-batch e no raciocínio. Um
+objeto com __slots__ ocupa uma fração de um dict com as mesmas chaves e não
+guarda as strings das chaves por instância. O acesso por chave
+(`features['word_count']`) continua funcionando, e `dict(features)` devolve só
+os campos preenchidos (a etapa rápida da cascata não calcula todos).
+"""
+
+FEATURE_NAMES = (
+    'language', 'word_count', 'char_count', 'sentence_count', 'has_question', 'has_exclamation',
+    'urgency_score', 'politeness_score', 'productive_count', 'unproductive_count', 'pattern_matches',
+    'cascade_stage',
+)
+
+
+class EmailFeatures:
+    """Features de um email; campos não calculados ficam None"""
+
+    __slots__ = FEATURE_NAMES
+
+    def __init__(self, language, word_count, char_count, has_question, productive_count, unproductive_count,
+                 urgency_score, pattern_matches, sentence_count=None, has_exclamation=None,
+                 politeness_score=None, cascade_stage=None):
+        self.language = language
+        self.word_count = word_count
+        self.char_count = char_count
+        self.sentence_count = sentence_count
+        self.has_question = has_question
+        self.has_exclamation = has_exclamation
+        self.urgency_score = urgency_score
+        self.politeness_score = politeness_score
+        self.productive_count = productive_count
+        self.unproductive_count = unproductive_count
+        self.pattern_matches = pattern_matches
+        self.cascade_stage = cascade_stage
+
+    def __getitem__(self, name):
+        value = getattr(self, name, None) if name in FEATURE_NAMES else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        if name not in FEATURE_NAMES:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return name in FEATURE_NAMES and getattr(self, name) is not None
+
+    def keys(self):
+        return [name for name in FEATURE_NAMES if getattr(self, name) is not None]
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None) if name in FEATURE_NAMES else None
+        return default if value is None else value
+
+    def copy(self):
+        return EmailFeatures(**{name: getattr(self, name) for name in FEATURE_NAMES})
+
+    def __eq__(self, other):
+        if isinstance(other, (EmailFeatures, dict)):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f'EmailFeatures({dict(self)!r})'
@@ -7,6 +7,13 @@ SECRET_KEY=sua-chave-secreta-aqui
 PORT=5000
 HOST=0.0.0.0
 
+# Modo serverless (Vercel): imports tardios e dados do NLTK só do diretório empacotado, sem download
+SERVERLESS=0
+NLTK_DATA_DIR=nltk_data
+
+# Tabela de radicais pré-calculada (build-stem-table-script.py); vazio desliga
+STEM_TABLE_PATH=models/stem_table.tsv
+
 # Configurações de CORS
 CORS_ORIGINS=http://localhost:3000,http://localhost:5173
 
@@ -21,6 +28,95 @@ RATE_LIMIT_PERIOD=3600  # 1 hora
 LOG_LEVEL=INFO
 LOG_FILE=logs/app.log
 
+# Motor de classificação padrão (rules | linear | cascade) e modelo linear treinado
+CLASSIFIER_ENGINE=rules
+# Modo cascata: diferença de scores a partir da qual a etapa rápida decide sozinha
+CASCADE_MARGIN=4
+# LINEAR_MODEL_PATH=models/linear_model.json   # ou models/linear_model.bin (artefato mmap)
+# Radicais memorizados por idioma no pré-processamento do motor linear
+STEM_CACHE_SIZE=50000
+# MODEL_ARTIFACT_VERIFY=header                  # header (CRC32 das seções em segundo plano) | full (na carga)
+
+# Corte de histórico citado, avisos legais e assinaturas antes da classificação
+# (0 desliga) e janela de caracteres mantidos do início e do fim do texto
+TRIM_EMAILS=1
+TRIM_HEAD_CHARS=4000
+TRIM_TAIL_CHARS=1000
+
+# Quase-duplicatas (correntes, mala direta): similaridade mínima, máximo de clusters e expiração em segundos
+NEAR_DUPLICATE_THRESHOLD=0.85
+NEAR_DUPLICATE_MAX_ENTRIES=10000
+NEAR_DUPLICATE_TTL=3600
+
+# Aprendizado online (POST /feedback): segundos entre merges, limite da fila por worker e
+# linhas do log de deltas (<modelo>.deltas) incorporadas ao arquivo do modelo de cada vez
+FEEDBACK_MERGE_INTERVAL=5
+FEEDBACK_MAX_PENDING=10000
+FEEDBACK_FOLD_RECORDS=200
+
+# Arquivo mapeado em memória com os contadores do /stats, compartilhado entre os workers
+# (padrão: /dev/shm/email-classifier-stats-<pid do processo pai>.bin)
+# STATS_FILE=/dev/shm/email-classifier-stats.bin
+
+# Registro de classificações (SQLite WAL; vazio desliga): durabilidade off | normal | full,
+# tamanho máximo da fila (excedentes são descartados), registros por transação e segundos entre gravações
+CLASSIFICATION_STORE_PATH=data/classifications.db
+CLASSIFICATION_STORE_DURABILITY=normal
+CLASSIFICATION_STORE_MAX_PENDING=10000
+CLASSIFICATION_STORE_BATCH_SIZE=200
+CLASSIFICATION_STORE_FLUSH_INTERVAL=1
+
+# Exportação do registro (GET /store/export): linhas por lote, que viram um row group no Parquet
+EXPORT_BATCH_SIZE=5000
+
+# Jobs assíncronos (POST /jobs): fila SQLite, threads por worker (0 desliga o processamento),
+# intervalo de consulta da fila, prazo de visibilidade em segundos e número máximo de tentativas
+JOBS_DB_PATH=data/jobs.db
+JOB_WORKERS=2
+JOB_POLL_INTERVAL=1
+JOB_VISIBILITY_TIMEOUT=300
+JOB_MAX_ATTEMPTS=3
+
+# Leitura de várias caixas de email (opcional): lista de contas em JSON, modo poll (consulta
+# periódica) ou idle (IMAP IDLE), conexões IMAP simultâneas no total, renovação do IDLE em segundos,
+# recuo inicial e máximo em segundos após erros, motor de classificação e lock que escolhe o
+# único worker que lê as caixas
+# MAILBOX_ACCOUNTS_FILE=mailboxes.json
+MAILBOX_MODE=poll
+MAILBOX_MAX_CONNECTIONS=8
+MAILBOX_IDLE_TIMEOUT=300
+MAILBOX_BACKOFF=5
+MAILBOX_MAX_BACKOFF=600
+# MAILBOX_ENGINE=rules
+MAILBOX_LOCK_FILE=data/mailbox-poller.lock
+
+# Anexos PDF/.txt dos emails das caixas (1 liga): threads de extração, bytes e segundos por anexo,
+# caracteres aproveitados, itens no cache por hash do conteúdo e peso dos anexos na classificação (0 a 1)
+ATTACHMENTS=0
+ATTACHMENT_WORKERS=2
+ATTACHMENT_MAX_BYTES=5242880
+ATTACHMENT_TIMEOUT=10
+ATTACHMENT_MAX_CHARS=20000
+ATTACHMENT_CACHE_SIZE=512
+ATTACHMENT_WEIGHT=0.3
+
+# Stream SSE dos emails classificados (/mailboxes/events): banco dos eventos, quantos manter,
+# duração máxima de uma conexão, intervalo de leitura em segundos e streams simultâneos por worker
+EVENTS_DB_PATH=data/events.db
+EVENTS_RETENTION=1000
+SSE_MAX_SECONDS=300
+SSE_POLL_INTERVAL=0.5
+SSE_MAX_STREAMS=2
+
+# Regras de resposta automática (opcional, JSON no formato de DEFAULT_RESPONSE_RULES)
+# RESPONSE_RULES_FILE=response_rules.json
+
+# Regras do classificador (palavras-chave, padrões, respostas) recarregadas quando o arquivo muda;
+# intervalo de verificação em segundos (0 desliga) e token dos endpoints /admin
+# RULES_FILE=rules.json
+# RULES_RELOAD_INTERVAL=2
+# ADMIN_TOKEN=troque-este-token
+
 # Configurações de AI/ML (para futuras integrações)
 # OPENAI_API_KEY=sua-chave-openai
 # HUGGINGFACE_API_KEY=sua-chave-huggingface
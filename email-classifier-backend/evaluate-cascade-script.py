@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Ajuste do limiar do modo cascata
+Para cada margem, mede a fração de emails decididos na etapa rápida, a
+concordância com o pipeline completo, a acurácia e o custo médio por email,
+usando um corpus rotulado em JSONL (ver synthetic_corpus.py)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from app import classifier  # noqa: E402
+
+
+def iter_corpus(path):
+    """Itera sobre os exemplos rotulados de um arquivo JSONL"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                if record.get('text'):
+                    yield record
+
+
+def iter_generated(count, seed):
+    """Itera sobre um corpus sintético gerado na hora"""
+    from synthetic_corpus import CorpusGenerator
+
+    for item in CorpusGenerator(seed=seed).iter_emails(count):
+        yield {'text': item['body'], 'label': item['label']}
+
+
+def measure(records):
+    """Roda as duas etapas em cada email, guardando decisões e tempos"""
+    rows = []
+    for record in records:
+        text = record['text']
+
+        start = time.perf_counter()
+        language = classifier.detect_language(text)
+        productive_score, unproductive_score, _ = classifier.quick_scores(text, language)
+        quick_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        full_category = classifier.classify_email(text)[0]
+        full_seconds = time.perf_counter() - start
+
+        rows.append({
+            'label': record.get('label'),
+            'margin': abs(productive_score - unproductive_score),
+            'quick': 'Produtivo' if productive_score > unproductive_score else 'Improdutivo',
+            'full': full_category,
+            'quick_seconds': quick_seconds,
+            'full_seconds': full_seconds,
+        })
+    return rows
+
+
+def main():
+    """Função principal do ajuste"""
+    parser = argparse.ArgumentParser(description="Mede o modo cascata para vários limiares de margem")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Corpus rotulado em JSONL")
+    source.add_argument("--generate", type=int, metavar="N", help="Avalia com N emails sintéticos")
+    parser.add_argument("--seed", type=int, default=7, help="Semente do corpus sintético")
+    parser.add_argument("--margins", type=float, nargs='+', default=[2, 3, 4, 5, 6, 8, 10],
+                        help="Margens (diferença de scores) a avaliar")
+    args = parser.parse_args()
+
+    rows = measure(iter_corpus(args.corpus) if args.corpus else iter_generated(args.generate, args.seed))
+    if not rows:
+        print("❌ Corpus vazio")
+        return 1
+
+    n = len(rows)
+    labelled = [row for row in rows if row['label']]
+    full_us = sum(row['full_seconds'] for row in rows) / n * 1e6
+    full_accuracy = sum(row['full'] == row['label'] for row in labelled) / len(labelled) if labelled else None
+
+    print(f"🪜 Modo cascata ({n:,} emails, margem atual: {classifier.cascade_margin:g})")
+    header = f"   {'margem':>6} {'saída rápida':>13} {'concordância':>13} {'acurácia':>9} {'µs/email':>9}"
+    print(header)
+    for margin in sorted(args.margins):
+        decided = []
+        for row in rows:
+            exits = row['margin'] >= margin
+            decided.append(row['quick'] if exits else row['full'])
+            row['exits'] = exits
+        quick_ratio = sum(row['exits'] for row in rows) / n
+        exited = [row for row in rows if row['exits']]
+        agreement = sum(row['quick'] == row['full'] for row in exited) / len(exited) if exited else 1.0
+        accuracy = (sum(category == row['label'] for category, row in zip(decided, rows) if row['label'])
+                    / len(labelled)) if labelled else None
+        per_email_us = sum(row['quick_seconds'] + (0 if row['exits'] else row['full_seconds'])
+                           for row in rows) / n * 1e6
+        accuracy_text = f"{accuracy:9.1%}" if accuracy is not None else f"{'-':>9}"
+        print(f"   {margin:>6g} {quick_ratio:>13.1%} {agreement:>13.1%} {accuracy_text} {per_email_us:>9.1f}")
+
+    accuracy_text = f"{full_accuracy:.1%}" if full_accuracy is not None else "-"
+    print(f"\n   Pipeline completo: acurácia {accuracy_text}, {full_us:.1f} µs/email")
+    print("   Concordância = emails da saída rápida com a mesma categoria do pipeline completo")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
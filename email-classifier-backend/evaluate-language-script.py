@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Avaliação do roteamento por idioma
+Mede, por idioma, a acurácia e o custo do detector e a acurácia do
+classificador com o pipeline do idioma detectado contra o pipeline único em
+português (comportamento anterior), usando um corpus rotulado em JSONL com o
+campo "language" (ver synthetic_corpus.py). Como em /classify, detecção e
+classificação usam o texto já sem citações, avisos e assinaturas (--no-trim
+avalia o texto cru).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from app import classifier, email_trimmer  # noqa: E402
+
+
+def iter_corpus(path):
+    """Itera sobre os exemplos rotulados de um arquivo JSONL"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                if record.get('text') and record.get('language'):
+                    yield record
+
+
+def iter_generated(count, seed):
+    """Itera sobre um corpus sintético gerado na hora"""
+    from synthetic_corpus import CorpusGenerator
+
+    for item in CorpusGenerator(seed=seed).iter_emails(count):
+        yield {'text': item['body'], 'label': item['label'], 'language': item['language']}
+
+
+def main():
+    """Função principal da avaliação"""
+    parser = argparse.ArgumentParser(description="Avalia detecção de idioma e pipelines por idioma")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Corpus rotulado em JSONL com o campo \"language\"")
+    source.add_argument("--generate", type=int, metavar="N", help="Avalia com N emails sintéticos")
+    parser.add_argument("--seed", type=int, default=7, help="Semente do corpus sintético")
+    parser.add_argument("--no-trim", action="store_true", help="Avalia o texto cru, sem o corte de EmailTrimmer")
+    args = parser.parse_args()
+
+    records = list(iter_corpus(args.corpus) if args.corpus else iter_generated(args.generate, args.seed))
+    if not records:
+        print("❌ Nenhum exemplo com os campos \"text\" e \"language\"")
+        return 1
+
+    detector = classifier.language_detector
+    totals = Counter()
+    confusion = Counter()
+    detection_seconds = defaultdict(float)
+    correct = {'detected': Counter(), 'portuguese': Counter()}
+    labelled = Counter()
+
+    for record in records:
+        language = record['language']
+        totals[language] += 1
+        text = record['text'] if args.no_trim else email_trimmer.trim(record['text']).text
+
+        start = time.perf_counter()
+        detected = detector.detect(text)
+        detection_seconds[language] += time.perf_counter() - start
+        confusion[(language, detected)] += 1
+
+        if record.get('label'):
+            labelled[language] += 1
+            if classifier.classify_email(text, language=detected)[0] == record['label']:
+                correct['detected'][language] += 1
+            if classifier.classify_email(text, language='pt')[0] == record['label']:
+                correct['portuguese'][language] += 1
+
+    print(f"🌐 Detecção de idioma ({len(records):,} emails)")
+    for language in sorted(totals):
+        hits = confusion[(language, language)]
+        per_email_us = detection_seconds[language] / totals[language] * 1e6
+        print(f"   {language}: {hits / totals[language]:6.1%} ({hits:,}/{totals[language]:,})"
+              f"   {per_email_us:6.1f} µs/email")
+    errors = {pair: n for pair, n in confusion.items() if pair[0] != pair[1]}
+    for (expected, detected), n in sorted(errors.items()):
+        print(f"   ⚠️ {n:,} email(s) em '{expected}' detectado(s) como '{detected}'")
+
+    if sum(labelled.values()):
+        print("\n📊 Acurácia da classificação por idioma")
+        print(f"   {'idioma':<8}{'pipeline do idioma':>20}{'só português':>16}")
+        for language in sorted(labelled):
+            n = labelled[language]
+            print(f"   {language:<8}{correct['detected'][language] / n:>20.1%}"
+                  f"{correct['portuguese'][language] / n:>16.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Log de eventos para o stream SSE (/mailboxes/events)
+Só um worker lê as caixas de email, mas o cliente do SSE pode estar conectado
+em qualquer worker. Os eventos vão para uma tabela SQLite (WAL) com ID
+crescente: quem publica insere uma linha, cada stream lê as linhas com ID
+maior que o último enviado. O ID é o "id:" do SSE, então um navegador que
+reconecta com Last-Event-ID continua de onde parou. Só os últimos `retention`
+eventos são mantidos.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+class EventLog:
+    """Eventos publicados por um processo e lidos por todos"""
+
+    def __init__(self, path, retention=1000):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+        self.published = 0
+
+    def _connection(self):
+        # Uma conexão por thread e por processo (conexões não sobrevivem a fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def publish(self, kind, payload):
+        """Grava um evento e retorna seu ID"""
+        connection = self._connection()
+        cursor = connection.execute(
+            "INSERT INTO events (created_at, kind, payload) VALUES (?, ?, ?)",
+            (time.time(), kind, json.dumps(payload, ensure_ascii=False))
+        )
+        event_id = cursor.lastrowid
+        self.published += 1
+        if self.retention and event_id % 100 == 0:
+            connection.execute("DELETE FROM events WHERE id <= ?", (event_id - self.retention,))
+        return event_id
+
+    def since(self, last_id, limit=100):
+        """Eventos com ID maior que `last_id`: [(id, tipo, payload em JSON)]"""
+        return self._connection().execute(
+            "SELECT id, kind, payload FROM events WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        ).fetchall()
+
+    def last_id(self):
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Exportação do registro de classificações para análise offline
+Lê o banco SQLite do registro em lotes e grava CSV, JSONL, Parquet ou Arrow
+IPC (os dois últimos requerem o pyarrow), com filtro por período e categoria.
+Não importa o app: pode rodar ao lado dos workers, direto no arquivo do banco.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from classification_export import FORMATS, ExportError, export  # noqa: E402
+
+DEFAULT_DB = os.environ.get('CLASSIFICATION_STORE_PATH') or os.path.join(BACKEND_DIR, 'data', 'classifications.db')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o registro de classificações")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Banco do registro (padrão: CLASSIFICATION_STORE_PATH)")
+    parser.add_argument("--format", choices=list(FORMATS), default='csv', help="Formato de saída")
+    parser.add_argument("--since", help="Data/hora ISO inicial (inclusiva)")
+    parser.add_argument("--until", help="Data/hora ISO final (exclusiva)")
+    parser.add_argument("--category", choices=['Produtivo', 'Improdutivo'], help="Só uma categoria")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="Linhas lidas por vez (= linhas por row group no Parquet)")
+    parser.add_argument("--output", help="Arquivo de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    try:
+        chunks = export(args.db, args.format, args.since, args.until, args.category, args.batch_size)
+    except ExportError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    written = 0
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+    if args.output:
+        elapsed = time.perf_counter() - start
+        print(f"✅ {args.output}: {written / 1024:,.1f} KB em {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
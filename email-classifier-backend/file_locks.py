@@ -0,0 +1,86 @@
+"""
+Arquivos compartilhados entre processos: versão em disco e lock exclusivo
+Usado pelo recarregamento de regras e modelos (file_stamp), pela gravação do
+modelo com correções (exclusive_lock) e pela eleição do processo que lê as
+caixas de email (try_lock). O fcntl só existe no Unix: no Windows
+o lock usa msvcrt.locking e, sem nenhum dos dois, vale só dentro do processo.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_local_lock = threading.Lock()
+
+
+def file_stamp(path):
+    """Identifica a versão do arquivo (um os.replace sempre troca o inode)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def has_flock():
+    """True se o sistema tem flock (fcntl)"""
+    try:
+        import fcntl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def try_lock(file):
+    """Tenta o flock exclusivo sem esperar; True se obtido (exige has_flock())
+
+    O lock fica com o arquivo aberto até ele ser fechado ou o processo terminar.
+    """
+    import fcntl
+
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+@contextmanager
+def exclusive_lock(file):
+    """Lock exclusivo entre processos sobre um arquivo aberto, liberado ao sair"""
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+        return
+
+    try:
+        import msvcrt
+    except ImportError:
+        with _local_lock:
+            yield
+        return
+
+    # msvcrt trava bytes a partir da posição atual: sempre o primeiro byte
+    fd = file if isinstance(file, int) else file.fileno()
+    while True:
+        os.lseek(fd, 0, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            break
+        except OSError:
+            # LK_LOCK desiste após ~10s de espera: tenta de novo
+            time.sleep(0.1)
+    try:
+        yield
+    finally:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,75 @@
+"""
+Marcação de intenções (urgência, problema, status, saudação, agradecimento...)
+Um email pode ter várias intenções ao mesmo tempo. Todas as palavras de todas
+as marcas são compiladas em um único KeywordMatcher, então marcar o texto custa
+uma varredura, independente do número de marcas. Cada palavra encontrada
+acende as marcas a que pertence (máscara de bits), guardando a posição.
+"""
+
+from keyword_matcher import KeywordMatcher
+
+# Palavras de cada marca; por padrão a palavra precisa aparecer inteira e um
+# '*' no final aceita qualquer continuação ("erro*" marca "erros")
+DEFAULT_INTENT_TAGS = {
+    'urgency': ['urgen*', 'asap', 'imediat*', 'crítico', 'crítica', 'immediate*', 'critical'],
+    'problem': ['erro*', 'problema*', 'bug*', 'falha*', 'error*', 'issue*', 'problem*', 'failure*', 'trouble*'],
+    'status': ['status', 'andamento', 'atualização', 'update*', 'progress*'],
+    'greeting': ['olá', 'oi', 'bom dia', 'boa tarde', 'boa noite', 'prezad*', 'hello', 'hi', 'hey',
+                 'dear', 'good morning', 'good afternoon', 'good evening'],
+    'thanks': ['obrigad*', 'agradecimento*', 'agradeço', 'thanks', 'thank you', 'grato', 'grata'],
+    'congratulations': ['parabéns', 'felicitaç*', 'feliz', 'congratulation*'],
+    'holiday': ['natal', 'ano novo', 'feriado*', 'christmas', 'new year', 'holiday*'],
+}
+
+
+class IntentTagger:
+    """Encontra todas as marcas de intenção do texto em uma única varredura"""
+
+    def __init__(self, tags=None):
+        tags = DEFAULT_INTENT_TAGS if tags is None else tags
+        self.tags = tuple(tags)
+        keyword_masks = {}
+        self._prefix_keywords = set()
+        for bit, keywords in enumerate(tags.values()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword.endswith('*'):
+                    keyword = keyword[:-1]
+                    self._prefix_keywords.add(keyword)
+                keyword_masks[keyword] = keyword_masks.get(keyword, 0) | (1 << bit)
+        self._keyword_masks = keyword_masks
+        self._matcher = KeywordMatcher(keyword_masks)
+
+    def tag(self, text):
+        """Retorna {marca: [(início, fim), ...]} com as ocorrências no texto"""
+        text_lower = text.lower()
+        length = len(text_lower)
+        found = {}
+        for keyword, start, end in self._matcher.finditer(text_lower):
+            if start and text_lower[start - 1].isalnum():
+                continue
+            if end < length and text_lower[end].isalnum():
+                if keyword not in self._prefix_keywords:
+                    continue
+                # Prefixo: o trecho marcado vai até o fim da palavra
+                while end < length and text_lower[end].isalnum():
+                    end += 1
+            mask = self._keyword_masks[keyword]
+            while mask:
+                bit = (mask & -mask).bit_length() - 1
+                spans = found.setdefault(self.tags[bit], [])
+                # Palavras da mesma marca na mesma posição ("erro*" e "error") contam uma vez
+                if spans and spans[-1][0] == start:
+                    spans[-1] = (start, max(end, spans[-1][1]))
+                else:
+                    spans.append((start, end))
+                mask &= mask - 1
+        return found
+
+
+def summarize_tags(tags):
+    """Formato da resposta da API: {marca: {'score': ocorrências, 'spans': [[início, fim], ...]}}"""
+    return {
+        tag: {'score': len(spans), 'spans': [[start, end] for start, end in spans]}
+        for tag, spans in tags.items()
+    }
@@ -0,0 +1,330 @@
+"""
+Fila de jobs local para classificações pesadas (PDFs grandes, sincronização de caixa)
+Os jobs ficam em uma tabela SQLite (WAL), sem broker externo: POST /jobs só
+insere a linha e responde com o ID. Um pool de threads em cada worker retira
+jobs da fila, roda o handler do tipo do job e grava progresso e resultado.
+
+Retirar um job é uma transação IMMEDIATE (um único processo por vez) que o
+marca como 'running' e o torna invisível por `visibility_timeout` segundos.
+Se o worker morrer no meio, o job volta a ser visível depois desse prazo e
+outro worker o pega; o handler renova o prazo a cada atualização de progresso.
+O número da tentativa retirada funciona como lease: progresso, conclusão e
+falha só valem enquanto o job está 'running' naquela tentativa, então um
+worker que passou do prazo não sobrescreve o resultado de quem o pegou depois.
+Falhas voltam para a fila com espera exponencial até `max_attempts` tentativas.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    data BLOB,
+    result TEXT,
+    error TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, visible_at);
+"""
+
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class JobError(Exception):
+    """Falha definitiva: o job não é tentado de novo"""
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class JobQueue:
+    """Fila durável de jobs em SQLite, compartilhada entre processos"""
+
+    def __init__(self, path, visibility_timeout=300, max_attempts=3, retry_delay=2.0):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._local = threading.local()
+
+    def _connection(self):
+        # Uma conexão por thread e por processo (conexões não sobrevivem a fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def enqueue(self, kind, payload, data=None):
+        """Insere um job e retorna seu ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, status, payload, data, max_attempts, visible_at, created_at) "
+            "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), data, self.max_attempts, now, now)
+        )
+        return job_id
+
+    def claim(self):
+        """Retira o próximo job visível; retorna a linha ou None
+
+        Jobs 'running' com prazo de visibilidade vencido (worker morreu) voltam
+        a ser retirados; se já esgotaram as tentativas, são marcados como falha.
+        """
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            while True:
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status IN ('queued', 'running') AND visible_at <= ? "
+                    "ORDER BY visible_at LIMIT 1", (now,)
+                ).fetchone()
+                if row is None:
+                    connection.execute('COMMIT')
+                    return None
+                if row['status'] == 'running' and row['attempts'] >= row['max_attempts']:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        ('Prazo de visibilidade esgotado em todas as tentativas', now, row['id'])
+                    )
+                    continue
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, visible_at = ?, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (now + self.visibility_timeout, now, row['id'])
+                )
+                connection.execute('COMMIT')
+                return row
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def progress(self, job_id, value, attempts):
+        """Atualiza o progresso (0 a 1) e renova o prazo; retorna False se a tentativa perdeu o job"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET progress = ?, visible_at = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+            (min(max(value, 0.0), 1.0), time.time() + self.visibility_timeout, job_id, attempts)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, result, attempts):
+        """Grava o resultado da tentativa `attempts`; retorna False se ela já perdeu o job"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, progress = 1, data = NULL, "
+            "finished_at = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, attempts)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, error, attempts, retry=True):
+        """Registra a falha da tentativa `attempts`; retorna o novo status do job
+
+        'queued' se volta para a fila com espera exponencial, 'failed' se não
+        há mais tentativas e None se a tentativa já perdeu o job.
+        """
+        now = time.time()
+        if retry and attempts < self.max_attempts:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = 'queued', error = ?, visible_at = ? "
+                "WHERE id = ? AND status = 'running' AND attempts = ?",
+                (error, now + self.retry_delay * 2 ** (attempts - 1), job_id, attempts)
+            )
+            status = 'queued'
+        else:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = 'failed', error = ?, data = NULL, finished_at = ? "
+                "WHERE id = ? AND status = 'running' AND attempts = ?",
+                (error, now, job_id, attempts)
+            )
+            status = 'failed'
+        return status if cursor.rowcount == 1 else None
+
+    def get(self, job_id):
+        """Estado do job para a API, ou None se o ID não existir"""
+        row = self._connection().execute(
+            "SELECT id, kind, status, result, error, progress, attempts, max_attempts, created_at, "
+            "started_at, finished_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row['id'],
+            'type': row['kind'],
+            'status': row['status'],
+            'progress': round(row['progress'], 3),
+            'attempts': row['attempts'],
+            'max_attempts': row['max_attempts'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': _iso(row['created_at']),
+            'started_at': _iso(row['started_at']),
+            'finished_at': _iso(row['finished_at']),
+        }
+
+    def purge(self, older_than):
+        """Remove jobs terminados há mais de `older_than` segundos"""
+        cursor = self._connection().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - older_than,)
+        )
+        return cursor.rowcount
+
+    def metrics(self):
+        """Profundidade da fila por status, idade do job mais antigo e latências"""
+        connection = self._connection()
+        now = time.time()
+        depth = dict.fromkeys(STATUSES, 0)
+        for status, count in connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            depth[status] = count
+        oldest = connection.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        latency = connection.execute(
+            "SELECT AVG(started_at - created_at), AVG(finished_at - created_at), MAX(finished_at - created_at) "
+            "FROM (SELECT started_at, created_at, finished_at FROM jobs WHERE status = 'done' "
+            "ORDER BY finished_at DESC LIMIT 100)"
+        ).fetchone()
+        return {
+            'depth': depth,
+            'oldest_queued_seconds': round(now - oldest, 3) if oldest else None,
+            'recent_wait_seconds': round(latency[0], 3) if latency[0] is not None else None,
+            'recent_latency_seconds': round(latency[1], 3) if latency[1] is not None else None,
+            'recent_max_latency_seconds': round(latency[2], 3) if latency[2] is not None else None,
+        }
+
+
+class JobWorkerPool:
+    """Threads que processam a fila neste processo
+
+    `handlers` mapeia o tipo do job para `handler(payload, data, progress)`,
+    que retorna o resultado (serializável em JSON). `progress(valor)` grava o
+    andamento e renova o prazo de visibilidade. Um JobError falha o job sem
+    novas tentativas; qualquer outra exceção conta como tentativa. Se o prazo
+    venceu e outro worker pegou o job, o resultado desta tentativa é
+    descartado e conta em `lost`.
+    """
+
+    def __init__(self, queue, handlers, workers=2, poll_interval=1.0, retention=7 * 24 * 3600):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._last_purge = 0.0
+
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.lost = 0
+        self.busy = 0
+
+    def ensure_started(self):
+        """Inicia as threads neste processo (também após fork)"""
+        if self.workers <= 0:
+            return
+        if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._threads = []
+                self._pid = os.getpid()
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'job-worker-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            try:
+                if not self.run_once():
+                    time.sleep(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Erro no worker de jobs: {e}")
+                time.sleep(self.poll_interval)
+
+    def run_once(self):
+        """Processa um job, se houver; retorna True se processou"""
+        if self.retention and time.time() - self._last_purge > 3600:
+            self._last_purge = time.time()
+            self.queue.purge(self.retention)
+
+        row = self.queue.claim()
+        if row is None:
+            return False
+        job_id, kind = row['id'], row['kind']
+        # Tentativa retirada por `claim`: o lease desta execução
+        attempts = row['attempts'] + 1
+        handler = self.handlers.get(kind)
+        self.busy += 1
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise JobError(f'Tipo de job desconhecido: {kind}')
+            result = handler(json.loads(row['payload']), row['data'],
+                             lambda value: self.queue.progress(job_id, value, attempts))
+        except JobError as e:
+            status = self.queue.fail(job_id, str(e), attempts, retry=False)
+            if status is not None:
+                self.failed += 1
+                logger.warning(f"Job {job_id} ({kind}) falhou: {e}")
+        except Exception as e:
+            status = self.queue.fail(job_id, str(e), attempts)
+            if status == 'queued':
+                self.retried += 1
+                logger.warning(f"Job {job_id} ({kind}) falhou, nova tentativa agendada: {e}")
+            elif status == 'failed':
+                self.failed += 1
+                logger.error(f"Job {job_id} ({kind}) falhou após {attempts} tentativa(s): {e}")
+        else:
+            status = 'done' if self.queue.complete(job_id, result, attempts) else None
+            if status is not None:
+                self.processed += 1
+                logger.info(f"Job {job_id} ({kind}) concluído em {(time.perf_counter() - start) * 1000:.1f} ms")
+        finally:
+            self.busy -= 1
+        if status is None:
+            self.lost += 1
+            logger.warning(f"Job {job_id} ({kind}): tentativa {attempts} perdeu o job (prazo de visibilidade "
+                           f"vencido), resultado descartado")
+        return True
+
+    def metrics(self):
+        """Contadores do pool deste worker"""
+        return {
+            'pid': os.getpid(),
+            'threads': sum(1 for thread in self._threads if thread.is_alive()) if self._pid == os.getpid() else 0,
+            'busy': self.busy,
+            'processed': self.processed,
+            'failed': self.failed,
+            'retried': self.retried,
+            'lost': self.lost,
+        }
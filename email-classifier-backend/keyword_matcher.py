@@ -0,0 +1,71 @@
+"""
+Busca de múltiplas palavras-chave em uma única passada sobre o texto
+As palavras são compiladas em uma regex em forma de trie (prefixos fatorados),
+então o custo por caractere não cresce com o número de palavras-chave
+"""
+
+import re
+
+
+def _trie_pattern(words):
+    """Monta uma regex com prefixos compartilhados a partir das palavras"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1:
+            body = branches[0]
+            if terminal:
+                return f'(?:{body})?'
+            return body
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if terminal else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Encontra quais palavras-chave aparecem como substring de um texto
+
+    Equivale a `{kw for kw in keywords if kw in text}`, mas com uma única
+    varredura do texto. Em cada posição a regex casa a palavra mais longa; as
+    palavras que são prefixo dela vêm de uma tabela pré-calculada.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(sorted({kw.lower() for kw in keywords if kw}))
+        if self.keywords:
+            self._regex = re.compile('(?=(' + _trie_pattern(self.keywords) + '))')
+        else:
+            self._regex = None
+        # Palavras-chave que são prefixo de cada palavra-chave (inclui ela mesma)
+        self._prefixes = {
+            kw: tuple(other for other in self.keywords if kw.startswith(other))
+            for kw in self.keywords
+        }
+
+    def find(self, text_lower):
+        """Retorna o conjunto de palavras-chave presentes no texto (já em minúsculas)"""
+        if self._regex is None:
+            return set()
+        hits = set()
+        for match in self._regex.finditer(text_lower):
+            hits.update(self._prefixes[match.group(1)])
+        return hits
+
+    def finditer(self, text_lower):
+        """Gera (palavra-chave, início, fim) para cada ocorrência no texto"""
+        if self._regex is None:
+            return
+        for match in self._regex.finditer(text_lower):
+            start = match.start()
+            for keyword in self._prefixes[match.group(1)]:
+                yield keyword, start, start + len(keyword)
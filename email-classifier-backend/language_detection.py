@@ -0,0 +1,105 @@
+"""
+Detecção rápida de idioma (português / inglês)
+Conta, no início do texto, n-gramas de caracteres característicos de cada
+idioma. Todos os n-gramas começam em início de palavra (espaço), então cada
+perfil vira uma regex em trie com prefixo literal: o motor de regex salta
+direto de espaço em espaço e a detecção custa poucos microssegundos, sem
+tokenização. O espaço do fim de palavra é só verificado (lookahead), então
+continua disponível como início da palavra seguinte. Sem nenhum n-grama (ou
+em empate), palavras típicas de email de cada idioma desempatam.
+"""
+
+import re
+
+from keyword_matcher import _trie_pattern
+
+# N-gramas de início de palavra frequentes em um idioma e raros no outro
+# (um espaço final marca fim de palavra)
+LANGUAGE_NGRAMS = {
+    'pt': (
+        'não', 'de ', 'do ', 'da ', 'dos ', 'das ', 'que ', 'para ', 'com ', 'uma ', 'um ',
+        'os ', 'as ', 'em ', 'no ', 'na ', 'por ', 'se ', 'pelo', 'pela', 'você', 'está',
+        'ao ', 'às ', 'é ', 'o ', 'nós', 'seu ', 'sua ', 'obrigad', 'também', 'muito', 'mais ',
+    ),
+    'en': (
+        'the ', 'and ', 'th', 'of ', 'to ', 'is ', 'you', 'for ', 'we ', 'be ', 'with ', 'wh',
+        'it ', 'are ', 'this ', 'that ', 'have ', 'will ', 'our ', 'your ', 'please', 'on ',
+        'in ', 'at ', 'can ', 'was ', 'an ', 'my ', 'thank', 'would', 'could', 'should',
+    ),
+}
+# "a" e "i" ficam de fora: "a" é também a palavra mais comum do português
+
+# Desempate: palavras inteiras comuns em emails curtos ("Urgent: system down",
+# "Order status?", "Feliz natal!"); palavras dos dois idiomas (status, bug) ficam de fora
+TIEBREAK_WORDS = {
+    'pt': (
+        'urgente', 'problema', 'erro', 'falha', 'ajuda', 'dúvida', 'pedido', 'sistema', 'fora',
+        'pagamento', 'fatura', 'boleto', 'senha', 'relatório', 'reunião', 'contrato', 'prazo',
+        'feliz', 'natal', 'parabéns', 'obrigado', 'obrigada', 'bom', 'boa', 'dia', 'tarde', 'noite',
+        'olá', 'oi', 'prezado', 'prezada', 'hoje', 'amanhã', 'semana', 'equipe', 'todos', 'aniversário',
+    ),
+    'en': (
+        'urgent', 'issue', 'problem', 'error', 'failure', 'help', 'question', 'order', 'system', 'down',
+        'payment', 'invoice', 'password', 'report', 'update', 'contract', 'request', 'need',
+        'happy', 'merry', 'christmas', 'birthday', 'congratulations', 'thanks', 'good', 'morning',
+        'hello', 'hi', 'dear', 'today', 'tomorrow', 'week', 'team', 'all', 'everyone', 'new', 'year',
+    ),
+}
+# Caracteres acentuados contam a favor do português
+DIACRITICS = {'pt': 'ãõçáéíóúâêôà'}
+
+
+class LanguageDetector:
+    """Escolhe o idioma com mais n-gramas característicos na amostra do texto"""
+
+    def __init__(self, profiles=None, default='pt', sample_size=160, diacritics=None, tiebreak_words=None):
+        profiles = profiles or LANGUAGE_NGRAMS
+        diacritics = DIACRITICS if diacritics is None else diacritics
+        tiebreak_words = TIEBREAK_WORDS if tiebreak_words is None else tiebreak_words
+        self.default = default
+        self.sample_size = sample_size
+        self.languages = tuple(profiles)
+        self._patterns = []
+        for language, ngrams in profiles.items():
+            words = [ngram[:-1] for ngram in ngrams if ngram.endswith(' ')]
+            prefixes = [ngram for ngram in ngrams if not ngram.endswith(' ')]
+            branches = []
+            if words:
+                branches.append('(?:' + _trie_pattern(words) + ')(?= )')
+            if prefixes:
+                branches.append(_trie_pattern(prefixes))
+            pattern = ' (?:' + '|'.join(branches) + ')'
+            if diacritics.get(language):
+                pattern += '|[' + re.escape(diacritics[language]) + ']'
+            self._patterns.append((language, re.compile(pattern)))
+        self._tiebreak = [
+            (language, re.compile(r'\b(?:' + _trie_pattern(words) + r')\b'))
+            for language, words in tiebreak_words.items() if words
+        ]
+
+    def scores(self, text):
+        """Número de n-gramas de cada idioma encontrados na amostra"""
+        sample = ' ' + text[:self.sample_size].lower().replace('\n', ' ') + ' '
+        return {language: len(pattern.findall(sample)) for language, pattern in self._patterns}
+
+    def tiebreak_scores(self, text):
+        """Número de palavras de desempate de cada idioma na amostra"""
+        sample = text[:self.sample_size].lower()
+        return {language: len(pattern.findall(sample)) for language, pattern in self._tiebreak}
+
+    def detect(self, text):
+        """Idioma do texto; empates vão às palavras de desempate e, sem sinal, ao idioma padrão"""
+        language = self._best(self.scores(text))
+        if language is None:
+            language = self._best(self.tiebreak_scores(text))
+        return language or self.default
+
+    def _best(self, scores):
+        """Idioma com o maior score, ou None se não houver um único"""
+        best_language, best_score = None, 0
+        for language, score in scores.items():
+            if score > best_score:
+                best_language, best_score = language, score
+            elif score == best_score:
+                best_language = None
+        return best_language
@@ -0,0 +1,592 @@
+"""
+Motor de classificação linear esparso (Naive Bayes multinomial ou regressão logística)
+Treinado sobre os tokens de `EmailClassifier.fast_preprocess` (os mesmos de
+`preprocess_text`, sem o tokenizador do NLTK); a inferência é um produto
+escalar esparso entre o vetor de features e os pesos do modelo
+"""
+
+import json
+import math
+import re
+import zlib
+from array import array
+
+LABELS = ('Improdutivo', 'Produtivo')
+MODEL_FORMAT = 'linear-model'
+MODEL_VERSION = 1
+
+
+class LinearModelError(ValueError):
+    """Arquivo de modelo inválido ou incompatível"""
+
+
+def count_tokens(tokens):
+    """Conta as ocorrências de cada token"""
+    counts = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+class VocabularyVectorizer:
+    """Mapeia termos para índices de colunas a partir de um vocabulário
+
+    Durante o treino o vocabulário cresce (`fit_transform`); na inferência,
+    termos desconhecidos são ignorados (`transform`).
+    """
+
+    name = 'vocabulary'
+
+    def __init__(self, terms=()):
+        self.terms = list(terms)
+        self.index = {term: i for i, term in enumerate(self.terms)}
+
+    @property
+    def n_features(self):
+        return len(self.terms)
+
+    def transform(self, tokens, text=None):
+        """Retorna (índices, valores) do vetor esparso de contagens"""
+        index = self.index
+        indices = []
+        values = []
+        for term, count in count_tokens(tokens).items():
+            column = index.get(term)
+            if column is not None:
+                indices.append(column)
+                values.append(float(count))
+        return indices, values
+
+    def fit_transform(self, tokens, text=None):
+        """Como `transform`, mas adiciona termos novos ao vocabulário"""
+        index = self.index
+        indices = []
+        values = []
+        for term, count in count_tokens(tokens).items():
+            column = index.get(term)
+            if column is None:
+                column = len(self.terms)
+                index[term] = column
+                self.terms.append(term)
+            indices.append(column)
+            values.append(float(count))
+        return indices, values
+
+    def feature_values(self, tokens, text=None):
+        """Valor de cada feature por termo: a chave vale em qualquer cópia do modelo"""
+        return {term: float(count) for term, count in count_tokens(tokens).items()}
+
+    def column(self, key, grow=False):
+        """Coluna do termo; com `grow`, termos novos entram no vocabulário"""
+        column = self.index.get(key)
+        if column is None and grow:
+            column = len(self.terms)
+            self.index[key] = column
+            self.terms.append(key)
+        return column
+
+    def to_dict(self):
+        return {'type': self.name, 'terms': self.terms}
+
+
+class HashingVectorizer:
+    """Vetorizador por feature hashing, com memória fixa e sem vocabulário
+
+    Unigramas, bigramas e as flags dos padrões regex do classificador são
+    mapeados para 2^n_bits colunas por CRC32. Com `signed`, um bit do hash
+    define o sinal do valor, e colisões tendem a se cancelar em vez de se
+    acumular. Não há passo de ajuste: `fit_transform` é igual a `transform`.
+    """
+
+    name = 'hashing'
+
+    def __init__(self, n_bits=18, signed=True, ngram_range=(1, 2), patterns=()):
+        if not 1 <= n_bits <= 30:
+            raise LinearModelError("n_bits deve estar entre 1 e 30")
+        self.n_bits = n_bits
+        self.signed = signed
+        self.ngram_range = tuple(ngram_range)
+        self.patterns = list(patterns)
+        self._compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.patterns]
+        self._mask = (1 << n_bits) - 1
+
+    @property
+    def n_features(self):
+        return 1 << self.n_bits
+
+    def _features(self, tokens, text):
+        low, high = self.ngram_range
+        if low <= 1 <= high:
+            yield from tokens
+        if low <= 2 <= high:
+            for i in range(len(tokens) - 1):
+                yield tokens[i] + ' ' + tokens[i + 1]
+        if text is not None:
+            for i, pattern in enumerate(self._compiled_patterns):
+                if pattern.search(text):
+                    yield f'#pattern:{i}'
+
+    def transform(self, tokens, text=None):
+        """Retorna (índices, valores) como arrays planos ('i' e 'd')"""
+        mask = self._mask
+        signed = self.signed
+        accumulated = {}
+        for feature in self._features(tokens, text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            column = h & mask
+            value = -1.0 if signed and h & 0x80000000 else 1.0
+            accumulated[column] = accumulated.get(column, 0.0) + value
+        return array('i', accumulated.keys()), array('d', accumulated.values())
+
+    fit_transform = transform
+
+    def feature_values(self, tokens, text=None):
+        """Valor de cada feature por coluna (o hash já é estável entre cópias)"""
+        indices, values = self.transform(tokens, text)
+        return dict(zip(indices, values))
+
+    def column(self, key, grow=False):
+        return key
+
+    def to_dict(self):
+        return {
+            'type': self.name,
+            'n_bits': self.n_bits,
+            'signed': self.signed,
+            'ngram_range': list(self.ngram_range),
+            'patterns': self.patterns,
+        }
+
+
+class CSRMatrix:
+    """Matriz esparsa em formato CSR (linhas comprimidas) sobre arrays planos"""
+
+    def __init__(self):
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+        self.data = array('d')
+
+    @property
+    def n_rows(self):
+        return len(self.indptr) - 1
+
+    def append_row(self, indices, values):
+        self.indices.extend(indices)
+        self.data.extend(values)
+        self.indptr.append(len(self.indices))
+
+    def dot(self, weights, bias=0.0):
+        """Produto matriz-vetor: um score por linha"""
+        indptr, indices, data = self.indptr, self.indices, self.data
+        n_weights = len(weights)
+        scores = array('d')
+        for row in range(self.n_rows):
+            score = bias
+            for k in range(indptr[row], indptr[row + 1]):
+                column = indices[k]
+                if column < n_weights:
+                    score += weights[column] * data[k]
+            scores.append(score)
+        return scores
+
+
+class NaiveBayesModel:
+    """Naive Bayes multinomial binário expresso como modelo linear
+
+    Guarda as contagens por classe (permitindo treino incremental) e deriva os
+    pesos w_j = log P(j | Produtivo) - log P(j | Improdutivo) e o viés a partir
+    das probabilidades a priori.
+    """
+
+    name = 'naive_bayes'
+
+    def __init__(self, alpha=1.0, n_features=0):
+        self.alpha = alpha
+        self.class_counts = [0, 0]
+        self.feature_counts = (array('d'), array('d'))
+        self.totals = [0.0, 0.0]
+        self.weights = array('d')
+        self.bias = 0.0
+        self._grow(n_features)
+
+    def _grow(self, n_features):
+        for counts in self.feature_counts:
+            if len(counts) < n_features:
+                counts.extend([0.0] * (n_features - len(counts)))
+
+    def partial_fit(self, indices, values, label_index, n_features):
+        """Acumula as contagens de um exemplo rotulado"""
+        self._grow(n_features)
+        counts = self.feature_counts[label_index]
+        total = 0.0
+        for column, value in zip(indices, values):
+            if value < 0:
+                raise LinearModelError("Naive Bayes exige valores não negativos (use hashing sem sinal)")
+            counts[column] += value
+            total += value
+        self.totals[label_index] += total
+        self.class_counts[label_index] += 1
+
+    def finalize(self):
+        """Recalcula pesos e viés a partir das contagens"""
+        n_features = max(len(self.feature_counts[0]), len(self.feature_counts[1]))
+        self._grow(n_features)
+        alpha = self.alpha
+        negative, positive = self.feature_counts
+        denominator_neg = self.totals[0] + alpha * n_features
+        denominator_pos = self.totals[1] + alpha * n_features
+        log_ratio = math.log(denominator_neg / denominator_pos) if n_features else 0.0
+        self.weights = array('d', (
+            math.log((positive[j] + alpha) / (negative[j] + alpha)) + log_ratio
+            for j in range(n_features)
+        ))
+        n_neg, n_pos = self.class_counts
+        self.bias = math.log((n_pos + 1) / (n_neg + 1))
+        return self
+
+    def delta(self, rows, vectorizer):
+        """Contagens de `rows` [(valores por feature, índice do rótulo)] sem alterar o modelo"""
+        counts = ({}, {})
+        class_counts = [0, 0]
+        totals = [0.0, 0.0]
+        for values, label_index in rows:
+            target = counts[label_index]
+            for key, value in values.items():
+                if value < 0:
+                    raise LinearModelError("Naive Bayes exige valores não negativos (use hashing sem sinal)")
+                target[key] = target.get(key, 0.0) + value
+                totals[label_index] += value
+            class_counts[label_index] += 1
+        return {
+            'type': self.name,
+            'class_counts': class_counts,
+            'totals': totals,
+            'counts': [list(counts[0].items()), list(counts[1].items())],
+        }
+
+    def apply_delta(self, delta, vectorizer):
+        """Soma as contagens de um delta (chame `finalize` depois)"""
+        for label_index, pairs in enumerate(delta['counts']):
+            counts = self.feature_counts[label_index]
+            for key, value in pairs:
+                column = vectorizer.column(key, grow=True)
+                if column >= len(counts):
+                    self._grow(column + 1)
+                counts[column] += value
+        for label_index in (0, 1):
+            self.class_counts[label_index] += delta['class_counts'][label_index]
+            self.totals[label_index] += delta['totals'][label_index]
+
+    def decision(self, indices, values):
+        """Score linear de um vetor esparso (positivo = Produtivo)"""
+        weights = self.weights
+        n_weights = len(weights)
+        score = self.bias
+        for column, value in zip(indices, values):
+            if column < n_weights:
+                score += weights[column] * value
+        return score
+
+    def to_dict(self):
+        return {
+            'type': self.name,
+            'alpha': self.alpha,
+            'class_counts': self.class_counts,
+            'totals': self.totals,
+            'feature_counts': [list(self.feature_counts[0]), list(self.feature_counts[1])],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls(alpha=data['alpha'])
+        model.class_counts = list(data['class_counts'])
+        model.totals = list(data['totals'])
+        model.feature_counts = (array('d', data['feature_counts'][0]), array('d', data['feature_counts'][1]))
+        return model.finalize()
+
+
+class LogisticRegressionModel:
+    """Regressão logística binária treinada por SGD em streaming
+
+    Os pesos têm tamanho fixo (o número de colunas do vetorizador) e cada
+    exemplo atualiza só as colunas presentes nele, com regularização L2
+    aplicada de forma preguiçosa nessas mesmas colunas.
+    """
+
+    name = 'logistic_regression'
+
+    def __init__(self, n_features=0, learning_rate=0.1, l2=1e-6, decay=1e-4):
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.decay = decay
+        self.weights = array('d', bytes(8 * n_features))
+        self.bias = 0.0
+        self.examples = 0
+
+    def partial_fit(self, indices, values, label_index, n_features):
+        """Um passo de SGD com o exemplo rotulado"""
+        if len(self.weights) < n_features:
+            self.weights.extend([0.0] * (n_features - len(self.weights)))
+        weights = self.weights
+        score = self.decision(indices, values)
+        probability = 1.0 / (1.0 + math.exp(-max(min(score, 50.0), -50.0)))
+        gradient = probability - label_index
+        rate = self.learning_rate / (1.0 + self.decay * self.examples)
+        for column, value in zip(indices, values):
+            weights[column] -= rate * (gradient * value + self.l2 * weights[column])
+        self.bias -= rate * gradient
+        self.examples += 1
+
+    def delta(self, rows, vectorizer):
+        """Passos de SGD de `rows` como variações de peso por feature, sem alterar o modelo
+
+        Dá o mesmo resultado de `partial_fit` exemplo a exemplo sobre esta cópia.
+        """
+        weights = self.weights
+        n_weights = len(weights)
+        changes = {}
+        bias = 0.0
+        for i, (values, label_index) in enumerate(rows):
+            current = {}
+            score = self.bias + bias
+            for key, value in values.items():
+                column = vectorizer.column(key)
+                weight = weights[column] if column is not None and column < n_weights else 0.0
+                weight += changes.get(key, 0.0)
+                current[key] = weight
+                score += weight * value
+            probability = 1.0 / (1.0 + math.exp(-max(min(score, 50.0), -50.0)))
+            gradient = probability - label_index
+            rate = self.learning_rate / (1.0 + self.decay * (self.examples + i))
+            for key, value in values.items():
+                changes[key] = changes.get(key, 0.0) - rate * (gradient * value + self.l2 * current[key])
+            bias -= rate * gradient
+        return {'type': self.name, 'examples': len(rows), 'bias': bias, 'weights': list(changes.items())}
+
+    def apply_delta(self, delta, vectorizer):
+        """Soma as variações de peso de um delta"""
+        weights = self.weights
+        for key, change in delta['weights']:
+            column = vectorizer.column(key, grow=True)
+            if column >= len(weights):
+                weights.extend([0.0] * (column + 1 - len(weights)))
+            weights[column] += change
+        self.bias += delta['bias']
+        self.examples += delta['examples']
+
+    def finalize(self):
+        return self
+
+    def decision(self, indices, values):
+        """Score linear de um vetor esparso (positivo = Produtivo)"""
+        weights = self.weights
+        n_weights = len(weights)
+        score = self.bias
+        for column, value in zip(indices, values):
+            if column < n_weights:
+                score += weights[column] * value
+        return score
+
+    def to_dict(self):
+        nonzero = [j for j, weight in enumerate(self.weights) if weight]
+        return {
+            'type': self.name,
+            'learning_rate': self.learning_rate,
+            'l2': self.l2,
+            'decay': self.decay,
+            'examples': self.examples,
+            'bias': self.bias,
+            'n_features': len(self.weights),
+            'indices': nonzero,
+            'values': [self.weights[j] for j in nonzero],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls(data['n_features'], data['learning_rate'], data['l2'], data['decay'])
+        model.examples = data['examples']
+        model.bias = data['bias']
+        for column, weight in zip(data['indices'], data['values']):
+            model.weights[column] = weight
+        return model
+
+
+class FrozenLinearModel:
+    """Modelo somente leitura: só pesos e viés, sem contagens nem treino"""
+
+    def __init__(self, name, weights, bias):
+        self.name = name
+        self.weights = weights
+        self.bias = bias
+
+    def decision(self, indices, values):
+        weights = self.weights
+        n_weights = len(weights)
+        score = self.bias
+        for column, value in zip(indices, values):
+            if column < n_weights:
+                score += weights[column] * value
+        return score
+
+    def finalize(self):
+        return self
+
+
+MODELS = {model.name: model for model in (NaiveBayesModel, LogisticRegressionModel)}
+VECTORIZERS = {vectorizer.name: vectorizer for vectorizer in (VocabularyVectorizer, HashingVectorizer)}
+
+
+def score_to_prediction(score):
+    """Converte o score linear em (categoria, confiança)"""
+    if score >= 0:
+        probability = 1.0 / (1.0 + math.exp(-min(score, 50.0)))
+    else:
+        probability = 1.0 - 1.0 / (1.0 + math.exp(max(score, -50.0)))
+    category = LABELS[1] if score > 0 else LABELS[0]
+    return category, max(probability, 1.0 - probability)
+
+
+class BatchPredictions:
+    """Predições de um lote em colunas: índice do rótulo (int8), confiança (float64) e texto pré-processado
+
+    Um lote de N emails ocupa dois arrays e uma lista, em vez de N tuplas com
+    um float cada; a categoria é o índice em LABELS.
+    """
+
+    __slots__ = ('labels', 'confidences', 'preprocessed')
+
+    def __init__(self, preprocessed):
+        self.labels = array('b')
+        self.confidences = array('d')
+        self.preprocessed = preprocessed
+
+    def append_score(self, score):
+        category, confidence = score_to_prediction(score)
+        self.labels.append(LABELS.index(category))
+        self.confidences.append(confidence)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, i):
+        return LABELS[self.labels[i]], self.confidences[i], self.preprocessed[i]
+
+    def __iter__(self):
+        for label, confidence, processed in zip(self.labels, self.confidences, self.preprocessed):
+            yield LABELS[label], confidence, processed
+
+
+class LinearEngine:
+    """Classificador linear sobre os tokens do pré-processamento do EmailClassifier"""
+
+    def __init__(self, preprocess, vectorizer=None, model=None):
+        self.preprocess = preprocess
+        self.vectorizer = vectorizer or VocabularyVectorizer()
+        self.model = model or NaiveBayesModel()
+
+    def tokens(self, text):
+        return self.preprocess(text).split()
+
+    def learn(self, text, category):
+        """Treina com um exemplo rotulado (chame `finalize` ao final)"""
+        indices, values = self.vectorizer.fit_transform(self.tokens(text), text)
+        self.model.partial_fit(indices, values, LABELS.index(category), self.vectorizer.n_features)
+
+    def finalize(self):
+        self.model.finalize()
+        return self
+
+    def delta(self, examples):
+        """Delta de treino de [(texto, categoria)], sem alterar o modelo
+
+        As features são identificadas por termo (vocabulário) ou coluna
+        (hashing), então o delta vale para qualquer cópia do mesmo modelo e pode
+        ser gravado em JSON e aplicado por outro processo com `apply_delta`.
+        """
+        vectorizer = self.vectorizer
+        rows = [(vectorizer.feature_values(self.tokens(text), text), LABELS.index(category))
+                for text, category in examples]
+        return self.model.delta(rows, vectorizer)
+
+    def apply_delta(self, delta):
+        """Incorpora um delta gerado por `delta` nesta ou em outra cópia (chame `finalize` depois)"""
+        if delta.get('type') != self.model.name:
+            raise LinearModelError(f"Delta de {delta.get('type')} não se aplica a {self.model.name}")
+        self.model.apply_delta(delta, self.vectorizer)
+
+    def snapshot(self):
+        """Cópia somente leitura para servir requisições enquanto esta continua treinando"""
+        model = FrozenLinearModel(self.model.name, array('d', self.model.weights), self.model.bias)
+        return LinearEngine(self.preprocess, self.vectorizer, model)
+
+    def predict(self, text):
+        """Retorna (categoria, confiança, texto pré-processado)"""
+        preprocessed = self.preprocess(text)
+        indices, values = self.vectorizer.transform(preprocessed.split(), text)
+        category, confidence = score_to_prediction(self.model.decision(indices, values))
+        return category, confidence, preprocessed
+
+    def predict_batch(self, texts):
+        """Classifica vários textos montando uma matriz CSR e um único produto matriz-vetor
+
+        Retorna um BatchPredictions (colunas paralelas); iterar devolve
+        (categoria, confiança, texto pré-processado) como em `predict`.
+        """
+        matrix = CSRMatrix()
+        preprocessed = []
+        for text in texts:
+            processed = self.preprocess(text)
+            preprocessed.append(processed)
+            matrix.append_row(*self.vectorizer.transform(processed.split(), text))
+        predictions = BatchPredictions(preprocessed)
+        for score in matrix.dot(self.model.weights, self.model.bias):
+            predictions.append_score(score)
+        return predictions
+
+    def save(self, path):
+        """Grava o modelo em JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': MODEL_FORMAT,
+                'version': MODEL_VERSION,
+                'labels': list(LABELS),
+                'vectorizer': self.vectorizer.to_dict(),
+                'model': self.model.to_dict(),
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, preprocess):
+        """Carrega um modelo gravado por `save`"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise LinearModelError(f"Não foi possível ler o modelo {path}: {e}") from e
+
+        if not isinstance(data, dict):
+            raise LinearModelError(f"Modelo {path} inválido: esperado um objeto JSON")
+        if data.get('format') != MODEL_FORMAT or data.get('version') != MODEL_VERSION:
+            raise LinearModelError(
+                f"Modelo {path} incompatível: formato {data.get('format')} v{data.get('version')}"
+            )
+        try:
+            vectorizer_data = data['vectorizer']
+            model_data = data['model']
+            if vectorizer_data.get('type') not in VECTORIZERS:
+                raise LinearModelError(f"Vetorizador desconhecido: {vectorizer_data.get('type')}")
+            if model_data.get('type') not in MODELS:
+                raise LinearModelError(f"Tipo de modelo desconhecido: {model_data.get('type')}")
+
+            if vectorizer_data['type'] == HashingVectorizer.name:
+                vectorizer = HashingVectorizer(
+                    vectorizer_data['n_bits'], vectorizer_data['signed'],
+                    vectorizer_data['ngram_range'], vectorizer_data['patterns'],
+                )
+            else:
+                vectorizer = VocabularyVectorizer(vectorizer_data['terms'])
+            return cls(preprocess, vectorizer, MODELS[model_data['type']].from_dict(model_data))
+        except LinearModelError:
+            raise
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            # Campo ausente ou com tipo errado: o app trata como modelo indisponível
+            raise LinearModelError(f"Modelo {path} inválido: {type(e).__name__}: {e}") from e
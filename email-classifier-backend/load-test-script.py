@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga para a API de Classificação de Emails
+Dispara requisições em modelo de chegada aberto (open-loop) contra /classify
+e /classify-file, medindo vazão, percentis de latência e taxa de erro
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from pdf_utils import build_text_pdf
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.join(BACKEND_DIR, 'perf-results', 'load')
+RESULTS_FORMAT_VERSION = 1
+
+SAMPLE_EMAILS = [
+    "Estou com problema urgente no sistema de login. Preciso de ajuda imediatamente!",
+    "Parabéns pela excelente apresentação! Foi muito inspiradora.",
+    "Boa tarde! Gostaria de saber o status do meu pedido #12345. Quando ficará pronto?",
+    "Muito obrigado pela ajuda de ontem. Vocês são fantásticos!",
+    "Feliz Natal para toda equipe! Que 2024 seja um ano próspero para todos.",
+    "Prezados, segue em anexo o relatório mensal. Por favor, aprovem até sexta-feira, "
+    "pois o prazo do contrato com o cliente vence na próxima semana.",
+]
+
+# Pesos da carga mista (proporção de cada tipo de requisição)
+MIXED_WEIGHTS = {
+    'classify': 0.6,
+    'file-txt': 0.25,
+    'file-pdf': 0.15,
+}
+
+WORKLOADS = ['classify', 'file-txt', 'file-pdf', 'mixed']
+
+_thread_local = threading.local()
+
+
+def get_session():
+    """Retorna uma sessão HTTP por thread (reaproveita conexões)"""
+    if not hasattr(_thread_local, 'session'):
+        _thread_local.session = requests.Session()
+    return _thread_local.session
+
+
+def build_payloads():
+    """Pré-gera os corpos das requisições para não medir a geração no teste"""
+    return {
+        'classify': [{'json': {'text': text}} for text in SAMPLE_EMAILS],
+        'file-txt': [
+            {'files': {'file': (f'email_{i}.txt', text.encode('utf-8'), 'text/plain')}}
+            for i, text in enumerate(SAMPLE_EMAILS)
+        ],
+        'file-pdf': [
+            {'files': {'file': (f'email_{i}.pdf', build_text_pdf(text), 'application/pdf')}}
+            for i, text in enumerate(SAMPLE_EMAILS)
+        ],
+    }
+
+
+def build_schedule(workload, rate, duration, arrival, rng):
+    """Calcula os instantes de envio (relativos ao início) e o tipo de cada requisição"""
+    schedule = []
+    kinds = list(MIXED_WEIGHTS)
+    weights = [MIXED_WEIGHTS[k] for k in kinds]
+    t = 0.0
+    while True:
+        if arrival == 'poisson':
+            t += rng.expovariate(rate)
+        else:
+            t += 1.0 / rate
+        if t >= duration:
+            break
+        kind = rng.choices(kinds, weights)[0] if workload == 'mixed' else workload
+        schedule.append((t, kind))
+    return schedule
+
+
+def percentile(sorted_values, pct):
+    """Percentil pelo método nearest-rank"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, wall_time):
+    """Agrega as amostras de latência em vazão, percentis e taxa de erro"""
+    total = len(samples)
+    errors = sum(1 for s in samples if not s['ok'])
+    latencies = sorted(s['latency'] for s in samples if s['ok'])
+    service = sorted(s['service_time'] for s in samples if s['ok'])
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'throughput_rps': round((total - errors) / wall_time, 2) if wall_time > 0 else 0.0,
+        'latency_ms': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'p99.9': ms(percentile(latencies, 99.9)),
+            'max': ms(latencies[-1]) if latencies else None,
+        },
+        'service_time_ms': {
+            'p50': ms(percentile(service, 50)),
+            'p99': ms(percentile(service, 99)),
+        },
+    }
+
+
+def run_load(base_url, workload, rate, duration, concurrency, arrival, seed, timeout):
+    """Executa a carga em modelo open-loop e retorna o resumo por tipo de requisição
+
+    A latência é medida a partir do instante *agendado* de envio, e não do
+    instante em que uma thread ficou livre, para não esconder filas
+    (coordinated omission) quando o servidor fica lento.
+    """
+    rng = random.Random(seed)
+    payloads = build_payloads()
+    schedule = build_schedule(workload, rate, duration, arrival, rng)
+    endpoints = {'classify': '/classify', 'file-txt': '/classify-file', 'file-pdf': '/classify-file'}
+
+    samples = []
+    samples_lock = threading.Lock()
+
+    def send(intended_start, kind, payload):
+        sent_at = time.perf_counter()
+        ok = False
+        status = None
+        try:
+            response = get_session().post(f"{base_url}{endpoints[kind]}", timeout=timeout, **payload)
+            status = response.status_code
+            ok = status == 200
+        except requests.exceptions.RequestException:
+            pass
+        done_at = time.perf_counter()
+        with samples_lock:
+            samples.append({
+                'kind': kind,
+                'ok': ok,
+                'status': status,
+                'latency': done_at - intended_start,
+                'service_time': done_at - sent_at,
+            })
+
+    print(f"🚦 {len(schedule)} requisições agendadas ({workload}, {rate} req/s, {duration}s, "
+          f"concorrência máx. {concurrency}, chegadas {arrival})")
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    start = time.perf_counter()
+    for offset, kind in schedule:
+        intended = start + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        payload = rng.choice(payloads[kind])
+        executor.submit(send, intended, kind, payload)
+    executor.shutdown(wait=True)
+    wall_time = time.perf_counter() - start
+
+    results = {'all': summarize(samples, wall_time)}
+    for kind in sorted({s['kind'] for s in samples}):
+        results[kind] = summarize([s for s in samples if s['kind'] == kind], wall_time)
+    return results
+
+
+def find_free_port():
+    """Escolhe uma porta TCP livre na interface local"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_healthy(base_url, timeout=30):
+    """Aguarda o /health responder antes de iniciar a carga"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def start_inprocess_server(port):
+    """Sobe o app Flask em uma thread deste processo"""
+    from werkzeug.serving import make_server
+    sys.path.insert(0, BACKEND_DIR)
+    import app as app_module
+
+    server = make_server('127.0.0.1', port, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.shutdown
+
+
+def start_gunicorn_server(port, workers):
+    """Sobe o app com gunicorn local, como no Procfile"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--timeout', '120', '--log-level', 'warning'],
+        cwd=BACKEND_DIR,
+    )
+
+    def stop():
+        process.terminate()
+        process.wait(timeout=10)
+
+    return stop
+
+
+def current_commit():
+    """Hash curto do commit atual (para comparar execuções entre commits)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(output_dir, config, results):
+    """Grava o resultado da execução em JSON"""
+    os.makedirs(output_dir, exist_ok=True)
+    commit = current_commit()
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(output_dir, f"{stamp}-{commit}-{config['workload']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': RESULTS_FORMAT_VERSION,
+            'timestamp': datetime.now().isoformat(),
+            'commit': commit,
+            'config': config,
+            'results': results,
+        }, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def print_results(results):
+    """Mostra o resumo da execução"""
+    print(f"\n📊 {'Tipo':<10} {'Req':>6} {'Erro %':>7} {'Req/s':>8} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8} {'p99.9':>8}  (ms)")
+    for kind, summary in results.items():
+        lat = summary['latency_ms']
+        print(f"   {kind:<10} {summary['requests']:>6} {summary['error_rate'] * 100:>6.2f}% "
+              f"{summary['throughput_rps']:>8.1f} "
+              + ' '.join(f"{(lat[p] if lat[p] is not None else float('nan')):>8.1f}"
+                         for p in ('p50', 'p95', 'p99', 'p99.9')))
+
+
+def compare_runs(output_dir, workload=None):
+    """Lista as execuções salvas lado a lado para comparação entre commits"""
+    paths = sorted(glob.glob(os.path.join(output_dir, '*.json')))
+    if not paths:
+        print(f"⚠️ Nenhum resultado salvo em {output_dir}")
+        return
+
+    print(f"{'Data':<20} {'Commit':<10} {'Carga':<10} {'Req/s':>8} {'Alvo':>6} "
+          f"{'p50':>8} {'p99':>8} {'p99.9':>8} {'Erro %':>7}")
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            run = json.load(f)
+        config = run['config']
+        if workload and config['workload'] != workload:
+            continue
+        summary = run['results']['all']
+        lat = summary['latency_ms']
+        print(f"{run['timestamp'][:19]:<20} {run['commit']:<10} {config['workload']:<10} "
+              f"{summary['throughput_rps']:>8.1f} {config['rate']:>6g} "
+              + ' '.join(f"{(lat[p] if lat[p] is not None else float('nan')):>8.1f}"
+                         for p in ('p50', 'p99', 'p99.9'))
+              + f" {summary['error_rate'] * 100:>6.2f}%")
+
+
+def main():
+    """Função principal do gerador de carga"""
+    parser = argparse.ArgumentParser(description="Teste de carga da API de Classificação de Emails")
+    parser.add_argument("--url", help="URL de um servidor já em execução (não sobe servidor local)")
+    parser.add_argument("--server", choices=['inprocess', 'gunicorn'], default='inprocess',
+                        help="Como subir o servidor local quando --url não é informado")
+    parser.add_argument("--gunicorn-workers", type=int, default=2, help="Workers do gunicorn local")
+    parser.add_argument("--workload", choices=WORKLOADS, help="Tipo de carga (padrão: mixed)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Taxa de chegada (requisições/s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração da carga em segundos")
+    parser.add_argument("--concurrency", type=int, default=32, help="Máximo de requisições em voo")
+    parser.add_argument("--arrival", choices=['poisson', 'uniform'], default='poisson',
+                        help="Modelo de chegada das requisições")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do agendamento")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição (s)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Diretório dos resultados")
+    parser.add_argument("--no-save", action="store_true", help="Não grava o resultado em disco")
+    parser.add_argument("--compare", action="store_true", help="Compara as execuções já salvas")
+
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_runs(args.output_dir, args.workload)
+        return
+
+    workload = args.workload or 'mixed'
+
+    stop_server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+        target = 'external'
+    else:
+        port = find_free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        if args.server == 'gunicorn':
+            stop_server = start_gunicorn_server(port, args.gunicorn_workers)
+            target = f"gunicorn x{args.gunicorn_workers}"
+        else:
+            stop_server = start_inprocess_server(port)
+            target = 'inprocess'
+
+    try:
+        if not wait_until_healthy(base_url):
+            print(f"❌ Servidor em {base_url} não respondeu ao /health")
+            sys.exit(1)
+
+        results = run_load(base_url, workload, args.rate, args.duration,
+                           args.concurrency, args.arrival, args.seed, args.timeout)
+    finally:
+        if stop_server:
+            stop_server()
+
+    print_results(results)
+
+    if not args.no_save:
+        config = {
+            'workload': workload,
+            'rate': args.rate,
+            'duration': args.duration,
+            'concurrency': args.concurrency,
+            'arrival': args.arrival,
+            'seed': args.seed,
+            'target': target,
+        }
+        path = save_results(args.output_dir, config, results)
+        print(f"\n💾 Resultado salvo em {path}")
+
+
+if __name__ == "__main__":
+    main()
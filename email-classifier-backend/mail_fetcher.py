@@ -0,0 +1,739 @@
+"""
+Leitura de caixas de email via IMAP (várias contas)
+Uma lista de contas (MAILBOX_ACCOUNTS_FILE) é consultada em paralelo por um
+pool de threads com três limites: conexões simultâneas no total, conexões
+simultâneas por conta e logins por minuto por conta (balde de fichas). Uma
+conta com erro espera em recuo exponencial antes da próxima tentativa. Cada
+consulta busca só as mensagens com UID maior que o último já visto e entrega
+cada uma ao classificador; vazão e atraso são medidos por conta.
+
+No modo IDLE (MailboxWatcher) cada conta mantém uma sessão IMAP IDLE aberta e
+o servidor avisa quando chega mensagem; o atraso até a classificação passa a
+ser o da notificação, não o do intervalo de consulta.
+"""
+
+import email
+import imaplib
+import json
+import logging
+import os
+import random
+import re
+import select
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.header import decode_header
+from email.utils import parsedate_to_datetime
+
+from file_locks import has_flock, try_lock
+
+logger = logging.getLogger(__name__)
+
+_UID_RE = re.compile(rb'UID (\d+)')
+
+
+class MailboxConfigError(ValueError):
+    """Configuração de contas inválida"""
+
+
+class MailAccount:
+    """Uma caixa de email e seus limites"""
+
+    def __init__(self, name, host, user, password=None, password_env=None, port=993, folder='INBOX',
+                 limit=50, max_connections=1, connections_per_minute=6, poll_interval=60.0, fetch_chunk=25):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password_env = password_env
+        self._password = password
+        self.folder = folder
+        self.limit = limit
+        self.max_connections = max_connections
+        self.connections_per_minute = connections_per_minute
+        self.poll_interval = poll_interval
+        self.fetch_chunk = fetch_chunk
+
+    @property
+    def password(self):
+        # A senha fica em variável de ambiente, nunca no arquivo de contas
+        if self._password is not None:
+            return self._password
+        return os.environ.get(self.password_env) if self.password_env else None
+
+    @classmethod
+    def from_dict(cls, data, position=0):
+        if not isinstance(data, dict):
+            raise MailboxConfigError(f"Conta {position}: deve ser um objeto")
+        for key in ('host', 'user'):
+            if not isinstance(data.get(key), str) or not data[key]:
+                raise MailboxConfigError(f"Conta {position}: campo '{key}' é obrigatório")
+        known = {'name', 'host', 'port', 'user', 'password_env', 'folder', 'limit', 'max_connections',
+                 'connections_per_minute', 'poll_interval', 'fetch_chunk'}
+        unknown = sorted(set(data) - known)
+        if unknown:
+            raise MailboxConfigError(f"Conta {position}: campo(s) desconhecido(s): {', '.join(unknown)}")
+        options = {key: data[key] for key in known - {'name', 'host', 'user'} if key in data}
+        for key in ('port', 'limit', 'max_connections', 'fetch_chunk'):
+            if key in options and (not isinstance(options[key], int) or options[key] < 1):
+                raise MailboxConfigError(f"Conta {position}: '{key}' deve ser um inteiro positivo")
+        for key in ('connections_per_minute', 'poll_interval'):
+            if key in options and (not isinstance(options[key], (int, float)) or options[key] <= 0):
+                raise MailboxConfigError(f"Conta {position}: '{key}' deve ser um número positivo")
+        return cls(data.get('name') or data['user'], data['host'], data['user'], **options)
+
+
+def load_accounts(path):
+    """Lê a lista de contas de um arquivo JSON"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise MailboxConfigError(f"Não foi possível ler as contas em {path}: {e}") from e
+    if not isinstance(data, list) or not data:
+        raise MailboxConfigError("O arquivo de contas deve ser uma lista não vazia")
+    accounts = [MailAccount.from_dict(item, position) for position, item in enumerate(data)]
+    names = [account.name for account in accounts]
+    if len(set(names)) != len(names):
+        raise MailboxConfigError("Nomes de conta repetidos")
+    return accounts
+
+
+def connect(account, imap_factory=None):
+    """Abre a conexão IMAP, faz login e seleciona a pasta"""
+    factory = imap_factory or imaplib.IMAP4_SSL
+    mail = factory(account.host, account.port)
+    mail.login(account.user, account.password)
+    mail.select(account.folder)
+    return mail
+
+
+def _decode_header_value(value):
+    if value is None:
+        return ''
+    text, encoding = decode_header(value)[0]
+    if isinstance(text, bytes):
+        text = text.decode(encoding or 'utf-8', errors='replace')
+    return text
+
+
+def parse_message(raw):
+    """Remetente, assunto, corpo (primeira parte text/plain) e data de uma mensagem"""
+    msg = email.message_from_bytes(raw)
+
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain":
+                try:
+                    body = part.get_payload(decode=True).decode()
+                    break
+                except Exception:
+                    continue
+    else:
+        try:
+            body = msg.get_payload(decode=True).decode()
+        except Exception:
+            body = msg.get_payload()
+
+    try:
+        received_at = parsedate_to_datetime(msg['Date']).timestamp() if msg['Date'] else None
+    except (TypeError, ValueError):
+        received_at = None
+
+    return {
+        'from': msg.get('From'),
+        'subject': _decode_header_value(msg['Subject']),
+        'body': body,
+        'received_at': received_at,
+        'message': msg,
+    }
+
+
+def search_uids(mail, after_uid=0):
+    """UIDs da pasta maiores que `after_uid`, em ordem crescente"""
+    status, data = mail.uid('search', None, f'UID {after_uid + 1}:*' if after_uid else 'ALL')
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f'UID SEARCH falhou: {status}')
+    # "UID n:*" sempre devolve a última mensagem, mesmo com UID menor que n
+    return sorted(uid for uid in (int(value) for value in data[0].split()) if uid > after_uid)
+
+
+def fetch_uids(mail, uids):
+    """Busca as mensagens dos UIDs; retorna [(uid, mensagem analisada)]"""
+    if not uids:
+        return []
+    status, data = mail.uid('fetch', ','.join(str(uid) for uid in uids), '(RFC822)')
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f'UID FETCH falhou: {status}')
+    messages = []
+    for item in data:
+        if not isinstance(item, tuple):
+            continue
+        match = _UID_RE.search(item[0])
+        if match:
+            messages.append((int(match.group(1)), parse_message(item[1])))
+    return messages
+
+
+def fetch_latest(account, limit, imap_factory=None):
+    """Últimas `limit` mensagens da conta, da mais recente para a mais antiga"""
+    mail = connect(account, imap_factory)
+    try:
+        uids = search_uids(mail)[-limit:]
+        messages = fetch_uids(mail, uids)
+    finally:
+        try:
+            mail.logout()
+        except Exception:
+            pass
+    return [message for _, message in sorted(messages, key=lambda item: item[0], reverse=True)]
+
+
+class RateLimiter:
+    """Balde de fichas: no máximo `per_minute` aquisições por minuto, com rajada de `burst`"""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or max(1, int(per_minute)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class LeaderLock:
+    """flock em um arquivo que elege um único processo do servidor
+
+    Sem `path`, ou sem flock (Windows), todo processo é líder. Quem não obteve o lock tenta de novo a
+    cada `retry_interval` segundos e assume quando o líder morre (o sistema
+    libera o flock de um processo encerrado).
+    """
+
+    def __init__(self, path, retry_interval=5.0):
+        self.path = path if has_flock() else None
+        self.retry_interval = retry_interval
+        self._fd = None
+        self._pid = None
+        self._next_attempt = 0.0
+
+    @property
+    def held(self):
+        return self.path is None or (self._fd is not None and self._pid == os.getpid())
+
+    def acquire(self):
+        """Tenta obter o lock sem bloquear; retorna True se este processo é o líder"""
+        if self.held:
+            return True
+        now = time.monotonic()
+        if now < self._next_attempt:
+            return False
+        self._next_attempt = now + self.retry_interval
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if not try_lock(fd):
+            os.close(fd)
+            return False
+        self._fd, self._pid = fd, os.getpid()
+        logger.info(f"Processo {os.getpid()} assumiu a leitura das caixas de email ({self.path})")
+        return True
+
+
+class AccountState:
+    """Limites, recuo e métricas de uma conta"""
+
+    def __init__(self, account, base_backoff, max_backoff):
+        self.account = account
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.connections = threading.BoundedSemaphore(account.max_connections)
+        self.rate_limiter = RateLimiter(account.connections_per_minute, burst=account.max_connections)
+        self.lock = threading.Lock()
+        self.polling = False
+        self.last_uid = 0
+        self.backlog = 0
+        self.next_poll_at = 0.0
+
+        self.polls = 0
+        self.messages = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.rate_limited = 0
+        self.fetch_seconds = 0.0
+        self.last_success_at = None
+        self.last_error = None
+        self.backoff_until = None
+        self.arrival_lag_total = 0.0
+        self.arrival_lag_count = 0
+        self.active_connections = 0
+        self.max_active_connections = 0
+
+    def backoff(self, now):
+        """Agenda a próxima tentativa com recuo exponencial (e variação aleatória)"""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (self.consecutive_failures - 1))
+        delay *= random.uniform(0.8, 1.2)
+        self.backoff_until = now + delay
+        self.next_poll_at = self.backoff_until
+
+    def metrics(self, now):
+        return {
+            'polls': self.polls,
+            'messages': self.messages,
+            'errors': self.errors,
+            'consecutive_failures': self.consecutive_failures,
+            'rate_limited': self.rate_limited,
+            'last_uid': self.last_uid,
+            'backlog': self.backlog,
+            'messages_per_second': round(self.messages / self.fetch_seconds, 2) if self.fetch_seconds else None,
+            'poll_lag_seconds': round(now - self.last_success_at, 1) if self.last_success_at else None,
+            'avg_arrival_lag_seconds': (round(self.arrival_lag_total / self.arrival_lag_count, 1)
+                                        if self.arrival_lag_count else None),
+            'backoff_seconds': round(self.backoff_until - now, 1) if self.backoff_until and self.backoff_until > now else 0,
+            'max_active_connections': self.max_active_connections,
+            'last_error': self.last_error,
+        }
+
+
+class MailboxPoller:
+    """Consulta várias contas em paralelo e entrega as mensagens novas a `classify`
+
+    `classify(account, uid, message)` é chamado para cada mensagem nova.
+    `max_connections` limita as conexões IMAP simultâneas de todas as contas.
+    Com `lock_path`, só o processo que obtiver o flock do arquivo consulta as
+    caixas (um por servidor, não um por worker do gunicorn); os demais tentam
+    de novo periodicamente e assumem se o processo líder morrer.
+    """
+
+    def __init__(self, accounts, classify, max_connections=8, imap_factory=None,
+                 base_backoff=5.0, max_backoff=600.0, tick=1.0, lock_path=None):
+        self.accounts = {account.name: AccountState(account, base_backoff, max_backoff) for account in accounts}
+        self.classify = classify
+        self.max_connections = max_connections
+        self.imap_factory = imap_factory
+        self.tick = tick
+        self.leader_lock = LeaderLock(lock_path)
+        self._global = threading.BoundedSemaphore(max_connections)
+        self._executor = None
+        self._executor_pid = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self.max_active_connections = 0
+
+    def _pool(self):
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix='mailbox')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def ensure_started(self):
+        """Inicia o laço de consultas neste processo, se ele for o líder (também após fork)"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if not self.leader_lock.acquire():
+                return
+            self._thread = threading.Thread(target=self._run, name='mailbox-poller', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_due()
+            except Exception as e:
+                logger.error(f"Erro no laço de consulta das caixas: {e}")
+            time.sleep(self.tick)
+
+    def poll_due(self):
+        """Agenda a consulta das contas cujo intervalo venceu; retorna os futures"""
+        now = time.monotonic()
+        futures = []
+        for state in self.accounts.values():
+            with state.lock:
+                if state.polling or now < state.next_poll_at:
+                    continue
+                if not state.rate_limiter.try_acquire():
+                    state.rate_limited += 1
+                    continue
+                state.polling = True
+            futures.append(self._pool().submit(self._poll_account, state))
+        return futures
+
+    def poll_all(self):
+        """Consulta todas as contas devidas e espera terminar (uso em scripts e testes)"""
+        for future in self.poll_due():
+            future.result()
+
+    @contextmanager
+    def _connection(self, state):
+        """Reserva uma conexão respeitando os limites global e da conta"""
+        state.connections.acquire()
+        self._global.acquire()
+        with self._active_lock:
+            self._active += 1
+            self.max_active_connections = max(self.max_active_connections, self._active)
+        with state.lock:
+            state.active_connections += 1
+            state.max_active_connections = max(state.max_active_connections, state.active_connections)
+        try:
+            yield
+        finally:
+            with state.lock:
+                state.active_connections -= 1
+            with self._active_lock:
+                self._active -= 1
+            self._global.release()
+            state.connections.release()
+
+    def _poll_account(self, state):
+        account = state.account
+        start = time.perf_counter()
+        try:
+            with self._connection(state):
+                mail = connect(account, self.imap_factory)
+                try:
+                    pending = search_uids(mail, state.last_uid)
+                    # Na primeira consulta só as últimas `limit`; depois, as mais
+                    # antigas primeiro e o restante fica para a próxima rodada
+                    uids = pending[-account.limit:] if not state.last_uid else pending[:account.limit]
+                    backlog = len(pending) - len(uids) if state.last_uid else 0
+                    chunks = [uids[i:i + account.fetch_chunk] for i in range(0, len(uids), account.fetch_chunk)]
+                    messages = fetch_uids(mail, chunks[0]) if chunks else []
+                finally:
+                    _logout(mail)
+            # Os demais blocos usam conexões extras da conta, até max_connections
+            if len(chunks) > 1:
+                extra = self._pool_for_chunks(state, chunks[1:])
+                for chunk_messages in extra:
+                    messages.extend(chunk_messages)
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            now = time.monotonic()
+            with state.lock:
+                state.errors += 1
+                state.consecutive_failures += 1
+                state.last_error = str(e)
+                state.backoff(now)
+                state.polling = False
+            logger.warning(f"Erro ao consultar a caixa {account.name} "
+                           f"({state.consecutive_failures} falha(s) seguida(s)): {e}")
+            return 0
+
+        for uid, message in sorted(messages, key=lambda item: item[0]):
+            try:
+                self.classify(account, uid, message)
+            except Exception as e:
+                logger.error(f"Erro ao classificar a mensagem {uid} de {account.name}: {e}")
+            if message.get('received_at'):
+                # Atraso entre a chegada (cabeçalho Date) e a classificação
+                with state.lock:
+                    state.arrival_lag_total += max(0.0, time.time() - message['received_at'])
+                    state.arrival_lag_count += 1
+
+        with state.lock:
+            if messages:
+                state.last_uid = max(state.last_uid, max(uid for uid, _ in messages))
+            state.polls += 1
+            state.messages += len(messages)
+            state.fetch_seconds += elapsed
+            state.consecutive_failures = 0
+            state.backoff_until = None
+            state.backlog = backlog
+            state.last_success_at = time.monotonic()
+            # Com mensagens acumuladas a conta volta na próxima rodada (ainda sujeita ao limite de logins)
+            state.next_poll_at = state.last_success_at + (0 if state.backlog else account.poll_interval)
+            state.polling = False
+        return len(messages)
+
+    def _pool_for_chunks(self, state, chunks):
+        """Busca blocos de UIDs em conexões paralelas da mesma conta"""
+        def fetch_chunk(chunk):
+            with self._connection(state):
+                mail = connect(state.account, self.imap_factory)
+                try:
+                    return fetch_uids(mail, chunk)
+                finally:
+                    _logout(mail)
+
+        workers = min(len(chunks), state.account.max_connections)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'mailbox-{state.account.name}') as pool:
+            return list(pool.map(fetch_chunk, chunks))
+
+    def metrics(self):
+        """Vazão, atraso e erros por conta"""
+        now = time.monotonic()
+        accounts = {}
+        for name, state in self.accounts.items():
+            with state.lock:
+                accounts[name] = state.metrics(now)
+        return {
+            'pid': os.getpid(),
+            'mode': 'poll',
+            'leader': self.leader_lock.held,
+            'max_connections': self.max_connections,
+            'max_active_connections': self.max_active_connections,
+            'accounts': accounts,
+        }
+
+
+def _wait_readable(mail, timeout):
+    sock = mail.sock
+    # Registros TLS já decifrados não aparecem para o select
+    if getattr(sock, 'pending', None) and sock.pending():
+        return True
+    readable, _, _ = select.select([sock], [], [], max(0.0, timeout))
+    return bool(readable)
+
+
+def _is_exists(line):
+    return line.startswith(b'* ') and line.rstrip().endswith(b'EXISTS')
+
+
+def idle(mail, timeout, stop=None):
+    """Uma rodada de IMAP IDLE (RFC 2177): espera até `timeout` segundos por
+    mensagem nova; retorna True se o servidor anunciou EXISTS
+
+    O imaplib do Python 3.9 não tem IDLE, então o comando é enviado direto na
+    conexão e as respostas não marcadas são lidas até o aviso ou o prazo.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b' IDLE\r\n')
+    arrived = False
+    while True:
+        # O servidor pode anunciar antes do "+" mensagens que chegaram entre
+        # a última busca e o IDLE
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort('conexão encerrada ao entrar no IDLE')
+        if line.startswith(b'+'):
+            break
+        if line.startswith(tag):
+            raise imaplib.IMAP4.error(f'IDLE recusado: {line.strip()!r}')
+        arrived = arrived or _is_exists(line)
+
+    deadline = time.monotonic() + timeout
+    while not arrived and time.monotonic() < deadline and not (stop and stop.is_set()):
+        if not _wait_readable(mail, min(1.0, deadline - time.monotonic())):
+            continue
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort('conexão encerrada durante o IDLE')
+        arrived = _is_exists(line)
+
+    mail.send(b'DONE\r\n')
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort('conexão encerrada ao sair do IDLE')
+        if line.startswith(tag):
+            if not line[len(tag):].strip().startswith(b'OK'):
+                raise imaplib.IMAP4.error(f'IDLE terminou com erro: {line.strip()!r}')
+            return arrived
+
+
+def percentile(sorted_values, pct):
+    """Percentil pelo método nearest-rank"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class WatchState:
+    """Sessão IDLE de uma conta e suas métricas"""
+
+    def __init__(self, account, latency_window):
+        self.account = account
+        self.lock = threading.Lock()
+        self.last_uid = 0
+        self.connected = False
+        self.idle_supported = None
+        self.sessions = 0
+        self.notifications = 0
+        self.messages = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_message_at = None
+        self.latencies_ms = deque(maxlen=latency_window)
+        self.arrival_lag_total = 0.0
+        self.arrival_lag_count = 0
+
+    def metrics(self):
+        latencies = sorted(self.latencies_ms)
+        return {
+            'connected': self.connected,
+            'idle_supported': self.idle_supported,
+            'sessions': self.sessions,
+            'notifications': self.notifications,
+            'messages': self.messages,
+            'errors': self.errors,
+            'consecutive_failures': self.consecutive_failures,
+            'last_uid': self.last_uid,
+            'last_message_at': self.last_message_at,
+            'notification_to_classification_ms': {
+                'p50': round(percentile(latencies, 50), 1) if latencies else None,
+                'p95': round(percentile(latencies, 95), 1) if latencies else None,
+                'max': round(latencies[-1], 1) if latencies else None,
+                'samples': len(latencies),
+            },
+            'avg_arrival_lag_seconds': (round(self.arrival_lag_total / self.arrival_lag_count, 1)
+                                        if self.arrival_lag_count else None),
+            'last_error': self.last_error,
+        }
+
+
+class MailboxWatcher:
+    """Mantém uma sessão IMAP IDLE por conta e entrega as mensagens novas a `classify`
+
+    Ao conectar, só mensagens que chegarem a partir dali são classificadas
+    (após uma reconexão, as que chegaram durante a queda também). Cada aviso
+    do servidor dispara a busca dos UIDs novos. Servidores sem IDLE são
+    consultados a cada `fallback_interval` segundos. Erros derrubam a sessão,
+    que é refeita com recuo exponencial. `lock_path` elege um único processo,
+    como no MailboxPoller.
+    """
+
+    def __init__(self, accounts, classify, imap_factory=None, idle_timeout=300.0, fallback_interval=30.0,
+                 base_backoff=5.0, max_backoff=300.0, lock_path=None, latency_window=1000):
+        self.accounts = {account.name: WatchState(account, latency_window) for account in accounts}
+        self.classify = classify
+        self.imap_factory = imap_factory
+        # O RFC 2177 pede para renovar o IDLE antes de 29 minutos
+        self.idle_timeout = min(idle_timeout, 29 * 60)
+        self.fallback_interval = fallback_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.leader_lock = LeaderLock(lock_path)
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Abre as sessões neste processo, se ele for o líder (também após fork)"""
+        if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+                return
+            if not self.leader_lock.acquire():
+                return
+            self._stop.clear()
+            self._threads = []
+            self._pid = os.getpid()
+            for state in self.accounts.values():
+                thread = threading.Thread(target=self._watch, args=(state,), name=f'mailbox-idle-{state.account.name}',
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        """Encerra as sessões (usado em scripts e testes)"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _watch(self, state):
+        while not self._stop.is_set():
+            try:
+                self._session(state)
+                state.consecutive_failures = 0
+            except Exception as e:
+                with state.lock:
+                    state.errors += 1
+                    state.consecutive_failures += 1
+                    state.last_error = str(e)
+                    failures = state.consecutive_failures
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (failures - 1)) * random.uniform(0.8, 1.2)
+                logger.warning(f"Sessão IDLE de {state.account.name} caiu ({failures} falha(s) seguida(s)), "
+                               f"nova tentativa em {delay:.1f} s: {e}")
+                self._stop.wait(delay)
+            finally:
+                state.connected = False
+
+    def _session(self, state):
+        account = state.account
+        mail = connect(account, self.imap_factory)
+        try:
+            with state.lock:
+                state.sessions += 1
+                state.connected = True
+                state.idle_supported = 'IDLE' in getattr(mail, 'capabilities', ())
+            if state.last_uid:
+                # Reconexão: classifica o que chegou enquanto a sessão estava fora
+                self._fetch_new(state, mail, time.monotonic())
+            else:
+                uids = search_uids(mail)
+                state.last_uid = uids[-1] if uids else 0
+            state.consecutive_failures = 0
+
+            while not self._stop.is_set():
+                if state.idle_supported:
+                    arrived = idle(mail, self.idle_timeout, self._stop)
+                else:
+                    self._stop.wait(self.fallback_interval)
+                    mail.noop()
+                    arrived = True
+                if arrived and not self._stop.is_set():
+                    with state.lock:
+                        state.notifications += 1
+                    self._fetch_new(state, mail, time.monotonic())
+        finally:
+            _logout(mail)
+
+    def _fetch_new(self, state, mail, notified_at):
+        uids = search_uids(mail, state.last_uid)
+        if not uids:
+            return 0
+        for uid, message in sorted(fetch_uids(mail, uids), key=lambda item: item[0]):
+            try:
+                self.classify(state.account, uid, message)
+            except Exception as e:
+                logger.error(f"Erro ao classificar a mensagem {uid} de {state.account.name}: {e}")
+            with state.lock:
+                state.latencies_ms.append((time.monotonic() - notified_at) * 1000)
+                if message.get('received_at'):
+                    state.arrival_lag_total += max(0.0, time.time() - message['received_at'])
+                    state.arrival_lag_count += 1
+                state.messages += 1
+                state.last_uid = max(state.last_uid, uid)
+                state.last_message_at = time.time()
+        return len(uids)
+
+    def metrics(self):
+        """Estado das sessões e atraso entre o aviso do servidor e a classificação, por conta"""
+        accounts = {}
+        for name, state in self.accounts.items():
+            with state.lock:
+                accounts[name] = state.metrics()
+        return {
+            'pid': os.getpid(),
+            'mode': 'idle',
+            'leader': self.leader_lock.held,
+            'accounts': accounts,
+        }
+
+
+def _logout(mail):
+    try:
+        mail.logout()
+    except Exception:
+        pass
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Artefato binário do modelo linear, mapeado em memória (mmap)
+Pesos, índice termo→coluna e tabelas de regras ficam em arrays planos em um
+único arquivo versionado. Os workers abrem o arquivo com mmap e leem direto
+das páginas do cache do sistema operacional, então todos os processos do host
+compartilham uma única cópia e o tempo de carga não cresce com o modelo.
+
+Layout (little-endian):
+    cabeçalho   magic "ECMA", versão, nº de seções, CRC32 da tabela de seções
+    seções      nome (16 bytes), offset, tamanho e CRC32 de cada seção
+    dados       seções alinhadas em 8 bytes
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+
+from linear_model import (
+    LABELS, FrozenLinearModel, HashingVectorizer, LinearEngine, LinearModelError, LogisticRegressionModel,
+    NaiveBayesModel, VocabularyVectorizer, count_tokens,
+)
+
+MAGIC = b'ECMA'
+ARTIFACT_VERSION = 1
+HEADER = struct.Struct('<4sHHII')  # magic, versão, flags, nº de seções, CRC32 da tabela
+SECTION = struct.Struct('<16sQQI')  # nome, offset, tamanho, CRC32
+FLAG_LITTLE_ENDIAN = 0x1
+ALIGNMENT = 8
+
+
+def is_artifact(path):
+    """Indica se o arquivo é um artefato binário (pelo magic)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _string_table_sections(name, strings):
+    """Codifica uma lista de strings como blob UTF-8 + offsets (u32)"""
+    offsets = array('I', [0])
+    blob = bytearray()
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return {f'{name}.off': offsets.tobytes(), f'{name}.blob': bytes(blob)}
+
+
+class ArtifactWriter:
+    """Monta o arquivo de artefato seção por seção"""
+
+    def __init__(self):
+        self.sections = {}
+
+    def add(self, name, data):
+        if len(name.encode()) > 16:
+            raise LinearModelError(f"Nome de seção muito longo: {name}")
+        self.sections[name] = bytes(data)
+
+    def add_string_table(self, name, strings):
+        for section, data in _string_table_sections(name, strings).items():
+            self.add(section, data)
+
+    def write(self, path):
+        """Grava de forma atômica (arquivo temporário + rename)"""
+        names = sorted(self.sections)
+        table_size = HEADER.size + SECTION.size * len(names)
+        offset = -(-table_size // ALIGNMENT) * ALIGNMENT
+
+        table = bytearray()
+        layout = []
+        for name in names:
+            data = self.sections[name]
+            table += SECTION.pack(name.encode(), offset, len(data), zlib.crc32(data))
+            layout.append((offset, data))
+            offset = -(-(offset + len(data)) // ALIGNMENT) * ALIGNMENT
+
+        flags = FLAG_LITTLE_ENDIAN if sys.byteorder == 'little' else 0
+        header = HEADER.pack(MAGIC, ARTIFACT_VERSION, flags, len(names), zlib.crc32(table))
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.artifact-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(table)
+                for section_offset, data in layout:
+                    f.write(b'\0' * (section_offset - f.tell()))
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+class StringTable:
+    """Tabela de strings sobre o mmap (sem copiar o conteúdo)"""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def raw(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]]
+
+    def __getitem__(self, i):
+        return bytes(self.raw(i)).decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def find(self, value):
+        """Busca binária em tabela ordenada por bytes; retorna a posição ou -1"""
+        target = value.encode('utf-8')
+        low, high = 0, len(self) - 1
+        while low <= high:
+            middle = (low + high) // 2
+            current = bytes(self.raw(middle))
+            if current == target:
+                return middle
+            if current < target:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return -1
+
+
+class ModelArtifact:
+    """Artefato aberto com mmap; as seções são memoryviews sobre o arquivo
+
+    `verify='full'` confere o CRC32 de todas as seções (lê o arquivo inteiro
+    uma vez); `verify='header'` confere só a tabela de seções, em tempo
+    constante, para cold starts com artefatos grandes (o restante pode ser
+    conferido depois com `BackgroundVerifier`).
+    """
+
+    def __init__(self, path, verify='full'):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise LinearModelError(f"Artefato vazio ou inválido: {path}") from e
+        self._view = memoryview(self._mmap)
+        self.sections = self._read_table()
+        if verify == 'full':
+            self.verify()
+        self.meta = json.loads(bytes(self.section('meta')).decode('utf-8'))
+
+    def _read_table(self):
+        if len(self._mmap) < HEADER.size:
+            raise LinearModelError(f"Artefato truncado: {self.path}")
+        magic, version, flags, count, table_crc = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise LinearModelError(f"Arquivo não é um artefato de modelo: {self.path}")
+        if version != ARTIFACT_VERSION:
+            raise LinearModelError(f"Versão de artefato não suportada: {version} (esperado {ARTIFACT_VERSION})")
+        if bool(flags & FLAG_LITTLE_ENDIAN) != (sys.byteorder == 'little'):
+            raise LinearModelError("Artefato gravado em máquina com outra ordem de bytes")
+
+        table_end = HEADER.size + SECTION.size * count
+        if table_end > len(self._mmap) or zlib.crc32(self._view[HEADER.size:table_end]) != table_crc:
+            raise LinearModelError(f"Tabela de seções corrompida: {self.path}")
+
+        sections = {}
+        for i in range(count):
+            raw_name, offset, length, crc = SECTION.unpack_from(self._mmap, HEADER.size + i * SECTION.size)
+            if offset + length > len(self._mmap):
+                raise LinearModelError(f"Seção fora dos limites do arquivo: {self.path}")
+            sections[raw_name.rstrip(b'\0').decode()] = (offset, length, crc)
+        return sections
+
+    def verify(self):
+        """Confere o CRC32 de todas as seções"""
+        for name, (offset, length, crc) in self.sections.items():
+            if zlib.crc32(self._view[offset:offset + length]) != crc:
+                raise LinearModelError(f"Checksum inválido na seção '{name}' de {self.path}")
+
+    def section(self, name, fmt=None):
+        """memoryview da seção (convertida para o tipo `fmt`, se informado)"""
+        if name not in self.sections:
+            raise LinearModelError(f"Seção ausente no artefato: {name}")
+        offset, length, _ = self.sections[name]
+        view = self._view[offset:offset + length]
+        return view.cast(fmt) if fmt else view
+
+    def has_section(self, name):
+        return name in self.sections
+
+    def string_table(self, name):
+        return StringTable(self.section(f'{name}.off', 'I'), self.section(f'{name}.blob'))
+
+    def rule_table(self, name):
+        """Tabela de regras gravada por `save_artifact` (ex.: 'productive_keywords')"""
+        names = self.meta.get('rule_tables', [])
+        if name not in names:
+            raise LinearModelError(f"Tabela de regras ausente no artefato: {name}")
+        return self.string_table(f'rule{names.index(name)}')
+
+
+class BackgroundVerifier:
+    """Confere os CRC32 das seções de um artefato aberto com verify='header' em segundo plano
+
+    `on_failure(erro)` é chamado uma vez se alguma seção não confere. Como
+    threads não sobrevivem ao fork, `ensure_started` refaz a verificação no
+    processo atual enquanto ela não tiver terminado.
+    """
+
+    def __init__(self, artifact, on_failure):
+        self.artifact = artifact
+        self.on_failure = on_failure
+        self.status = 'pending'
+        self.error = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Inicia a verificação neste processo, se ainda estiver pendente"""
+        if self.status != 'pending' or (self._pid == os.getpid() and self._thread.is_alive()):
+            return
+        with self._start_lock:
+            if self.status != 'pending' or (self._pid == os.getpid() and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name='artifact-verify', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        try:
+            # zlib.crc32 libera o GIL em blocos grandes: as requisições seguem em paralelo
+            self.artifact.verify()
+        except LinearModelError as e:
+            self.status = 'failed'
+            self.error = str(e)
+            self.on_failure(e)
+        else:
+            self.status = 'ok'
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class MmapVocabularyVectorizer:
+    """Vetorizador de vocabulário que consulta o índice ordenado no mmap"""
+
+    name = VocabularyVectorizer.name
+
+    def __init__(self, terms, columns):
+        self._terms = terms
+        self._columns = columns
+
+    @property
+    def n_features(self):
+        return len(self._terms)
+
+    def transform(self, tokens, text=None):
+        indices = []
+        values = []
+        for term, count in count_tokens(tokens).items():
+            position = self._terms.find(term)
+            if position >= 0:
+                indices.append(self._columns[position])
+                values.append(float(count))
+        return indices, values
+
+
+class ArtifactLinearModel(FrozenLinearModel):
+    """Modelo somente leitura: pesos lidos direto do mmap"""
+
+
+def save_artifact(engine, path, rule_tables=None):
+    """Grava um LinearEngine treinado como artefato binário
+
+    `rule_tables` é um dicionário nome → lista de strings (palavras-chave,
+    padrões regex) gravado como tabelas de strings.
+    """
+    model = engine.model
+    vectorizer = engine.vectorizer
+    writer = ArtifactWriter()
+
+    meta = {
+        'labels': list(LABELS),
+        'model_type': model.name,
+        'bias': model.bias,
+        'n_features': len(model.weights),
+        'vectorizer': vectorizer.to_dict() if vectorizer.name == HashingVectorizer.name
+        else {'type': vectorizer.name},
+        'rule_tables': sorted(rule_tables or {}),
+    }
+    writer.add('weights', array('d', model.weights).tobytes())
+
+    if isinstance(model, NaiveBayesModel):
+        meta['naive_bayes'] = {
+            'alpha': model.alpha,
+            'class_counts': model.class_counts,
+            'totals': model.totals,
+        }
+        writer.add('nb.neg', array('d', model.feature_counts[0]).tobytes())
+        writer.add('nb.pos', array('d', model.feature_counts[1]).tobytes())
+    elif isinstance(model, LogisticRegressionModel):
+        meta['logistic_regression'] = {
+            'learning_rate': model.learning_rate,
+            'l2': model.l2,
+            'decay': model.decay,
+            'examples': model.examples,
+        }
+
+    if vectorizer.name == VocabularyVectorizer.name:
+        ordered = sorted(range(len(vectorizer.terms)), key=lambda i: vectorizer.terms[i].encode('utf-8'))
+        writer.add_string_table('terms', [vectorizer.terms[i] for i in ordered])
+        writer.add('terms.col', array('i', ordered).tobytes())
+
+    for i, name in enumerate(meta['rule_tables']):
+        writer.add_string_table(f'rule{i}', list(rule_tables[name]))
+
+    writer.add('meta', json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+    writer.write(path)
+
+
+def load_artifact_engine(path, preprocess, verify='full'):
+    """Abre o artefato e monta um LinearEngine que lê pesos e índice do mmap"""
+    artifact = ModelArtifact(path, verify=verify)
+    meta = artifact.meta
+
+    vectorizer_meta = meta['vectorizer']
+    if vectorizer_meta['type'] == HashingVectorizer.name:
+        vectorizer = HashingVectorizer(
+            vectorizer_meta['n_bits'], vectorizer_meta['signed'],
+            vectorizer_meta['ngram_range'], vectorizer_meta['patterns'],
+        )
+    elif vectorizer_meta['type'] == VocabularyVectorizer.name:
+        vectorizer = MmapVocabularyVectorizer(artifact.string_table('terms'), artifact.section('terms.col', 'i'))
+    else:
+        raise LinearModelError(f"Vetorizador desconhecido: {vectorizer_meta['type']}")
+
+    model = ArtifactLinearModel(meta['model_type'], artifact.section('weights', 'd'), meta['bias'])
+    engine = LinearEngine(preprocess, vectorizer, model)
+    engine.artifact = artifact
+    return engine
+
+
+def load_trainable_engine(path, preprocess):
+    """Reconstrói em memória um LinearEngine treinável a partir do artefato
+
+    Usado no aprendizado online: contagens (Naive Bayes) ou pesos (regressão
+    logística) são copiados do mmap para arrays que podem ser atualizados.
+    """
+    artifact = ModelArtifact(path)
+    meta = artifact.meta
+
+    if meta['vectorizer']['type'] == VocabularyVectorizer.name:
+        table = artifact.string_table('terms')
+        terms = [None] * len(table)
+        for position, column in enumerate(artifact.section('terms.col', 'i')):
+            terms[column] = table[position]
+        vectorizer = VocabularyVectorizer(terms)
+    else:
+        vectorizer = load_artifact_engine(path, preprocess, verify='header').vectorizer
+
+    if meta['model_type'] == NaiveBayesModel.name:
+        params = meta['naive_bayes']
+        model = NaiveBayesModel(alpha=params['alpha'])
+        model.class_counts = list(params['class_counts'])
+        model.totals = list(params['totals'])
+        model.feature_counts = (array('d', artifact.section('nb.neg', 'd')),
+                                array('d', artifact.section('nb.pos', 'd')))
+        model.finalize()
+    elif meta['model_type'] == LogisticRegressionModel.name:
+        params = dict(meta.get('logistic_regression', {}))
+        examples = params.pop('examples', 0)
+        model = LogisticRegressionModel(**params)
+        model.weights = array('d', artifact.section('weights', 'd'))
+        model.bias = meta['bias']
+        model.examples = examples
+    else:
+        raise LinearModelError(f"Tipo de modelo desconhecido: {meta['model_type']}")
+
+    engine = LinearEngine(preprocess, vectorizer, model)
+    engine.rule_tables = {name: list(artifact.rule_table(name)) for name in meta.get('rule_tables', [])}
+    return engine
+
+
+def rss_kb():
+    """RSS atual do processo em KB (Linux: /proc; senão, pico via resource)"""
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    """Conversão de modelos JSON e inspeção de artefatos"""
+    parser = argparse.ArgumentParser(description="Artefato binário do modelo linear")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help="Converte um modelo JSON em artefato binário")
+    convert.add_argument('source', help="Modelo JSON (train-model-script.py)")
+    convert.add_argument('output', help="Arquivo .bin de saída")
+
+    info = subparsers.add_parser('info', help="Mostra seções, tempo de carga e RSS")
+    info.add_argument('path', help="Artefato .bin")
+    info.add_argument('--verify', choices=['full', 'header'], default='full')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from app import classifier
+
+        engine = LinearEngine.load(args.source, classifier.fast_preprocess)
+        save_artifact(engine, args.output, {
+            'productive_keywords': classifier.productive_keywords,
+            'unproductive_keywords': classifier.unproductive_keywords,
+            'productive_patterns': classifier.productive_patterns,
+        })
+        print(f"💾 Artefato gravado em {args.output} ({os.path.getsize(args.output):,} bytes)")
+        return
+
+    rss_before = rss_kb()
+    start = time.perf_counter()
+    engine = load_artifact_engine(args.path, str.lower, verify=args.verify)
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_after = rss_kb()
+
+    artifact = engine.artifact
+    engine.predict("Preciso de ajuda urgente com o sistema")
+    rss_first = rss_kb()
+
+    print(f"📦 {args.path} ({os.path.getsize(args.path):,} bytes)")
+    print(f"   Modelo: {artifact.meta['model_type']}, vetorizador {artifact.meta['vectorizer']['type']}, "
+          f"{artifact.meta['n_features']:,} colunas")
+    for name, (offset, length, crc) in sorted(artifact.sections.items()):
+        print(f"   - {name:<16} {length:>12,} bytes  crc32={crc:08x}")
+    print(f"⏱️ Carga ({args.verify}): {load_ms:.2f} ms")
+    print(f"🧠 RSS: {rss_before:,} KB → {rss_after:,} KB após carga (+{rss_after - rss_before:,} KB), "
+          f"{rss_first:,} KB após a primeira inferência")
+    for name in artifact.meta.get('rule_tables', []):
+        print(f"   Regras '{name}': {len(artifact.rule_table(name))} entradas")
+
+
+if __name__ == "__main__":
+    main()
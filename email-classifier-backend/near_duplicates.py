@@ -0,0 +1,176 @@
+"""
+Detecção de quase-duplicatas (correntes, mala direta)
+Cada email recebe uma impressão SimHash de 64 bits sobre os trigramas de
+palavras do texto normalizado. Cópias com saudação ou rodapé diferentes ficam a
+poucos bits de distância. O índice guarda as impressões dos emails
+classificados recentemente (memória limitada e expiração por tempo) e usa
+bandas LSH para achar candidatos sem comparar com todas as entradas.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+MIN_TOKENS = 8
+
+_URL_RE = re.compile(r'https?://\S+|www\.\S+|\S+@\S+')
+_TOKEN_RE = re.compile(r'[^\W\d_]+')
+
+
+def normalize_tokens(text):
+    """Palavras do texto em minúsculas, sem URLs, endereços e números"""
+    return _TOKEN_RE.findall(_URL_RE.sub(' ', text.lower()))
+
+
+def simhash(tokens, shingle_size=SHINGLE_SIZE):
+    """Impressão SimHash (64 bits) dos n-gramas de palavras
+
+    As contagens por bit são somadas em um contador "bit-sliced": cada plano é
+    um inteiro de 64 bits e somar um hash custa O(log n) operações, em vez de
+    64 somas por n-grama.
+    """
+    planes = []
+    count = 0
+    for i in range(max(1, len(tokens) - shingle_size + 1)):
+        shingle = ' '.join(tokens[i:i + shingle_size]).encode('utf-8')
+        carry = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'little')
+        count += 1
+        for level, plane in enumerate(planes):
+            planes[level] = plane ^ carry
+            carry &= plane
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+
+    # Bit i da impressão = 1 quando mais da metade dos n-gramas tem o bit i
+    fingerprint = 0
+    half = count / 2
+    for bit in range(FINGERPRINT_BITS):
+        ones = 0
+        for level, plane in enumerate(planes):
+            ones += ((plane >> bit) & 1) << level
+        if ones > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class Cluster:
+    """Grupo de quase-duplicatas: (categoria, confiança, features) já calculadas por motor"""
+
+    __slots__ = ('cluster_id', 'fingerprint', 'predictions', 'size', 'last_seen')
+
+    def __init__(self, fingerprint, now):
+        self.cluster_id = f'{fingerprint:016x}'
+        self.fingerprint = fingerprint
+        self.predictions = {}
+        self.size = 1
+        self.last_seen = now
+
+
+class NearDuplicateIndex:
+    """Índice SimHash + LSH com limite de entradas e expiração por tempo
+
+    `threshold` é a similaridade mínima (1 - distância de Hamming / 64). Com
+    distância máxima d, a impressão é dividida em d + 1 bandas: duas impressões
+    a no máximo d bits de distância coincidem em pelo menos uma banda, então a
+    busca por bandas não perde nenhuma quase-duplicata.
+    """
+
+    def __init__(self, threshold=0.95, max_entries=10000, ttl=3600, min_tokens=MIN_TOKENS):
+        self.max_distance = int((1.0 - threshold) * FINGERPRINT_BITS)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+
+        n_bands = self.max_distance + 1
+        width = FINGERPRINT_BITS // n_bands
+        self._bands = [
+            (band * width, ((1 << (FINGERPRINT_BITS - band * width if band == n_bands - 1 else width)) - 1))
+            for band in range(n_bands)
+        ]
+        self._clusters = OrderedDict()  # impressão -> Cluster, do menos para o mais recente
+        self._buckets = {}  # (banda, valor) -> impressões
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def __len__(self):
+        return len(self._clusters)
+
+    def fingerprint(self, text):
+        """Impressão do texto, ou None se ele for curto demais para comparar"""
+        tokens = normalize_tokens(text)
+        if len(tokens) < self.min_tokens:
+            return None
+        return simhash(tokens)
+
+    def _band_keys(self, fingerprint):
+        return [(band, (fingerprint >> shift) & mask) for band, (shift, mask) in enumerate(self._bands)]
+
+    def _remove(self, fingerprint):
+        self._clusters.pop(fingerprint, None)
+        for key in self._band_keys(fingerprint):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(fingerprint)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _evict(self, now):
+        # Ordem de uso: expirados e excedentes estão sempre no início
+        while self._clusters:
+            fingerprint, cluster = next(iter(self._clusters.items()))
+            if len(self._clusters) <= self.max_entries and now - cluster.last_seen <= self.ttl:
+                break
+            self._remove(fingerprint)
+
+    def match(self, fingerprint):
+        """Procura o cluster mais próximo; retorna (cluster, similaridade) ou (None, None)
+
+        Um acerto renova o cluster (conta como uso recente).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            best, best_distance = None, self.max_distance + 1
+            for key in self._band_keys(fingerprint):
+                for candidate in self._buckets.get(key, ()):
+                    distance = bin(candidate ^ fingerprint).count("1")
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+            if best is None:
+                return None, None
+            cluster = self._clusters[best]
+            cluster.size += 1
+            cluster.last_seen = now
+            self._clusters.move_to_end(best)
+        return cluster, 1.0 - best_distance / FINGERPRINT_BITS
+
+    def add(self, fingerprint):
+        """Cria um cluster para a impressão (ou retorna o existente)"""
+        now = time.monotonic()
+        with self._lock:
+            cluster = self._clusters.get(fingerprint)
+            if cluster is None:
+                cluster = Cluster(fingerprint, now)
+                self._clusters[fingerprint] = cluster
+                for key in self._band_keys(fingerprint):
+                    self._buckets.setdefault(key, set()).add(fingerprint)
+            cluster.last_seen = now
+            self._clusters.move_to_end(fingerprint)
+            self._evict(now)
+        return cluster
+
+    def discard_predictions(self, engine):
+        """Esquece as classificações de um motor (ex.: após trocar o modelo)"""
+        with self._lock:
+            for cluster in self._clusters.values():
+                cluster.predictions.pop(engine, None)
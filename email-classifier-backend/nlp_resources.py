@@ -0,0 +1,78 @@
+"""
+Recursos do NLTK (tokenizador, stop words e stemmers) carregados no primeiro uso
+Importar o nltk leva mais tempo que o resto do app, e a verificação dos dados
+pode ir à rede. Cada recurso é um LazyResource: o app sobe sem importar o
+nltk, e a primeira classificação que precisar de um recurso o carrega (uma
+vez, mesmo com várias threads). A etapa rápida da cascata não usa nenhum.
+
+No modo serverless os dados vêm só do diretório empacotado com a função
+(`use_bundled_data`), sem verificação nem download; fora dele,
+`download_nltk_resources` roda na subida como sempre.
+"""
+
+import os
+import sys
+import threading
+
+NLTK_RESOURCES = (
+    ('punkt', 'tokenizers/punkt'),
+    ('stopwords', 'corpora/stopwords'),
+    ('rslp', 'stemmers/rslp'),
+)
+
+
+class LazyResource:
+    """Valor criado por `load()` no primeiro `get()`"""
+
+    def __init__(self, load):
+        self._load = load
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._load()
+                    self._loaded = True
+        return self._value
+
+
+def download_nltk_resources():
+    """Download automático dos recursos NLTK necessários"""
+    import nltk
+
+    for resource, path in NLTK_RESOURCES:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            print(f"Baixando recurso NLTK: {resource}")
+            nltk.download(resource, quiet=True)
+
+
+def use_bundled_data(path):
+    """Procura os dados do NLTK primeiro em `path` (ex.: nltk_data/ empacotado na função)"""
+    if 'nltk' in sys.modules:
+        sys.modules['nltk'].data.path.insert(0, path)
+    else:
+        # O nltk lê NLTK_DATA ao ser importado
+        paths = os.environ.get('NLTK_DATA')
+        os.environ['NLTK_DATA'] = os.pathsep.join([path, paths]) if paths else path
+
+
+def _word_tokenize():
+    from nltk.tokenize import word_tokenize
+    return word_tokenize
+
+
+word_tokenizer = LazyResource(_word_tokenize)
+
+
+def word_tokenize(text, language):
+    """nltk.tokenize.word_tokenize, importado na primeira chamada"""
+    return word_tokenizer.get()(text, language=language)
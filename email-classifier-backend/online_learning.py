@@ -0,0 +1,264 @@
+"""
+Aprendizado online a partir das correções dos usuários (POST /feedback)
+As correções entram em uma fila por processo (deque, append atômico, sem
+locks no caminho da requisição). Uma thread de fundo transforma a fila
+periodicamente em um delta (contagens ou variações de peso por feature) e o
+acrescenta a um log compartilhado ao lado do modelo (`<modelo>.deltas`, uma
+linha JSON por lote, com lock de arquivo). Cada worker aplica as linhas novas
+do log, de qualquer worker, à sua cópia treinável e troca o modelo em uso por
+referência: o custo de um merge é o do lote, não o do modelo. A cada
+`fold_records` linhas o log é incorporado ao arquivo do modelo, que é gravado
+de forma atômica, e recomeça vazio; só então os workers recarregam o modelo.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from file_locks import exclusive_lock, file_stamp
+from linear_model import LinearEngine, LinearModelError
+from model_artifact import is_artifact, load_trainable_engine, save_artifact
+
+logger = logging.getLogger(__name__)
+
+
+def load_trainable(path, preprocess):
+    """Carrega o modelo do disco em forma treinável (JSON ou artefato)"""
+    if is_artifact(path):
+        return load_trainable_engine(path, preprocess)
+    return LinearEngine.load(path, preprocess)
+
+
+def save_model(engine, path):
+    """Grava o modelo no mesmo formato do arquivo original, de forma atômica"""
+    if is_artifact(path):
+        save_artifact(engine, path, getattr(engine, 'rule_tables', None))
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.model-')
+    os.close(fd)
+    try:
+        engine.save(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class FeedbackLearner:
+    """Acumula correções e as incorpora ao modelo linear em segundo plano
+
+    `load_engine(path)` carrega o modelo de inferência (o mesmo usado na
+    inicialização do app) e `swap(engine)` o publica; a troca é uma única
+    atribuição, então requisições em andamento terminam com o modelo antigo.
+    """
+
+    def __init__(self, path, preprocess, load_engine, swap, merge_interval=5.0, max_pending=10000,
+                 fold_records=200):
+        self.path = path
+        self.delta_path = path + '.deltas'
+        self.preprocess = preprocess
+        self.load_engine = load_engine
+        self.swap = swap
+        self.merge_interval = merge_interval
+        self.max_pending = max_pending
+        self.fold_records = fold_records
+
+        self._pending = deque()
+        # Cópia treinável = modelo em disco (versão _trainable_stamp) + log até _delta_offset
+        self._trainable = None
+        self._trainable_stamp = None
+        self._delta_offset = 0
+        self._delta_records = 0
+        self._serving_stamp = file_stamp(path)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.rejected = 0
+        self.applied = 0
+        self.merges = 0
+        self.deltas_applied = 0
+        self.folds = 0
+        self.reloads = 0
+        self.failures = 0
+        self.merge_seconds = 0.0
+        self.last_merge_ms = None
+        self.max_merge_ms = 0.0
+        self.last_merge_at = None
+
+    def submit(self, text, category):
+        """Enfileira uma correção; retorna False se a fila estiver cheia"""
+        if len(self._pending) >= self.max_pending:
+            self.rejected += 1
+            return False
+        self._pending.append((text, category))
+        self.ensure_started()
+        return True
+
+    def ensure_started(self):
+        """Inicia a thread de merge neste processo (também após fork)"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='feedback-merge', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.merge_interval)
+            try:
+                self.merge()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Erro ao incorporar correções ao modelo: {e}")
+
+    def merge(self):
+        """Grava as correções pendentes no log de deltas e aplica o que há de novo nele"""
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+
+        start = time.perf_counter()
+        if batch:
+            try:
+                self._append_delta(batch)
+            except (OSError, LinearModelError):
+                # Devolve as correções para a próxima tentativa
+                self._pending.extendleft(reversed(batch))
+                raise
+        try:
+            # A partir daqui o lote já está no log: uma falha só adia a aplicação
+            self._sync()
+        finally:
+            if batch:
+                elapsed = time.perf_counter() - start
+                self.applied += len(batch)
+                self.merges += 1
+                self.merge_seconds += elapsed
+                self.last_merge_ms = elapsed * 1000
+                self.max_merge_ms = max(self.max_merge_ms, self.last_merge_ms)
+                self.last_merge_at = datetime.now().isoformat()
+                logger.info(f"{len(batch)} correção(ões) incorporada(s) ao modelo em {self.last_merge_ms:.1f} ms")
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock exclusivo entre os workers sobre o modelo e o log de deltas"""
+        with open(self.path + '.lock', 'a') as lock_file, exclusive_lock(lock_file):
+            yield
+
+    def _append_delta(self, batch):
+        """Calcula o delta do lote sobre a cópia atualizada e o acrescenta ao log"""
+        with self._file_lock():
+            self._catch_up()
+            record = json.dumps(self._trainable.delta(batch), ensure_ascii=False)
+            with open(self.delta_path, 'a', encoding='utf-8') as f:
+                f.write(record + '\n')
+
+    def _sync(self):
+        """Aplica os deltas novos do log (de qualquer worker) e publica o modelo atualizado"""
+        stamp = file_stamp(self.path)
+        try:
+            log_size = os.path.getsize(self.delta_path)
+        except OSError:
+            log_size = 0
+        if self._trainable is None and log_size == 0:
+            # Sem correções pendentes no log: só acompanha o arquivo do modelo
+            if stamp is not None and stamp != self._serving_stamp:
+                self._serve_file(stamp)
+            return
+        if self._trainable is not None and stamp == self._trainable_stamp and log_size == self._delta_offset:
+            return
+
+        with self._file_lock():
+            self._catch_up()
+            if self._delta_records >= self.fold_records:
+                self._fold()
+        if self._delta_records:
+            self.swap(self._trainable.snapshot())
+            self._serving_stamp = None
+        elif self._trainable_stamp != self._serving_stamp:
+            self._serve_file(self._trainable_stamp)
+
+    def _serve_file(self, stamp):
+        """Publica o modelo do arquivo (mmap compartilhado, no caso do artefato)"""
+        engine = self.load_engine(self.path)
+        if engine is not None:
+            self.swap(engine)
+            self._serving_stamp = stamp
+            self.reloads += 1
+
+    def _catch_up(self):
+        """Leva a cópia treinável até o fim do log (com o lock de arquivo)"""
+        try:
+            stamp = file_stamp(self.path)
+            if self._trainable is None or stamp != self._trainable_stamp:
+                # Modelo novo em disco (incorporação do log ou novo treino): o log recomeça
+                self._trainable = load_trainable(self.path, self.preprocess)
+                self._trainable_stamp = stamp
+                self._delta_offset = 0
+                self._delta_records = 0
+            try:
+                with open(self.delta_path, 'rb') as f:
+                    f.seek(self._delta_offset)
+                    data = f.read()
+            except FileNotFoundError:
+                data = b''
+            # Só linhas completas: uma gravação em andamento fica para a próxima
+            data = data[:data.rfind(b'\n') + 1]
+            lines = data.splitlines()
+            for line in lines:
+                self._trainable.apply_delta(json.loads(line))
+            if lines:
+                self._trainable.finalize()
+            self._delta_offset += len(data)
+            self._delta_records += len(lines)
+            self.deltas_applied += len(lines)
+        except BaseException:
+            # A cópia em memória pode ter ficado parcial: recarrega na próxima
+            self._trainable = None
+            raise
+
+    def _fold(self):
+        """Grava o modelo com o log incorporado e esvazia o log (com o lock de arquivo)"""
+        save_model(self._trainable, self.path)
+        open(self.delta_path, 'w').close()
+        self._trainable_stamp = file_stamp(self.path)
+        self._delta_offset = 0
+        self._delta_records = 0
+        self.folds += 1
+        logger.info(f"Log de correções incorporado ao modelo {self.path}")
+
+    def metrics(self):
+        """Contadores de throughput e latência de merge deste worker"""
+        return {
+            'pid': os.getpid(),
+            'pending': len(self._pending),
+            'applied': self.applied,
+            'rejected': self.rejected,
+            'failures': self.failures,
+            'merges': self.merges,
+            'deltas_applied': self.deltas_applied,
+            'delta_log_records': self._delta_records,
+            'folds': self.folds,
+            'fold_records': self.fold_records,
+            'reloads': self.reloads,
+            'updates_per_second': round(self.applied / self.merge_seconds, 1) if self.merge_seconds else None,
+            'last_merge_ms': round(self.last_merge_ms, 3) if self.last_merge_ms is not None else None,
+            'avg_merge_ms': round(self.merge_seconds * 1000 / self.merges, 3) if self.merges else None,
+            'max_merge_ms': round(self.max_merge_ms, 3),
+            'last_merge_at': self.last_merge_at,
+            'merge_interval': self.merge_interval,
+        }
+
+
@@ -0,0 +1,79 @@
+"""
+Utilitários para geração de PDFs simples
+Usado pelas ferramentas de carga e geração de corpus para criar arquivos
+que o endpoint /classify-file consegue extrair com PyPDF2
+"""
+
+# Layout fixo: página A4, fonte Helvetica 11pt
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 56
+LINE_HEIGHT = 14
+CHARS_PER_LINE = 90
+
+
+def _escape_pdf_text(line):
+    """Escapa caracteres especiais de strings PDF"""
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _wrap_lines(text):
+    """Quebra o texto em linhas que cabem na largura da página"""
+    lines = []
+    for paragraph in text.splitlines() or ['']:
+        while len(paragraph) > CHARS_PER_LINE:
+            cut = paragraph.rfind(' ', 0, CHARS_PER_LINE)
+            if cut <= 0:
+                cut = CHARS_PER_LINE
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        lines.append(paragraph)
+    return lines
+
+
+def build_text_pdf(text):
+    """Gera os bytes de um PDF com o texto informado (uma ou mais páginas)"""
+    lines = _wrap_lines(text)
+    lines_per_page = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Objetos fixos: 1 = catálogo, 2 = árvore de páginas, 3 = fonte
+    objects = {}
+    page_ids = []
+    next_id = 4
+    for page_lines in pages:
+        content = [f'BT /F1 11 Tf {LINE_HEIGHT} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td']
+        for line in page_lines:
+            content.append(f'({_escape_pdf_text(line)}) Tj T*')
+        content.append('ET')
+        stream = '\n'.join(content).encode('cp1252', errors='replace')
+
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        objects[content_id] = (
+            b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream'
+        )
+        objects[page_id] = (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>'
+        ).encode()
+
+    kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids)
+    objects[1] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[2] = f'<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>'.encode()
+    objects[3] = b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(output)
+        output += f'{obj_id} 0 obj\n'.encode() + objects[obj_id] + b'\nendobj\n'
+
+    xref_offset = len(output)
+    output += f'xref\n0 {len(objects) + 1}\n'.encode()
+    output += b'0000000000 65535 f \n'
+    for obj_id in sorted(objects):
+        output += f'{offsets[obj_id]:010d} 00000 n \n'.encode()
+    output += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode()
+    return bytes(output)
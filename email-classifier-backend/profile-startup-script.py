@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Perfil de cold start do backend
+Sobe o app em um processo novo (como uma função serverless), mede o import
+com `python -X importtime` e o tempo da primeira requisição de cada rota, e
+mostra quais pacotes pesam na subida. Falha (exit 1) se import + primeiro
+/classify passar do orçamento.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos pesados que o modo serverless só importa quando a rota precisa
+HEAVY_MODULES = ('nltk', 'PyPDF2', 'imaplib', 'mail_fetcher', 'attachments')
+
+# Roda no processo novo: import do app e a primeira chamada de cada rota
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import app
+timings = {'import': time.perf_counter() - start}
+loaded = {name: name in sys.modules for name in HEAVY_MODULES}
+client = app.app.test_client()
+
+def first(name, call):
+    start = time.perf_counter()
+    response = call()
+    timings[name] = time.perf_counter() - start
+    assert response.status_code == 200, (name, response.status_code, response.get_data(as_text=True))
+
+first('/health', lambda: client.get('/health'))
+first('/classify', lambda: client.post('/classify', json={'text': 'Preciso de ajuda com o erro no sistema'}))
+first('/classify (segunda)', lambda: client.post('/classify', json={'text': 'Qual o status do chamado 123?'}))
+if 'file' in ROUTES:
+    import io
+    from pdf_utils import build_text_pdf
+    pdf = build_text_pdf('Solicito suporte urgente para o erro no sistema de faturamento.')
+    first('/classify-file', lambda: client.post('/classify-file', data={'file': (io.BytesIO(pdf), 'email.pdf')},
+                                                content_type='multipart/form-data'))
+print('\n@@' + json.dumps({'timings': timings, 'loaded_at_import': loaded}))
+"""
+
+
+def parse_importtime(stderr):
+    """Linhas do -X importtime: [(µs acumulados, profundidade, módulo)]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((int(cumulative), depth, name.strip()))
+    return entries
+
+
+def import_breakdown(entries, top):
+    """Pacotes importados diretamente pelo app, do mais caro para o mais barato
+
+    O -X importtime imprime cada módulo depois dos que ele importou: os de
+    profundidade 1 logo antes de `app` são os imports do próprio app.
+    """
+    app_index = next((i for i, (_, depth, name) in enumerate(entries) if depth == 0 and name == 'app'), None)
+    if app_index is None:
+        return None, []
+    children = []
+    for cumulative, depth, name in reversed(entries[:app_index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((cumulative, name))
+    children.sort(reverse=True)
+    # O que sobra é o próprio corpo do app.py (regras, modelo, singletons)
+    children.insert(0, (entries[app_index][0] - sum(cumulative for cumulative, _ in children), '(corpo do app.py)'))
+    return entries[app_index][0], children[:top]
+
+
+def run(mode, routes):
+    env = dict(os.environ)
+    temp_dir = tempfile.mkdtemp()
+    env.update(CLASSIFICATION_STORE_PATH='', JOB_WORKERS='0', RULES_RELOAD_INTERVAL='0',
+               STATS_FILE=os.path.join(temp_dir, 'stats.bin'), JOBS_DB_PATH=os.path.join(temp_dir, 'jobs.db'),
+               EVENTS_DB_PATH=os.path.join(temp_dir, 'events.db'), SERVERLESS='1' if mode == 'serverless' else '0')
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\nROUTES = {routes!r}\n" + CHILD
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND_DIR, env=env,
+                             capture_output=True, text=True)
+    marker = process.stdout.rfind('\n@@')
+    if process.returncode != 0 or marker < 0:
+        print(process.stdout[-2000:])
+        print(process.stderr[-2000:])
+        raise SystemExit("❌ O app não subiu")
+    return json.loads(process.stdout[marker + 3:]), parse_importtime(process.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de cold start do backend")
+    parser.add_argument("--mode", choices=['serverless', 'server'], default='serverless',
+                        help="serverless: SERVERLESS=1 (imports tardios, sem download do NLTK)")
+    parser.add_argument("--top", type=int, default=12, help="Pacotes listados no detalhamento do import")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="Orçamento em segundos para import + primeiro /classify")
+    parser.add_argument("--skip-file", action="store_true", help="Não mede o primeiro /classify-file")
+    args = parser.parse_args()
+
+    print(f"🧊 Cold start no modo {args.mode}...")
+    result, entries = run(args.mode, () if args.skip_file else ('file',))
+    timings = result['timings']
+
+    app_us, children = import_breakdown(entries, args.top)
+    if app_us is not None:
+        print(f"\n📦 Import do app: {app_us / 1000:.1f} ms (importtime)")
+        for cumulative, name in children:
+            print(f"   {name:<28} {cumulative / 1000:>8.1f} ms")
+
+    loaded = [name for name, present in result['loaded_at_import'].items() if present]
+    print(f"\n🔌 Importados na subida: {', '.join(loaded) if loaded else 'nenhum dos módulos pesados'}")
+
+    print(f"\n{'Etapa':<22} {'Tempo':>10}")
+    for name, seconds in timings.items():
+        print(f"{name:<22} {seconds * 1000:>8.1f} ms")
+
+    cold = timings['import'] + timings['/classify']
+    if cold > args.budget:
+        print(f"\n🚨 Import + primeiro /classify: {cold:.3f}s (orçamento {args.budget:.3f}s)")
+        sys.exit(1)
+    print(f"\n✅ Import + primeiro /classify: {cold:.3f}s (orçamento {args.budget:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Regras de seleção de respostas automáticas
+As regras são compiladas em uma estrutura de decisão única: as marcas de
+intenção do email (intent_tags.py) e, para regras com palavras-chave próprias,
+uma varredura do texto produzem uma máscara de bits das regras atingidas, e a
+regra de maior prioridade da categoria é escolhida em tempo constante
+"""
+
+import json
+import sys
+
+from keyword_matcher import KeywordMatcher
+
+# Regras padrão, em ordem de prioridade dentro de cada categoria. Uma regra
+# vale quando o email tem uma das marcas em 'tags' ou uma das 'keywords'; a
+# regra sem marcas nem palavras-chave é a resposta padrão da categoria.
+DEFAULT_RESPONSE_RULES = {
+    'Produtivo': [
+        {
+            'name': 'urgente',
+            'tags': ['urgency'],
+            'template': """Prezado(a),
+
+Recebemos sua solicitação urgente e nossa equipe já foi notificada.
+Estamos priorizando seu atendimento e retornaremos em até 4 horas úteis.
+
+Para casos críticos, entre em contato pelo telefone (11) 9999-9999.
+
+Atenciosamente,
+Equipe de Suporte""",
+        },
+        {
+            'name': 'problema',
+            'tags': ['problem'],
+            'template': """Prezado(a),
+
+Agradecemos o relato do problema. Nossa equipe técnica irá investigar a questão reportada.
+
+Você receberá uma atualização sobre o andamento em até 24 horas úteis.
+
+Caso precise de assistência adicional, estamos à disposição.
+
+Atenciosamente,
+Equipe Técnica""",
+        },
+        {
+            'name': 'status',
+            'tags': ['status'],
+            'template': """Prezado(a),
+
+Recebemos sua solicitação de atualização.
+Nossa equipe irá verificar o status atual e retornará com as informações em breve.
+
+Tempo previsto para resposta: até 12 horas úteis.
+
+Atenciosamente,
+Equipe de Atendimento""",
+        },
+        {
+            'name': 'padrao',
+            'template': """Prezado(a),
+
+Recebemos sua mensagem e nossa equipe está analisando sua solicitação.
+
+Retornaremos com uma resposta detalhada em até 24 horas úteis.
+
+Caso seja urgente, entre em contato pelo telefone (11) 9999-9999.
+
+Atenciosamente,
+Equipe de Atendimento""",
+        },
+    ],
+    'Improdutivo': [
+        {
+            'name': 'felicitacoes',
+            'tags': ['congratulations'],
+            'template': """Muito obrigado pelas felicitações!
+
+Ficamos muito felizes com sua mensagem.
+Desejamos tudo de bom para você também!
+
+Estamos sempre à disposição para qualquer necessidade.
+
+Com carinho,
+Equipe""",
+        },
+        {
+            'name': 'agradecimento',
+            'tags': ['thanks'],
+            'template': """De nada! Foi um prazer ajudar.
+
+Agradecemos pelo feedback positivo.
+Caso precise de algo mais, não hesite em nos contatar.
+
+Atenciosamente,
+Equipe de Atendimento""",
+        },
+        {
+            'name': 'fim_de_ano',
+            'tags': ['holiday'],
+            'template': """Muito obrigado pelas felicitações de fim de ano!
+
+Desejamos a você e sua família um período repleto de alegria e prosperidade.
+
+Continuaremos trabalhando para oferecer o melhor atendimento em 2025.
+
+Feliz Ano Novo!
+Equipe""",
+        },
+        {
+            'name': 'padrao',
+            'template': """Obrigado pelo contato!
+
+Sua mensagem é muito importante para nós.
+Caso precise de alguma assistência específica, não hesite em nos informar.
+
+Estamos sempre à disposição.
+
+Atenciosamente,
+Equipe de Atendimento""",
+        },
+    ],
+}
+
+
+class ResponseRulesError(ValueError):
+    """Configuração de regras de resposta inválida"""
+
+
+class ResponseSelector:
+    """Escolhe a resposta automática a partir de regras compiladas
+
+    Cada regra recebe um bit; a prioridade é a ordem na configuração. O custo
+    de uma seleção é um OR por marca de intenção do email (as marcas vêm da
+    varredura única do IntentTagger) e, só se houver regras com palavras-chave
+    próprias, mais uma varredura do texto; independe do número de regras.
+    """
+
+    def __init__(self, rules):
+        self._validate(rules)
+
+        keyword_masks = {}
+        tag_masks = {}
+        self._templates = []
+        self._names = []
+        self._category_masks = {}
+        self._fallbacks = {}
+
+        for category, category_rules in rules.items():
+            category_mask = 0
+            for rule in category_rules:
+                template = sys.intern(rule['template'])
+                if not rule.get('keywords') and not rule.get('tags'):
+                    self._fallbacks[category] = (rule['name'], template)
+                    continue
+                bit = 1 << len(self._templates)
+                self._templates.append(template)
+                self._names.append(rule['name'])
+                category_mask |= bit
+                for keyword in rule.get('keywords', []):
+                    keyword = keyword.lower()
+                    keyword_masks[keyword] = keyword_masks.get(keyword, 0) | bit
+                for tag in rule.get('tags', []):
+                    tag_masks[tag] = tag_masks.get(tag, 0) | bit
+            self._category_masks[category] = category_mask
+
+        self._keyword_masks = keyword_masks
+        self._tag_masks = tag_masks
+        self._matcher = KeywordMatcher(keyword_masks)
+
+    @property
+    def tags(self):
+        """Marcas de intenção usadas pelas regras"""
+        return frozenset(self._tag_masks)
+
+    @staticmethod
+    def _validate(rules):
+        if not isinstance(rules, dict) or not rules:
+            raise ResponseRulesError("As regras devem ser um objeto com uma lista de regras por categoria")
+        for category, category_rules in rules.items():
+            if not isinstance(category_rules, list) or not category_rules:
+                raise ResponseRulesError(f"Categoria '{category}' sem regras")
+            for position, rule in enumerate(category_rules):
+                if not isinstance(rule, dict) or not isinstance(rule.get('template'), str):
+                    raise ResponseRulesError(f"Regra {position} de '{category}' sem 'template'")
+                for key in ('keywords', 'tags'):
+                    if not isinstance(rule.get(key, []), list):
+                        raise ResponseRulesError(f"Regra {position} de '{category}': '{key}' deve ser uma lista")
+                rule.setdefault('name', f'regra_{position}')
+            fallbacks = [rule for rule in category_rules if not rule.get('keywords') and not rule.get('tags')]
+            if len(fallbacks) != 1:
+                raise ResponseRulesError(
+                    f"Categoria '{category}' deve ter exatamente uma regra padrão (sem marcas nem palavras-chave)"
+                )
+
+    def rule_mask(self, text_lower):
+        """Máscara de bits das regras cujas palavras-chave aparecem no texto"""
+        mask = 0
+        keyword_masks = self._keyword_masks
+        for keyword in self._matcher.find(text_lower):
+            mask |= keyword_masks[keyword]
+        return mask
+
+    def tag_mask(self, tags):
+        """Máscara de bits das regras atingidas pelas marcas de intenção do email"""
+        mask = 0
+        tag_masks = self._tag_masks
+        for tag in tags:
+            mask |= tag_masks.get(tag, 0)
+        return mask
+
+    def select(self, category, email_text, mask=None, tags=()):
+        """Retorna (nome da regra, resposta) para a categoria, o texto e suas marcas"""
+        if mask is None:
+            mask = self.rule_mask(email_text.lower()) if self._keyword_masks else 0
+            mask |= self.tag_mask(tags)
+        mask &= self._category_masks.get(category, 0)
+        if mask:
+            index = (mask & -mask).bit_length() - 1
+            return self._names[index], self._templates[index]
+        return self._fallbacks[category]
+
+
+def load_response_rules(path=None):
+    """Compila as regras padrão ou as regras de um arquivo JSON"""
+    if not path:
+        return ResponseSelector(DEFAULT_RESPONSE_RULES)
+    try:
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ResponseRulesError(f"Não foi possível ler as regras de resposta em {path}: {e}") from e
+    return ResponseSelector(rules)
@@ -0,0 +1,265 @@
+"""
+Configuração de regras (palavras-chave, padrões e respostas) recarregável
+As listas usadas pelo classificador de regras podem vir de um arquivo JSON
+(RULES_FILE). Cada versão do arquivo é validada e compilada fora do caminho
+das requisições e publicada no classificador com uma única atribuição:
+requisições em andamento terminam com as regras antigas e uma configuração
+inválida é rejeitada sem afetar as regras em uso.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from file_locks import file_stamp
+from intent_tags import DEFAULT_INTENT_TAGS
+
+logger = logging.getLogger(__name__)
+
+# Regras padrão (usadas quando o arquivo não define a chave)
+DEFAULT_RULE_CONFIG = {
+    # Palavras-chave para classificação produtiva
+    'productive_keywords': [
+        'urgente', 'problema', 'erro', 'bug', 'falha', 'suporte', 'ajuda',
+        'dúvida', 'status', 'atualização', 'pendente', 'solicitação', 'requisição',
+        'preciso', 'necessário', 'importante', 'prazo', 'deadline', 'crítico',
+        'sistema', 'plataforma', 'aplicativo', 'site', 'login', 'senha',
+        'pagamento', 'cobrança', 'fatura', 'boleto', 'transferência',
+        'documento', 'relatório', 'aprovação', 'autorização', 'permissão',
+        'reunião', 'meeting', 'call', 'conferência', 'agendamento',
+        'proposta', 'contrato', 'acordo', 'negociação', 'orçamento',
+        'cliente', 'fornecedor', 'parceiro', 'projeto', 'entrega'
+    ],
+
+    # Palavras-chave para classificação improdutiva
+    'unproductive_keywords': [
+        'parabéns', 'felicitações', 'feliz', 'natal', 'ano novo', 'aniversário',
+        'birthday', 'obrigado', 'obrigada', 'agradecimento', 'thanks',
+        'festa', 'evento', 'comemoração', 'celebração', 'happy',
+        'bom dia', 'boa tarde', 'boa noite', 'cumprimento', 'saudação',
+        'coffee', 'café', 'almoço', 'jantar', 'happy hour', 'confraternização',
+        'feriado', 'férias', 'descanso', 'folga', 'licença',
+        'weather', 'tempo', 'clima', 'chuva', 'sol', 'frio', 'calor',
+        'piada', 'joke', 'humor', 'engraçado', 'funny', 'meme',
+        'corrente', 'chain', 'forward', 'repassar', 'viral'
+    ],
+
+    # Padrões regex para identificar características produtivas
+    'productive_patterns': [
+        r'\b(como|when|onde|what|qual|quando|por que|why)\b',  # Perguntas
+        r'\b(please|por favor|kindly|gentileza)\b',  # Solicitações educadas
+        r'\b(deadline|prazo|until|até|before|antes)\b',  # Prazos
+        r'\b(asap|urgente|urgent|imediato|immediate)\b',  # Urgência
+        r'\b(anexo|attached|attachment|documento)\b',  # Anexos
+        r'\b(erro|error|issue|problema|trouble)\b',  # Problemas
+        r'\b(status|update|atualização|progress)\b'  # Status
+    ],
+
+    # Palavras-chave do pipeline em inglês
+    'english_productive_keywords': [
+        'urgent', 'issue', 'problem', 'error', 'bug', 'failure', 'support', 'help',
+        'question', 'status', 'update', 'pending', 'request', 'need', 'required',
+        'important', 'deadline', 'critical', 'system', 'platform', 'app', 'site',
+        'login', 'password', 'payment', 'billing', 'invoice', 'transfer',
+        'document', 'report', 'approval', 'authorization', 'permission',
+        'meeting', 'call', 'conference', 'schedule', 'proposal', 'contract',
+        'agreement', 'negotiation', 'budget', 'client', 'customer', 'supplier',
+        'partner', 'project', 'delivery'
+    ],
+
+    'english_unproductive_keywords': [
+        'congratulations', 'happy', 'birthday', 'thanks', 'thank', 'christmas',
+        'holiday', 'party', 'event', 'celebration', 'greetings', 'cheers',
+        'coffee', 'lunch', 'dinner', 'vacation', 'weekend', 'break',
+        'weather', 'rain', 'sunny', 'cold', 'hot', 'joke', 'humor', 'funny',
+        'meme', 'chain', 'forward', 'viral'
+    ],
+
+    # Palavras de urgência por idioma
+    'urgency_words': {
+        'pt': ['urgente', 'asap', 'imediato', 'crítico'],
+        'en': ['urgent', 'asap', 'immediate', 'critical'],
+    },
+
+    # Marcas de intenção (urgência, problema, status...) de intent_tags.py
+    'intent_tags': DEFAULT_INTENT_TAGS,
+}
+
+LIST_KEYS = ('productive_keywords', 'unproductive_keywords', 'productive_patterns',
+             'english_productive_keywords', 'english_unproductive_keywords')
+LANGUAGES = ('pt', 'en')
+
+
+class RuleConfigError(ValueError):
+    """Configuração de regras inválida"""
+
+
+def _check_words(key, words):
+    if not isinstance(words, list) or not words:
+        raise RuleConfigError(f"'{key}' deve ser uma lista não vazia de textos")
+    for position, word in enumerate(words):
+        if not isinstance(word, str) or not word.strip():
+            raise RuleConfigError(f"'{key}'[{position}] deve ser um texto não vazio")
+
+
+def validate_rule_config(config):
+    """Valida a configuração e completa as chaves ausentes com as regras padrão
+
+    Retorna uma nova configuração; as respostas ('responses') são validadas na
+    compilação do ResponseSelector.
+    """
+    if not isinstance(config, dict):
+        raise RuleConfigError("A configuração de regras deve ser um objeto JSON")
+    unknown = sorted(set(config) - set(DEFAULT_RULE_CONFIG) - {'responses'})
+    if unknown:
+        raise RuleConfigError(f"Chave(s) desconhecida(s) na configuração de regras: {', '.join(unknown)}")
+
+    merged = copy.deepcopy(DEFAULT_RULE_CONFIG)
+    merged.update(copy.deepcopy(config))
+
+    for key in LIST_KEYS:
+        _check_words(key, merged[key])
+    for position, pattern in enumerate(merged['productive_patterns']):
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise RuleConfigError(f"'productive_patterns'[{position}] não é uma regex válida ({pattern!r}): {e}") from e
+
+    urgency_words = merged['urgency_words']
+    if not isinstance(urgency_words, dict):
+        raise RuleConfigError("'urgency_words' deve ser um objeto com uma lista por idioma (pt, en)")
+    for language in urgency_words:
+        if language not in LANGUAGES:
+            raise RuleConfigError(f"'urgency_words': idioma '{language}' não suportado (use pt ou en)")
+    merged['urgency_words'] = dict(DEFAULT_RULE_CONFIG['urgency_words'], **urgency_words)
+    for language in LANGUAGES:
+        _check_words(f'urgency_words.{language}', merged['urgency_words'][language])
+
+    intent_tags = merged['intent_tags']
+    if not isinstance(intent_tags, dict):
+        raise RuleConfigError("'intent_tags' deve ser um objeto com uma lista de palavras por marca")
+    merged['intent_tags'] = dict(DEFAULT_RULE_CONFIG['intent_tags'], **intent_tags)
+    for tag, words in merged['intent_tags'].items():
+        _check_words(f'intent_tags.{tag}', words)
+    return merged
+
+
+def load_rule_config(path=None):
+    """Lê e valida a configuração; retorna (configuração, versão)
+
+    A versão é o SHA-1 do conteúdo do arquivo ('padrao' sem arquivo).
+    """
+    if not path:
+        return copy.deepcopy(DEFAULT_RULE_CONFIG), 'padrao'
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        config = json.loads(raw.decode('utf-8'))
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise RuleConfigError(f"Não foi possível ler as regras em {path}: {e}") from e
+    return validate_rule_config(config), hashlib.sha1(raw).hexdigest()[:12]
+
+
+class RuleReloader:
+    """Recarrega as regras quando o arquivo muda (ou sob demanda)
+
+    `compile(config, version)` monta o conjunto de regras compilado e
+    `apply(rules)` o publica. A verificação roda em uma thread de fundo por
+    processo; uma configuração inválida é registrada em `last_error` e as
+    regras em uso são mantidas.
+    """
+
+    def __init__(self, path, compile, apply, interval=2.0, version=None):
+        self.path = path
+        self.compile = compile
+        self.apply = apply
+        self.interval = interval
+
+        self._stamp = file_stamp(path) if path else None
+        self._reload_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.version = version
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload_ms = None
+        self.last_reload_at = None
+        self.last_error = None
+
+    def reload(self):
+        """Lê, valida, compila e publica as regras; levanta RuleConfigError se inválidas"""
+        with self._reload_lock:
+            stamp = file_stamp(self.path) if self.path else None
+            start = time.perf_counter()
+            try:
+                config, version = load_rule_config(self.path)
+                rules = self.compile(config, version)
+            except RuleConfigError as e:
+                self._stamp = stamp
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error(f"Regras rejeitadas, mantendo a versão {self.version}: {e}")
+                raise
+            self.apply(rules)
+            self._stamp = stamp
+            self.version = version
+            self.reloads += 1
+            self.last_reload_ms = (time.perf_counter() - start) * 1000
+            self.last_reload_at = datetime.now().isoformat()
+            self.last_error = None
+            logger.info(f"Regras {version} carregadas em {self.last_reload_ms:.1f} ms")
+            return rules
+
+    def check(self):
+        """Recarrega se o arquivo mudou desde a última leitura"""
+        if not self.path:
+            return
+        stamp = file_stamp(self.path)
+        if stamp is None or stamp == self._stamp:
+            return
+        try:
+            self.reload()
+        except RuleConfigError:
+            pass
+
+    def ensure_started(self):
+        """Inicia a verificação periódica neste processo (também após fork)"""
+        if not self.path or self.interval <= 0:
+            return
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='rules-reload', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Erro ao verificar o arquivo de regras: {e}")
+
+    def status(self):
+        """Versão em uso e resultado da última recarga"""
+        return {
+            'path': self.path,
+            'version': self.version,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_reload_ms': round(self.last_reload_ms, 3) if self.last_reload_ms is not None else None,
+            'last_reload_at': self.last_reload_at,
+            'last_error': self.last_error,
+            'interval': self.interval,
+        }
@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 """
 Script de configuração dos recursos NLTK
-Execute este script uma vez antes de rodar a aplicação
+Execute este script uma vez antes de rodar a aplicação. Com --download-dir os
+recursos vão para um diretório próprio (ex.: nltk_data/, empacotado com a
+função no modo serverless)
 """
 
+import argparse
 import nltk
 import os
 import sys
 
-def download_nltk_resources():
+def download_nltk_resources(download_dir=None):
     """Baixa todos os recursos NLTK necessários"""
     print("🔧 Configurando recursos NLTK...")
     
@@ -31,7 +34,7 @@ def download_nltk_resources():
             except LookupError:
                 # Baixar se não existir
                 print(f"📥 Baixando {resource_name}...")
-                nltk.download(resource_name, quiet=False)
+                nltk.download(resource_name, quiet=False, download_dir=download_dir)
                 print(f"✅ {resource_name} - instalado com sucesso")
                 success_count += 1
                 
@@ -90,6 +93,13 @@ def check_python_version():
 
 def main():
     """Função principal do script de configuração"""
+    parser = argparse.ArgumentParser(description="Configura os recursos NLTK")
+    parser.add_argument("--download-dir", help="Diretório de destino (ex.: nltk_data para o modo serverless)")
+    args = parser.parse_args()
+    if args.download_dir:
+        args.download_dir = os.path.abspath(args.download_dir)
+        nltk.data.path.insert(0, args.download_dir)
+    
     print("=" * 60)
     print("🚀 CONFIGURAÇÃO DO SISTEMA DE CLASSIFICAÇÃO DE EMAILS")
     print("=" * 60)
@@ -100,7 +110,7 @@ def main():
     # Configurar NLTK
     print(f"\n📁 Diretório de dados NLTK: {nltk.data.path}")
     
-    success = download_nltk_resources()
+    success = download_nltk_resources(args.download_dir)
     
     if success:
         test_nltk_components()
@@ -0,0 +1,244 @@
+"""
+Estatísticas compartilhadas entre workers (arquivo mapeado em memória)
+Cada worker do gunicorn é um processo separado, então contadores em memória
+do processo só enxergam uma fração do tráfego. Aqui os contadores ficam em um
+arquivo mapeado (mmap) com um slot fixo por worker: cada processo só escreve
+no próprio slot (um lock local serializa as threads do worker, nenhum lock
+entre processos no caminho da requisição) e o /stats soma os slots. Como o
+número de slots e de contadores é fixo, a agregação custa tempo constante.
+
+Todos os valores são inteiros de 64 bits sem sinal. Slots de workers que
+morreram são somados ao slot 0 (aposentados) antes de serem reaproveitados,
+então os totais sobrevivem à reciclagem de workers.
+
+Sem flock (Windows) ou sem /dev/shm e sem STATS_FILE, os contadores ficam em
+memória anônima do próprio processo: o /stats mostra só o worker que respondeu.
+"""
+
+import mmap
+import os
+import threading
+import time
+
+from file_locks import exclusive_lock, has_flock
+
+MAGIC = 0x45435354  # 'ECST'
+VERSION = 1
+MAX_WORKERS = 64
+THROUGHPUT_WINDOW = 60  # segundos da janela de vazão
+
+ENDPOINTS = ('classify', 'classify-file', 'classify-batch', 'feedback', 'fetch-emails', 'other')
+CATEGORIES = ('Produtivo', 'Improdutivo')
+CONFIDENCE_SCALE = 1000000
+
+# Cabeçalho: magic, versão, número de slots, palavras por slot, início (µs)
+HEADER_WORDS = 8
+
+# Layout de um slot (em palavras de 64 bits)
+_PID = 0
+_STARTED_AT = 1
+_REQUESTS = 2
+_CATEGORIES = _REQUESTS + len(ENDPOINTS)
+_CONFIDENCE_SUM = _CATEGORIES + len(CATEGORIES)
+_CLIENT_ERRORS = _CONFIDENCE_SUM + 1
+_SERVER_ERRORS = _CLIENT_ERRORS + 1
+_CACHE_HITS = _SERVER_ERRORS + 1
+_CACHE_MISSES = _CACHE_HITS + 1
+_RING = _CACHE_MISSES + 1  # THROUGHPUT_WINDOW pares (segundo, requisições)
+SLOT_WORDS = _RING + 2 * THROUGHPUT_WINDOW
+# Contadores somados ao aposentar um slot (tudo menos pid, início e janela)
+_TOTALS = range(_REQUESTS, _RING)
+
+
+def default_path():
+    """Arquivo por servidor: os workers do gunicorn compartilham o processo pai
+
+    None sem /dev/shm: os contadores ficam só no processo.
+    """
+    if not os.path.isdir('/dev/shm'):
+        return None
+    return os.path.join('/dev/shm', f'email-classifier-stats-{os.getppid()}.bin')
+
+
+def _pid_alive(pid):
+    if pid <= 0:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedStats:
+    """Contadores por worker em memória compartilhada, agregados no /stats"""
+
+    def __init__(self, path=None, max_workers=MAX_WORKERS):
+        self.path = path or default_path()
+        self.shared = self.path is not None and has_flock()
+        self.max_workers = max_workers
+        self.size = (HEADER_WORDS + (max_workers + 1) * SLOT_WORDS) * 8
+        self._lock = threading.Lock()
+        self._pid = None
+        self._words = None
+        self._slot = None
+        self._open()
+
+    def _open(self):
+        if not self.shared:
+            # Memória anônima do processo (sem outros workers para somar)
+            self._mmap = mmap.mmap(-1, self.size)
+            self._words = memoryview(self._mmap).cast('Q')
+            self._reset()
+            self._slot = self._claim_slot()
+            self._pid = os.getpid()
+            return
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with exclusive_lock(fd):
+                if os.fstat(fd).st_size != self.size:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size)
+                self._mmap = mmap.mmap(fd, self.size)
+                self._words = memoryview(self._mmap).cast('Q')
+                if not self._valid_header() or not self._any_alive():
+                    self._reset()
+                self._slot = self._claim_slot()
+        finally:
+            os.close(fd)
+        self._pid = os.getpid()
+
+    def _valid_header(self):
+        words = self._words
+        return (words[0] == MAGIC and words[1] == VERSION
+                and words[2] == self.max_workers and words[3] == SLOT_WORDS)
+
+    def _any_alive(self):
+        return any(_pid_alive(self._words[self._base(slot) + _PID]) for slot in range(1, self.max_workers + 1))
+
+    def _reset(self):
+        # Nenhum worker vivo: é um novo servidor (ou o arquivo é de uma execução
+        # anterior), os contadores e o horário de início recomeçam
+        self._mmap[:] = bytes(self.size)
+        words = self._words
+        words[0], words[1], words[2], words[3] = MAGIC, VERSION, self.max_workers, SLOT_WORDS
+        words[4] = int(time.time() * 1000000)
+
+    @staticmethod
+    def _base(slot):
+        return HEADER_WORDS + slot * SLOT_WORDS
+
+    def _claim_slot(self):
+        words = self._words
+        pid = os.getpid()
+        free = dead = None
+        for slot in range(1, self.max_workers + 1):
+            slot_pid = words[self._base(slot) + _PID]
+            if slot_pid == pid:
+                return slot
+            if slot_pid == 0 and free is None:
+                free = slot
+            elif slot_pid and dead is None and not _pid_alive(slot_pid):
+                dead = slot
+        slot = free if free is not None else dead
+        if slot is None:
+            # Mais workers que slots: divide o slot dos aposentados (sem lock
+            # entre processos, alguns incrementos concorrentes podem se perder)
+            return 0
+        base = self._base(slot)
+        if dead is not None and slot == dead:
+            retired = self._base(0)
+            for offset in _TOTALS:
+                words[retired + offset] += words[base + offset]
+        words[base:base + SLOT_WORDS] = memoryview(bytes(SLOT_WORDS * 8)).cast('Q')
+        words[base + _STARTED_AT] = int(time.time() * 1000000)
+        words[base + _PID] = pid
+        return slot
+
+    def _slot_base(self):
+        # Após fork o processo filho precisa de um slot próprio
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._open()
+        return self._base(self._slot)
+
+    def record_request(self, endpoint, status):
+        """Conta uma requisição, seu status e a vazão do segundo atual"""
+        base = self._slot_base()
+        index = ENDPOINTS.index(endpoint) if endpoint in ENDPOINTS else len(ENDPOINTS) - 1
+        now = int(time.time())
+        ring = base + _RING + 2 * (now % THROUGHPUT_WINDOW)
+        words = self._words
+        with self._lock:
+            words[base + _REQUESTS + index] += 1
+            if 400 <= status < 500:
+                words[base + _CLIENT_ERRORS] += 1
+            elif status >= 500:
+                words[base + _SERVER_ERRORS] += 1
+            if words[ring] != now:
+                words[ring] = now
+                words[ring + 1] = 0
+            words[ring + 1] += 1
+
+    def record_classification(self, category, confidence):
+        """Conta uma classificação e sua confiança"""
+        base = self._slot_base()
+        words = self._words
+        with self._lock:
+            if category in CATEGORIES:
+                words[base + _CATEGORIES + CATEGORIES.index(category)] += 1
+            words[base + _CONFIDENCE_SUM] += int(confidence * CONFIDENCE_SCALE)
+
+    def record_cache(self, hit):
+        """Conta um acerto ou falta no cache de quase-duplicatas"""
+        base = self._slot_base()
+        with self._lock:
+            self._words[base + (_CACHE_HITS if hit else _CACHE_MISSES)] += 1
+
+    def snapshot(self):
+        """Soma de todos os slots (tempo constante: slots e contadores fixos)"""
+        words = self._words
+        totals = [0] * SLOT_WORDS
+        now = int(time.time())
+        throughput = 0
+        workers = 0
+        for slot in range(self.max_workers + 1):
+            base = self._base(slot)
+            if slot and not words[base + _PID]:
+                continue  # slot nunca usado
+            values = words[base:base + SLOT_WORDS].tolist()
+            if slot and _pid_alive(values[_PID]):
+                workers += 1
+            for offset in _TOTALS:
+                totals[offset] += values[offset]
+            ring = values[_RING:]
+            for second, count in zip(ring[0::2], ring[1::2]):
+                if now - THROUGHPUT_WINDOW < second <= now:
+                    throughput += count
+
+        started_at = words[4] / 1000000
+        classified = sum(totals[_CATEGORIES:_CATEGORIES + len(CATEGORIES)])
+        lookups = totals[_CACHE_HITS] + totals[_CACHE_MISSES]
+        return {
+            'started_at': started_at,
+            'shared': self.shared,
+            'workers': workers,
+            'requests': {endpoint: totals[_REQUESTS + i] for i, endpoint in enumerate(ENDPOINTS)},
+            'total_requests': sum(totals[_REQUESTS:_REQUESTS + len(ENDPOINTS)]),
+            'categories': {category: totals[_CATEGORIES + i] for i, category in enumerate(CATEGORIES)},
+            'average_confidence': (round(totals[_CONFIDENCE_SUM] / CONFIDENCE_SCALE / classified, 4)
+                                   if classified else None),
+            'errors': {'client': totals[_CLIENT_ERRORS], 'server': totals[_SERVER_ERRORS]},
+            'cache': {
+                'hits': totals[_CACHE_HITS],
+                'misses': totals[_CACHE_MISSES],
+                'hit_rate': round(totals[_CACHE_HITS] / lookups, 4) if lookups else None,
+            },
+            'throughput_per_second': round(throughput / THROUGHPUT_WINDOW, 3),
+        }
@@ -0,0 +1,153 @@
+"""
+Tabela de radicais pré-calculada (palavra → radical) para o pipeline em português
+O RSLPStemmer aplica até sete passos de regras de sufixo a cada palavra, e o
+vocabulário de emails corporativos é pequeno e estável. A tabela é gerada
+offline (build-stem-table-script.py) rodando o stemmer sobre o vocabulário de
+um corpus; em produção cada palavra é uma consulta a um dict, e só palavras
+fora da tabela vão ao stemmer de verdade. Essas palavras são registradas no
+log (uma vez cada) e contadas em `metrics()`, para a próxima geração da tabela.
+
+Formato (texto UTF-8, uma palavra por linha): `palavra[<TAB>N[<TAB>sufixo]]`,
+em que o radical é `palavra[:N] + sufixo`; sem N, o radical é a própria
+palavra. A maior parte dos radicais do RSLP é prefixo da palavra, então a
+linha típica é só a palavra e um número.
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+TABLE_FORMAT = 'stem-table'
+TABLE_VERSION = 1
+
+
+class StemTableError(ValueError):
+    """Arquivo de tabela de radicais inválido ou incompatível"""
+
+
+def encode_entry(word, stem):
+    """Linha da tabela para (palavra, radical)"""
+    if stem == word:
+        return word
+    prefix = 0
+    for a, b in zip(word, stem):
+        if a != b:
+            break
+        prefix += 1
+    suffix = stem[prefix:]
+    return f'{word}\t{prefix}\t{suffix}' if suffix else f'{word}\t{prefix}'
+
+
+def decode_entry(line):
+    """(palavra, radical) de uma linha da tabela"""
+    word, _, rest = line.partition('\t')
+    if not rest:
+        return word, word
+    prefix, _, suffix = rest.partition('\t')
+    return word, word[:int(prefix)] + suffix
+
+
+def save_table(path, stems, stemmer_name):
+    """Grava {palavra: radical} em ordem alfabética"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(f'# {TABLE_FORMAT} v{TABLE_VERSION} {stemmer_name} {len(stems)}\n')
+        for word in sorted(stems):
+            f.write(encode_entry(word, stems[word]) + '\n')
+    os.replace(temp_path, path)
+
+
+def load_table(path):
+    """Lê a tabela; retorna ({palavra: radical}, nome do stemmer)
+
+    Radicais iguais compartilham a mesma string (sys.intern).
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            header = f.readline().split()
+            if len(header) != 5 or header[1] != TABLE_FORMAT or header[2] != f'v{TABLE_VERSION}':
+                raise StemTableError(f"Tabela de radicais {path} incompatível: {' '.join(header)}")
+            stems = {}
+            for line in f:
+                word, stem = decode_entry(line.rstrip('\n'))
+                if word:
+                    stems[word] = sys.intern(stem)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        if isinstance(e, StemTableError):
+            raise
+        raise StemTableError(f"Não foi possível ler a tabela de radicais {path}: {e}") from e
+    if len(stems) != int(header[4]):
+        raise StemTableError(f"Tabela de radicais {path} truncada: {len(stems)} de {header[4]} palavras")
+    return stems, header[3]
+
+
+def collect_vocabulary(texts, tokens, min_count=1):
+    """Palavras que aparecem ao menos `min_count` vezes em `tokens(texto)`"""
+    counts = Counter()
+    for text in texts:
+        counts.update(tokens(text))
+    return [word for word, count in counts.items() if count >= min_count]
+
+
+def build_stems(words, stemmer):
+    """{palavra: radical} calculado pelo stemmer de verdade"""
+    return {word: stemmer.stem(word) for word in words}
+
+
+class TableStemmer:
+    """Stemmer que responde pela tabela e recorre a `fallback` nas palavras fora dela
+
+    `fallback` é um LazyResource com o stemmer de verdade (ou None): só é
+    carregado na primeira palavra que não está na tabela.
+    """
+
+    def __init__(self, stems, fallback, name='rslp', max_unseen=10000):
+        self.stems = stems
+        self.fallback = fallback
+        self.name = name
+        self.max_unseen = max_unseen
+        self.unseen = Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stem(self, word):
+        stem = self.stems.get(word)
+        if stem is not None:
+            self.hits += 1
+            return stem
+        return self._miss(word)
+
+    def _miss(self, word):
+        self.misses += 1
+        stemmer = self.fallback.get()
+        stem = stemmer.stem(word) if stemmer is not None else word
+        with self._lock:
+            if word not in self.unseen:
+                if len(self.unseen) >= self.max_unseen:
+                    return stem
+                logger.info(f"Palavra fora da tabela de radicais: {word!r} → {stem!r}")
+            self.unseen[word] += 1
+        return stem
+
+    def metrics(self, top=20):
+        """Acertos da tabela e as palavras que mais caíram no stemmer"""
+        lookups = self.hits + self.misses
+        with self._lock:
+            unseen = self.unseen.most_common(top)
+            distinct = len(self.unseen)
+        return {
+            'pid': os.getpid(),
+            'stemmer': self.name,
+            'table_words': len(self.stems),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'unseen_words': distinct,
+            'top_unseen': [{'word': word, 'count': count} for word, count in unseen],
+        }
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Gerador determinístico de corpus sintético de emails (português e inglês)
+Produz emails rotulados como Produtivo/Improdutivo a partir do vocabulário do
+classificador, com ruído realista (respostas citadas, assinaturas, URLs,
+telefones e threads longas), gravando em disco de forma incremental
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from pdf_utils import build_text_pdf  # noqa: E402
+from rule_config import DEFAULT_RULE_CONFIG  # noqa: E402
+
+FORMATS = ['jsonl', 'txt', 'pdf', 'eml', 'mbox']
+FILES_PER_SHARD = 1000
+
+# Palavras-chave das listas do classificador que pertencem ao vocabulário inglês
+ENGLISH_KEYWORDS = {
+    'bug', 'deadline', 'meeting', 'call', 'status', 'site', 'login',
+    'birthday', 'thanks', 'happy', 'happy hour', 'coffee', 'weather',
+    'joke', 'funny', 'meme', 'chain', 'forward', 'viral',
+}
+# Palavras usadas nos dois idiomas
+SHARED_KEYWORDS = {'status', 'site', 'login', 'bug', 'meeting', 'call', 'deadline', 'viral'}
+
+EXTRA_ENGLISH_VOCABULARY = {
+    'Produtivo': [
+        'issue', 'error', 'invoice', 'payment', 'contract', 'report', 'approval',
+        'support', 'request', 'update', 'urgent', 'proposal', 'budget', 'project', 'delivery',
+    ],
+    'Improdutivo': [
+        'congratulations', 'holiday', 'party', 'celebration', 'vacation', 'lunch',
+        'christmas', 'new year', 'greetings', 'weekend', 'cheers',
+    ],
+}
+
+BODY_TEMPLATES = {
+    ('pt', 'Produtivo'): [
+        "Estou com um {kw} no {kw2} desde ontem e preciso de ajuda para resolver.",
+        "Poderiam verificar o {kw} referente ao {kw2}? O prazo vence na sexta-feira.",
+        "Segue em anexo o {kw} solicitado. Por favor, confirmem o {kw2} até amanhã.",
+        "Qual é o status do {kw}? Precisamos de uma atualização sobre o {kw2}.",
+        "Gostaria de agendar uma reunião para discutir o {kw} e o {kw2} do projeto.",
+        "É urgente: o {kw} apresentou falha e o {kw2} está parado.",
+        "Por favor, enviem o {kw} atualizado. O cliente cobrou o {kw2} hoje cedo.",
+    ],
+    ('pt', 'Improdutivo'): [
+        "Passando para desejar {kw} a todos! Que a semana seja ótima.",
+        "Muito obrigado pela {kw} de ontem, foi incrível. {kw2} para vocês!",
+        "Lembrete: nosso {kw} será na sexta depois do expediente. Tragam o {kw2}!",
+        "Feliz {kw}! Aproveitem o {kw2} com a família.",
+        "Olha essa {kw} que recebi, muito engraçada. Repassem para todos!",
+        "Bom dia, pessoal! Hoje o {kw} está ótimo para um {kw2}.",
+        "Parabéns pelo {kw}! Todos merecem esse {kw2}.",
+    ],
+    ('en', 'Produtivo'): [
+        "We found a {kw} in the {kw2} and need support to fix it as soon as possible.",
+        "Could you please check the {kw} for the {kw2}? The deadline is on Friday.",
+        "Please find attached the {kw}. Kindly confirm the {kw2} by tomorrow.",
+        "What is the status of the {kw}? We need an update on the {kw2}.",
+        "I would like to schedule a meeting to discuss the {kw} and the {kw2}.",
+        "Urgent: the {kw} failed and the {kw2} is blocked. ASAP please.",
+        "When will the {kw} be ready? The client is asking about the {kw2}.",
+    ],
+    ('en', 'Improdutivo'): [
+        "Just wanted to say {kw} to everyone! Have a great week.",
+        "Thanks a lot for the {kw} yesterday, it was amazing. {kw2} to you all!",
+        "Reminder: our {kw} is on Friday after work. Bring your {kw2}!",
+        "Happy {kw}! Enjoy the {kw2} with your family.",
+        "Check out this {kw} I got, so funny. Forward it to everyone!",
+        "Good morning, team! The {kw} is perfect for a {kw2} today.",
+        "Congratulations on the {kw}! Everyone deserves this {kw2}.",
+    ],
+}
+
+SUBJECT_TEMPLATES = {
+    ('pt', 'Produtivo'): ["{kw} pendente", "Dúvida sobre {kw}", "URGENTE: {kw}", "Status do {kw}", "Solicitação de {kw}"],
+    ('pt', 'Improdutivo'): ["{kw}!", "Feliz {kw}", "Convite: {kw}", "Só para descontrair", "Obrigado!"],
+    ('en', 'Produtivo'): ["Pending {kw}", "Question about {kw}", "URGENT: {kw}", "{kw} status", "Request: {kw}"],
+    ('en', 'Improdutivo'): ["{kw}!", "Happy {kw}", "Invitation: {kw}", "Just for fun", "Thanks!"],
+}
+
+GREETINGS = {
+    'pt': ["Olá,", "Prezados,", "Oi {name},", "Bom dia,", "Boa tarde, {name}.", ""],
+    'en': ["Hi,", "Dear team,", "Hello {name},", "Good morning,", "Hi {name},", ""],
+}
+
+CLOSINGS = {
+    'pt': ["Atenciosamente,", "Abraços,", "Obrigado,", "Att.,", "Grato,"],
+    'en': ["Best regards,", "Cheers,", "Thanks,", "Kind regards,", "Best,"],
+}
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Henrique',
+               'Isabela', 'João', 'Karen', 'Lucas', 'Mariana', 'Nuno', 'Olívia', 'Paulo',
+               'Rafael', 'Sofia', 'Thiago', 'Vanessa', 'John', 'Emily', 'Michael', 'Sarah']
+LAST_NAMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Costa', 'Almeida',
+              'Ferreira', 'Rodrigues', 'Lima', 'Smith', 'Johnson', 'Brown', 'Miller']
+COMPANIES = ['Acme Ltda', 'Contoso S.A.', 'Globex Brasil', 'Initech', 'Umbrella Tecnologia', 'Northwind']
+ROLES = {
+    'pt': ['Analista Financeiro', 'Gerente de Projetos', 'Coordenadora de TI', 'Assistente Administrativo'],
+    'en': ['Financial Analyst', 'Project Manager', 'IT Coordinator', 'Account Executive'],
+}
+DOMAINS = ['acme.com.br', 'contoso.com', 'globex.com.br', 'initech.io', 'northwind.com']
+
+DISCLAIMERS = {
+    'pt': "AVISO: Esta mensagem pode conter informações confidenciais. Se você a recebeu "
+          "por engano, notifique o remetente e apague-a imediatamente.",
+    'en': "DISCLAIMER: This message may contain confidential information. If you received "
+          "it in error, please notify the sender and delete it immediately.",
+}
+
+BASE_DATE = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def load_vocabulary():
+    """Separa as palavras-chave das regras padrão por idioma e categoria"""
+    vocabulary = {}
+    for label, keywords in (('Produtivo', DEFAULT_RULE_CONFIG['productive_keywords']),
+                            ('Improdutivo', DEFAULT_RULE_CONFIG['unproductive_keywords'])):
+        pt_words = [kw for kw in keywords if kw not in ENGLISH_KEYWORDS or kw in SHARED_KEYWORDS]
+        en_words = [kw for kw in keywords if kw in ENGLISH_KEYWORDS] + EXTRA_ENGLISH_VOCABULARY[label]
+        vocabulary[('pt', label)] = pt_words
+        vocabulary[('en', label)] = en_words
+    return vocabulary
+
+
+class CorpusGenerator:
+    """Gera emails sintéticos rotulados de forma determinística
+
+    Cada mensagem usa um gerador aleatório derivado de (semente, índice), então
+    a mensagem N é sempre a mesma para a mesma semente, independentemente de
+    quantas mensagens foram geradas antes.
+    """
+
+    def __init__(self, seed=42, languages=('pt', 'en'), productive_ratio=0.5,
+                 noise_probability=0.5, thread_probability=0.2, max_thread_depth=6):
+        self.seed = seed
+        self.languages = list(languages)
+        self.productive_ratio = productive_ratio
+        self.noise_probability = noise_probability
+        self.thread_probability = thread_probability
+        self.max_thread_depth = max_thread_depth
+        self.vocabulary = load_vocabulary()
+
+    def _rng(self, index):
+        return random.Random(self.seed * 1_000_003 + index)
+
+    def _person(self, rng):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        address = f"{first.lower().replace('á', 'a').replace('í', 'i')}.{last.lower()}@{rng.choice(DOMAINS)}"
+        return f"{first} {last}", address
+
+    def _phone(self, rng):
+        return f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+
+    def _core_message(self, rng, language, label):
+        words = self.vocabulary[(language, label)]
+        sentences = rng.sample(BODY_TEMPLATES[(language, label)], k=rng.randint(1, 3))
+        return ' '.join(s.format(kw=rng.choice(words), kw2=rng.choice(words)) for s in sentences)
+
+    def _signature(self, rng, language, name):
+        lines = [name, rng.choice(ROLES[language]), rng.choice(COMPANIES)]
+        if rng.random() < 0.7:
+            lines.append(f"Tel: {self._phone(rng)}")
+        if rng.random() < 0.5:
+            lines.append(f"https://www.{rng.choice(DOMAINS)}")
+        return '\n'.join(lines)
+
+    def _quoted_reply(self, rng, language, depth, date):
+        """Mensagem anterior citada, com cabeçalho no estilo Gmail ou Outlook"""
+        name, address = self._person(rng)
+        label = rng.choice(['Produtivo', 'Improdutivo'])
+        body = self._core_message(rng, language, label)
+        if depth > 1:
+            body += '\n\n' + self._quoted_reply(rng, language, depth - 1, date - timedelta(hours=rng.randint(1, 48)))
+
+        if rng.random() < 0.5:
+            if language == 'pt':
+                header = f"Em {date.strftime('%d/%m/%Y %H:%M')}, {name} <{address}> escreveu:"
+            else:
+                header = f"On {date.strftime('%a, %b %d, %Y at %I:%M %p')}, {name} <{address}> wrote:"
+            return header + '\n' + '\n'.join('> ' + line for line in body.splitlines())
+
+        if language == 'pt':
+            header = f"De: {name} <{address}>\nEnviado: {date.strftime('%d/%m/%Y %H:%M')}\nAssunto: RE: mensagem"
+        else:
+            header = f"From: {name} <{address}>\nSent: {date.strftime('%A, %B %d, %Y %I:%M %p')}\nSubject: RE: message"
+        return '-----Original Message-----\n' + header + '\n\n' + body
+
+    def generate(self, index):
+        """Gera o email de índice `index` como dicionário"""
+        rng = self._rng(index)
+        language = rng.choice(self.languages)
+        label = 'Produtivo' if rng.random() < self.productive_ratio else 'Improdutivo'
+        sender_name, sender_address = self._person(rng)
+        recipient_name, recipient_address = self._person(rng)
+        date = BASE_DATE + timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+
+        words = self.vocabulary[(language, label)]
+        subject = rng.choice(SUBJECT_TEMPLATES[(language, label)]).format(kw=rng.choice(words))
+        subject = subject[0].upper() + subject[1:]
+
+        parts = []
+        greeting = rng.choice(GREETINGS[language]).format(name=recipient_name.split()[0])
+        if greeting:
+            parts.append(greeting)
+        parts.append(self._core_message(rng, language, label))
+
+        noisy = rng.random() < self.noise_probability
+        if noisy and rng.random() < 0.3:
+            parts.append(f"{'Mais detalhes em' if language == 'pt' else 'More details at'} "
+                         f"https://{rng.choice(DOMAINS)}/tickets/{rng.randint(1000, 99999)}")
+        if noisy and rng.random() < 0.3:
+            parts.append(f"{'Meu telefone' if language == 'pt' else 'My phone'}: {self._phone(rng)}")
+
+        parts.append(rng.choice(CLOSINGS[language]) + '\n' + self._signature(rng, language, sender_name))
+        if noisy and rng.random() < 0.3:
+            parts.append(DISCLAIMERS[language])
+
+        if rng.random() < self.thread_probability:
+            depth = rng.randint(1, self.max_thread_depth)
+            parts.append(self._quoted_reply(rng, language, depth, date - timedelta(hours=rng.randint(1, 72))))
+            subject = ('RE: ' if rng.random() < 0.7 else 'FW: ') + subject
+
+        return {
+            'id': f"msg-{self.seed}-{index:08d}",
+            'label': label,
+            'language': language,
+            'from': f"{sender_name} <{sender_address}>",
+            'to': f"{recipient_name} <{recipient_address}>",
+            'date': date,
+            'subject': subject,
+            'body': '\n\n'.join(parts),
+        }
+
+    def iter_emails(self, count, start=0):
+        """Itera sobre `count` emails sem mantê-los em memória"""
+        for index in range(start, start + count):
+            yield self.generate(index)
+
+
+def to_email_message(item):
+    """Converte um email gerado em EmailMessage (RFC 5322)"""
+    msg = EmailMessage()
+    msg['Message-ID'] = f"<{item['id']}@synthetic.local>"
+    msg['From'] = item['from']
+    msg['To'] = item['to']
+    msg['Date'] = format_datetime(item['date'])
+    msg['Subject'] = item['subject']
+    msg['X-Classifier-Label'] = item['label']
+    msg['X-Classifier-Language'] = item['language']
+    msg.set_content(item['body'])
+    return msg
+
+
+class ShardedWriter:
+    """Grava um arquivo por email em subdiretórios de até FILES_PER_SHARD arquivos
+
+    O subdiretório vem do índice do email; a partir de `start` > 0 o labels.csv
+    existente é continuado em vez de truncado (geração em partes com --start).
+    """
+
+    def __init__(self, output_dir, extension, render, start=0):
+        self.output_dir = output_dir
+        self.extension = extension
+        self.render = render
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, 'labels.csv')
+        append = start > 0 and os.path.exists(manifest_path)
+        self._manifest_file = open(manifest_path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self._manifest = csv.writer(self._manifest_file)
+        if not append or self._manifest_file.tell() == 0:
+            self._manifest.writerow(['path', 'id', 'label', 'language'])
+        self._count = start
+        self._shard = None
+
+    def write(self, item):
+        shard = f"{self._count // FILES_PER_SHARD:05d}"
+        shard_dir = os.path.join(self.output_dir, shard)
+        if shard != self._shard:
+            os.makedirs(shard_dir, exist_ok=True)
+            self._shard = shard
+        relative = os.path.join(shard, f"{item['id']}.{self.extension}")
+        with open(os.path.join(self.output_dir, relative), 'wb') as f:
+            f.write(self.render(item))
+        self._manifest.writerow([relative, item['id'], item['label'], item['language']])
+        self._count += 1
+
+    def close(self):
+        self._manifest_file.close()
+
+
+class JsonlWriter:
+    """Grava um email rotulado por linha (formato usado para treino e avaliação)
+
+    Com append=True continua um arquivo existente (geração em partes com --start).
+    """
+
+    def __init__(self, path, append=False):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, item):
+        record = {
+            'id': item['id'],
+            'label': item['label'],
+            'language': item['language'],
+            'subject': item['subject'],
+            'text': item['body'],
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class MboxWriter:
+    """Grava todos os emails em um único arquivo mbox
+
+    Com append=True acrescenta ao mbox existente (geração em partes com --start).
+    """
+
+    def __init__(self, path, append=False):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'ab' if append else 'wb')
+
+    def write(self, item):
+        raw = to_email_message(item).as_bytes()
+        # Escapa linhas que começam com "From " (formato mboxrd)
+        lines = raw.split(b'\n')
+        escaped = [b'>' + line if line.lstrip(b'>').startswith(b'From ') else line for line in lines]
+        address = item['from'].rsplit('<', 1)[-1].rstrip('>')
+        self._file.write(f"From {address} {item['date'].strftime('%a %b %d %H:%M:%S %Y')}\n".encode())
+        self._file.write(b'\n'.join(escaped).rstrip(b'\n') + b'\n\n')
+
+    def close(self):
+        self._file.close()
+
+
+def open_writer(fmt, output, start=0):
+    """Cria o gravador incremental para o formato pedido; com `start` > 0 continua a saída existente"""
+    if fmt == 'jsonl':
+        return JsonlWriter(output, append=start > 0)
+    if fmt == 'mbox':
+        return MboxWriter(output, append=start > 0)
+    if fmt == 'txt':
+        return ShardedWriter(output, 'txt', lambda item: item['body'].encode('utf-8'), start)
+    if fmt == 'pdf':
+        return ShardedWriter(output, 'pdf', lambda item: build_text_pdf(item['body']), start)
+    if fmt == 'eml':
+        return ShardedWriter(output, 'eml', lambda item: to_email_message(item).as_bytes(), start)
+    raise ValueError(f"Formato não suportado: {fmt}")
+
+
+def write_corpus(generator, fmt, output, count, start=0, progress_every=100_000):
+    """Gera e grava `count` emails em streaming; retorna a contagem por rótulo"""
+    writer = open_writer(fmt, output, start)
+    totals = {}
+    try:
+        for n, item in enumerate(generator.iter_emails(count, start), 1):
+            writer.write(item)
+            key = (item['language'], item['label'])
+            totals[key] = totals.get(key, 0) + 1
+            if progress_every and n % progress_every == 0:
+                print(f"   ... {n:,} emails gravados")
+    finally:
+        writer.close()
+    return totals
+
+
+def main():
+    """Função principal do gerador de corpus"""
+    parser = argparse.ArgumentParser(description="Gerador de corpus sintético de emails")
+    parser.add_argument("--count", type=int, default=1000, help="Quantidade de emails")
+    parser.add_argument("--start", type=int, default=0, help="Índice inicial (para gerar em partes)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente (mesma semente = mesmo corpus)")
+    parser.add_argument("--format", choices=FORMATS, default='jsonl', help="Formato de saída")
+    parser.add_argument("--output", required=True,
+                        help="Arquivo de saída (jsonl, mbox) ou diretório (txt, pdf, eml)")
+    parser.add_argument("--languages", nargs='+', choices=['pt', 'en'], default=['pt', 'en'])
+    parser.add_argument("--productive-ratio", type=float, default=0.5, help="Proporção de emails produtivos")
+    parser.add_argument("--noise", type=float, default=0.5, help="Probabilidade de ruído (URLs, telefones, avisos)")
+    parser.add_argument("--thread-probability", type=float, default=0.2, help="Probabilidade de resposta citada")
+    parser.add_argument("--max-thread-depth", type=int, default=6, help="Profundidade máxima das threads")
+
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(
+        seed=args.seed,
+        languages=args.languages,
+        productive_ratio=args.productive_ratio,
+        noise_probability=args.noise,
+        thread_probability=args.thread_probability,
+        max_thread_depth=args.max_thread_depth,
+    )
+
+    print(f"🧪 Gerando {args.count:,} emails ({args.format}, semente {args.seed}) em {args.output}")
+    totals = write_corpus(generator, args.format, args.output, args.count, args.start)
+
+    print("📊 Distribuição:")
+    for (language, label), total in sorted(totals.items()):
+        print(f"   {language} / {label:<12} {total:>10,}")
+
+
+if __name__ == "__main__":
+    main()
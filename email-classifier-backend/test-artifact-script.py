@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Testes da carga e verificação do modelo linear (model_artifact.py, linear_model.py)
+Com MODEL_ARTIFACT_VERIFY=header o app abre o artefato conferindo só a tabela
+de seções e confere os CRC32 em segundo plano: verifica que um artefato íntegro
+continua em uso e que um corrompido é trocado pelo JSON ao lado ou, sem ele,
+pelas regras. Também verifica que um modelo JSON com campos ausentes ou de tipo
+errado é recusado com LinearModelError, sem derrubar a carga.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+TEMP_DIR = tempfile.mkdtemp()
+os.environ.update(MODEL_ARTIFACT_VERIFY='header', LINEAR_MODEL_PATH=os.path.join(TEMP_DIR, 'ausente.bin'),
+                  CLASSIFICATION_STORE_PATH='', JOB_WORKERS='0', STATS_FILE=os.path.join(TEMP_DIR, 'stats.bin'),
+                  JOBS_DB_PATH=os.path.join(TEMP_DIR, 'jobs.db'), EVENTS_DB_PATH=os.path.join(TEMP_DIR, 'events.db'))
+
+import app as app_module  # noqa: E402
+from linear_model import MODEL_FORMAT, MODEL_VERSION, LinearEngine, LinearModelError  # noqa: E402
+from model_artifact import ModelArtifact, save_artifact  # noqa: E402
+from synthetic_corpus import CorpusGenerator  # noqa: E402
+
+EMAILS = [(item['body'], item['label']) for item in CorpusGenerator(seed=7).iter_emails(200)]
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def write_models(directory, with_json):
+    engine = LinearEngine(app_module.classifier.fast_preprocess)
+    for text, label in EMAILS:
+        engine.learn(text, label)
+    engine.finalize()
+    path = os.path.join(directory, 'linear_model.bin')
+    save_artifact(engine, path)
+    if with_json:
+        engine.save(os.path.join(directory, 'linear_model.json'))
+    return path
+
+
+def corrupt_weights(path):
+    """Inverte um byte da seção de pesos (a tabela de seções continua válida)"""
+    offset, _, _ = ModelArtifact(path, verify='header').sections['weights']
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def serve(path):
+    """Carrega e publica o modelo como na inicialização e espera a verificação"""
+    app_module.linear_failover = False
+    engine = app_module.load_linear_engine(path)
+    app_module.swap_linear_engine(engine)
+    engine.verifier.join(10)
+    return engine
+
+
+def classify_linear():
+    response = app_module.app.test_client().post('/classify', json={'text': EMAILS[0][0], 'engine': 'linear'})
+    return response.status_code, (response.get_json() or {}).get('engine')
+
+
+def test_intact():
+    print("\n🔒 Artefato íntegro...")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = serve(write_models(tmp, with_json=True))
+        ok = check(engine.verifier.status == 'ok', "checksums conferidos em segundo plano")
+        ok &= check(app_module.linear_engine is engine, "artefato continua em uso")
+        return ok
+
+
+def test_corrupt_with_json():
+    print("\n🩹 Artefato corrompido com JSON ao lado...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_models(tmp, with_json=True)
+        corrupt_weights(path)
+        engine = serve(path)
+        current = app_module.linear_engine
+        ok = check(engine.verifier.status == 'failed', f"falha detectada: {engine.verifier.error}")
+        ok &= check(current is not None and current is not engine and not hasattr(current, 'artifact'),
+                    "modelo JSON passou a ser usado")
+        ok &= check(classify_linear() == (200, 'linear'), "/classify com engine=linear continua no motor linear")
+        return ok
+
+
+def test_corrupt_without_json():
+    print("\n📏 Artefato corrompido sem JSON...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_models(tmp, with_json=False)
+        corrupt_weights(path)
+        engine = serve(path)
+        ok = check(engine.verifier.status == 'failed', "falha detectada")
+        ok &= check(app_module.linear_engine is None and app_module.linear_failover, "motor linear desativado")
+        ok &= check(classify_linear() == (200, 'rules'), "/classify com engine=linear usa as regras")
+        return ok
+
+
+def test_invalid_json():
+    print("\n🧾 Modelo JSON inválido...")
+    header = {'format': MODEL_FORMAT, 'version': MODEL_VERSION}
+    cases = {
+        'lista no lugar do objeto': [],
+        'sem vetorizador': dict(header, model={'type': 'naive_bayes'}),
+        'vocabulário sem termos': dict(header, vectorizer={'type': 'vocabulary'}, model={'type': 'naive_bayes'}),
+        'vetorizador não é objeto': dict(header, vectorizer='vocabulary', model={}),
+    }
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'linear_model.json')
+        for label, data in cases.items():
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            try:
+                LinearEngine.load(path, str.lower)
+                refused = False
+            except LinearModelError:
+                refused = True
+            ok &= check(refused and app_module.load_linear_engine(path) is None, f"recusado: {label}")
+    return ok
+
+
+def main():
+    tests = [test_intact, test_corrupt_with_json, test_corrupt_without_json, test_invalid_json]
+    results = [test() for test in tests]
+    print(f"\n📊 {sum(results)}/{len(results)} testes passaram")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Testes da classificação com anexos (attachments.py)
+Monta emails com anexos PDF e .txt e verifica a extração em paralelo, o
+cache por hash do conteúdo, os limites de tamanho e de tempo e o peso dos
+anexos na classificação, sem servidor IMAP nem rede.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from email.message import EmailMessage
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+# O app sobe sem registro em disco nem threads de jobs
+TEMP_DIR = tempfile.mkdtemp()
+os.environ.update(ATTACHMENTS='1', CLASSIFICATION_STORE_PATH='', JOB_WORKERS='0',
+                  STATS_FILE=os.path.join(TEMP_DIR, 'stats.bin'), JOBS_DB_PATH=os.path.join(TEMP_DIR, 'jobs.db'))
+
+from app import classify_email_message, extract_text_from_pdf  # noqa: E402
+from attachments import AttachmentExtractor, iter_attachments  # noqa: E402
+from pdf_utils import build_text_pdf  # noqa: E402
+
+INVOICE = ("Fatura 2024-118 referente ao contrato de suporte. Solicitamos a aprovação do pagamento "
+           "até sexta-feira. Em caso de erro no valor, favor abrir um chamado com o número da fatura. "
+           "Preciso de retorno urgente sobre o status da aprovação.")
+
+
+def build_email(body, attachments):
+    message = EmailMessage()
+    message['From'] = 'financeiro@example.com'
+    message['Subject'] = 'Segue anexo'
+    message.set_content(body)
+    for filename, content in attachments:
+        if filename.endswith('.pdf'):
+            message.add_attachment(content, maintype='application', subtype='pdf', filename=filename)
+        elif isinstance(content, bytes):
+            message.add_attachment(content, maintype='application', subtype='octet-stream', filename=filename)
+        else:
+            message.add_attachment(content, subtype='plain', filename=filename)
+    return message
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def test_iter_attachments():
+    print("\n📎 Anexos da mensagem...")
+    message = build_email('Segue em anexo.', [('fatura.pdf', build_text_pdf(INVOICE)), ('notas.txt', 'texto'),
+                                              ('foto.png', b'\x89PNG')])
+    attachments = iter_attachments(message)
+    return check([(name, ext) for name, ext, _ in attachments] ==
+                 [('fatura.pdf', '.pdf'), ('notas.txt', '.txt'), ('foto.png', '.png')],
+                 "nome e tipo de cada anexo")
+
+
+def test_cache_and_dedupe():
+    print("\n🗂️  Cache por hash do conteúdo...")
+    calls = []
+
+    def slow_pdf(pdf_file, deadline):
+        calls.append(1)
+        time.sleep(0.1)
+        return extract_text_from_pdf(pdf_file, deadline)
+
+    extractor = AttachmentExtractor(slow_pdf, workers=4)
+    pdf = build_text_pdf(INVOICE)
+    first = extractor.extract([('fatura.pdf', '.pdf', pdf)])[0]
+    ok = check(first['status'] == 'ok' and 'Fatura 2024-118' in first['text'], "texto do PDF extraído")
+    second = extractor.extract([('copia.pdf', '.pdf', pdf)])[0]
+    ok &= check(second['status'] == 'cached' and len(calls) == 1, "mesmo conteúdo com outro nome vem do cache")
+
+    # O mesmo anexo chegando para 8 destinatários ao mesmo tempo é lido uma vez
+    other = build_text_pdf(INVOICE + ' Segunda via.')
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(extractor.extract([('f.pdf', '.pdf', other)])[0]))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ok &= check(len(calls) == 2 and all('Segunda via' in r['text'] for r in results),
+                f"8 pedidos simultâneos, {len(calls) - 1} extração")
+    metrics = extractor.metrics()
+    ok &= check(metrics['hits'] == 8 and metrics['misses'] == 2, f"acertos {metrics['hits']}, faltas {metrics['misses']}")
+    return ok
+
+
+def test_parallel_extraction():
+    print("\n⚡ Extração em paralelo...")
+
+    def slow_pdf(pdf_file, deadline):
+        time.sleep(0.2)
+        return extract_text_from_pdf(pdf_file, deadline)
+
+    extractor = AttachmentExtractor(slow_pdf, workers=4)
+    attachments = [(f'doc{i}.pdf', '.pdf', build_text_pdf(f'Documento {i}. {INVOICE}')) for i in range(4)]
+    start = time.perf_counter()
+    results = extractor.extract(attachments)
+    elapsed = time.perf_counter() - start
+    ok = check(all(r['status'] == 'ok' for r in results), "4 anexos extraídos")
+    ok &= check([r['filename'] for r in results] == ['doc0.pdf', 'doc1.pdf', 'doc2.pdf', 'doc3.pdf'],
+                "resultados na ordem dos anexos")
+    ok &= check(elapsed < 0.6, f"em paralelo: {elapsed * 1000:.0f} ms (sequencial seria 800 ms)")
+    return ok
+
+
+def test_budgets():
+    print("\n⏱️  Limites de tamanho e de tempo...")
+
+    def stuck_pdf(pdf_file, deadline):
+        time.sleep(1.0)  # uma página patológica que não devolve o controle
+        return 'tarde demais'
+
+    extractor = AttachmentExtractor(stuck_pdf, workers=2, max_bytes=1000, timeout=0.2)
+    start = time.perf_counter()
+    results = extractor.extract([('grande.txt', '.txt', b'x' * 2000), ('travado.pdf', '.pdf', b'%PDF-1.4 ...'),
+                                 ('ok.txt', '.txt', 'Preciso de suporte'.encode())])
+    elapsed = time.perf_counter() - start
+    ok = check(results[0]['status'] == 'too_large' and results[0]['chars'] == 0, "anexo acima do limite de bytes ignorado")
+    ok &= check(results[1]['status'] == 'timeout', "PDF travado dado como timeout")
+    ok &= check(elapsed < 0.9, f"quem espera não fica preso ao PDF travado ({elapsed * 1000:.0f} ms)")
+    ok &= check(results[2]['status'] == 'ok', "os demais anexos seguem normalmente")
+
+    pages = build_text_pdf('\n'.join(f'Linha {i} da página' for i in range(2000)))
+    full = extract_text_from_pdf(io.BytesIO(pages))
+    partial = extract_text_from_pdf(io.BytesIO(pages), deadline=time.monotonic())
+    ok &= check(partial is not None and len(partial) < len(full),
+                f"prazo vencido para entre páginas ({len(partial)} de {len(full)} caracteres)")
+
+    broken = AttachmentExtractor(extract_text_from_pdf).extract([('ruim.pdf', '.pdf', b'isto nao e pdf')])[0]
+    ok &= check(broken['status'] == 'error', "PDF ilegível marcado como erro")
+    return ok
+
+
+def test_weighting():
+    print("\n⚖️  Peso dos anexos na classificação...")
+    fields = frozenset(('category', 'confidence'))
+    body = 'Bom dia, muito obrigado! Segue em anexo.'
+    plain = classify_email_message(body, None, fields, 'rules', 'test')
+    message = build_email(body, [('fatura.pdf', build_text_pdf(INVOICE))])
+    with_attachment = classify_email_message(body, message, fields, 'rules', 'test')
+    ok = check('attachments' in with_attachment and with_attachment['attachments'][0]['status'] in ('ok', 'cached'),
+               "anexo listado no resultado (sem o texto)")
+    ok &= check('text' not in with_attachment['attachments'][0], "texto do anexo não vai para a resposta")
+    attachment = with_attachment['attachment_classification']
+    ok &= check(attachment['category'] == 'Produtivo' and attachment['weight'] == 0.3,
+                f"anexo classificado à parte: {attachment}")
+    print(f"   corpo sozinho: {plain['category']} ({plain['confidence']}); "
+          f"com anexo: {with_attachment['category']} ({with_attachment['confidence']})")
+    def productive(result):
+        return result['confidence'] if result['category'] == 'Produtivo' else 1 - result['confidence']
+
+    ok &= check(productive(with_attachment) > productive(plain) + 0.1,
+                "anexo produtivo puxa a classificação para Produtivo")
+
+    only_attachment = classify_email_message('', build_email('', [('fatura.pdf', build_text_pdf(INVOICE))]),
+                                             fields, 'rules', 'test')
+    ok &= check(only_attachment['category'] == 'Produtivo' and only_attachment['attachment_classification']['weight'] == 1.0,
+                "corpo vazio: só os anexos decidem")
+    ok &= check(classify_email_message('', None, fields, 'rules', 'test') is None, "sem texto nenhum: None")
+    return ok
+
+
+def main():
+    tests = [test_iter_attachments, test_cache_and_dedupe, test_parallel_extraction, test_budgets, test_weighting]
+    results = [test() for test in tests]
+    print(f"\n📊 {sum(results)}/{len(results)} testes passaram")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Testes do aprendizado online (online_learning.py)
+Dois FeedbackLearner sobre o mesmo arquivo de modelo simulam dois workers:
+verifica que os deltas de um chegam ao outro, que o resultado é o mesmo de
+treinar direto com as correções, que o arquivo do modelo só é regravado na
+incorporação do log e que um modelo recarregado depois dela é equivalente.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from linear_model import LinearEngine, LogisticRegressionModel, NaiveBayesModel  # noqa: E402
+from model_artifact import is_artifact, load_artifact_engine, save_artifact  # noqa: E402
+from online_learning import FeedbackLearner, load_trainable, save_model  # noqa: E402
+from synthetic_corpus import CorpusGenerator  # noqa: E402
+
+
+def preprocess(text):
+    return ' '.join(text.lower().split())
+
+
+def load_serving(path):
+    if is_artifact(path):
+        return load_artifact_engine(path, preprocess)
+    return LinearEngine.load(path, preprocess)
+
+
+EMAILS = [(item['body'], item['label']) for item in CorpusGenerator(seed=7).iter_emails(260)]
+BASE, FEEDBACK, PROBES = EMAILS[:150], EMAILS[150:230], [text for text, _ in EMAILS[230:]]
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def build_model(model_factory, path):
+    engine = LinearEngine(preprocess, model=model_factory())
+    for text, label in BASE:
+        engine.learn(text, label)
+    engine.finalize()
+    if is_artifact(path):
+        save_artifact(engine, path)
+    else:
+        save_model(engine, path)
+
+
+def reference(model_factory, feedback):
+    """Modelo treinado direto com a base e as correções, na ordem do log"""
+    engine = LinearEngine(preprocess, model=model_factory())
+    for text, label in BASE + feedback:
+        engine.learn(text, label)
+    return engine.finalize()
+
+
+def scores(engine):
+    return [engine.model.decision(*engine.vectorizer.transform(engine.tokens(text), text)) for text in PROBES]
+
+
+def same_scores(a, b):
+    return all(abs(x - y) < 1e-6 for x, y in zip(scores(a), scores(b)))
+
+
+class Worker:
+    def __init__(self, path, fold_records):
+        self.engine = load_serving(path)
+        self.learner = FeedbackLearner(path, preprocess, load_serving, self.publish, fold_records=fold_records)
+
+    def publish(self, engine):
+        self.engine = engine
+
+
+def run_workers(model_factory, extension):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'linear_model' + extension)
+        build_model(model_factory, path)
+        with open(path, 'rb') as f:
+            original = f.read()
+        first, second = Worker(path, fold_records=4), Worker(path, fold_records=4)
+
+        # Lotes alternados entre os workers; o delta de cada um parte do log inteiro
+        batches = [FEEDBACK[i:i + 20] for i in range(0, 60, 20)]
+        for worker, batch in zip((first, second, first), batches):
+            for text, label in batch:
+                worker.learner._pending.append((text, label))
+            worker.learner.merge()
+        second.learner.merge()
+
+        with open(path, 'rb') as f:
+            unchanged = f.read() == original
+        expected = reference(model_factory, FEEDBACK[:60])
+        ok = check(unchanged, f"{extension}: arquivo do modelo intacto antes da incorporação")
+        ok &= check(same_scores(first.engine, expected) and same_scores(second.engine, expected),
+                    f"{extension}: os dois workers servem o mesmo modelo do treino direto")
+
+        # O quarto lote completa fold_records linhas: log incorporado e esvaziado
+        for text, label in FEEDBACK[60:]:
+            second.learner._pending.append((text, label))
+        second.learner.merge()
+        first.learner.merge()
+        expected = reference(model_factory, FEEDBACK)
+        ok &= check(second.learner.folds == 1 and os.path.getsize(path + '.deltas') == 0,
+                    f"{extension}: log incorporado ao modelo após {second.learner.fold_records} lotes")
+        ok &= check(same_scores(load_trainable(path, preprocess), expected)
+                    and same_scores(first.engine, expected) and same_scores(second.engine, expected),
+                    f"{extension}: modelo gravado e workers equivalentes ao treino direto")
+        return ok
+
+
+def test_naive_bayes():
+    print("\n🧮 Naive Bayes (JSON e artefato)...")
+    return all([run_workers(NaiveBayesModel, '.json'), run_workers(NaiveBayesModel, '.bin')])
+
+
+def test_logistic_regression():
+    print("\n📈 Regressão logística (JSON e artefato)...")
+    return all([run_workers(LogisticRegressionModel, '.json'), run_workers(LogisticRegressionModel, '.bin')])
+
+
+def main():
+    tests = [test_naive_bayes, test_logistic_regression]
+    results = [test() for test in tests]
+    print(f"\n📊 {sum(results)}/{len(results)} testes passaram")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Testes da fila de jobs (job_queue.py)
+Simula um worker lento cujo prazo de visibilidade vence enquanto outro pega o
+mesmo job: verifica que só a tentativa atual grava progresso, resultado ou
+falha e que o pool conta a tentativa perdida em vez de um job processado.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from job_queue import JobQueue, JobWorkerPool  # noqa: E402
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def expired_queue(name):
+    """Fila com prazo de visibilidade zero: todo job 'running' pode ser retirado de novo"""
+    return JobQueue(os.path.join(TEMP_DIR, f'{name}.db'), visibility_timeout=0, retry_delay=0)
+
+
+def test_complete_lease():
+    print("\n🔑 Conclusão com lease...")
+    queue = expired_queue('complete')
+    job_id = queue.enqueue('pdf', {})
+    slow = queue.claim()
+    fast = queue.claim()
+    ok = check(slow['id'] == fast['id'] == job_id, "job retirado de novo depois do prazo")
+    ok &= check(not queue.progress(job_id, 0.5, slow['attempts'] + 1), "progresso da tentativa antiga ignorado")
+    ok &= check(queue.complete(job_id, {'by': 'fast'}, fast['attempts'] + 1), "tentativa atual conclui")
+    ok &= check(not queue.complete(job_id, {'by': 'slow'}, slow['attempts'] + 1),
+                "tentativa antiga não sobrescreve o resultado")
+    ok &= check(queue.fail(job_id, 'tarde demais', slow['attempts'] + 1) is None,
+                "falha da tentativa antiga ignorada")
+    job = queue.get(job_id)
+    ok &= check(job['status'] == 'done' and job['result'] == {'by': 'fast'}, f"job final: {job['status']}")
+    return ok
+
+
+def test_fail_lease():
+    print("\n🔁 Falha com lease...")
+    queue = expired_queue('fail')
+    job_id = queue.enqueue('pdf', {})
+    slow = queue.claim()
+    fast = queue.claim()
+    ok = check(queue.fail(job_id, 'erro', slow['attempts'] + 1) is None, "tentativa antiga não reenfileira")
+    ok &= check(queue.fail(job_id, 'erro', fast['attempts'] + 1) == 'queued', "tentativa atual reenfileira")
+    return ok
+
+
+def test_pool_counts_lost():
+    print("\n👷 Contadores do pool...")
+    queue = expired_queue('pool')
+    job_id = queue.enqueue('slow', {})
+    pool = JobWorkerPool(queue, {}, workers=0)
+
+    def handler(payload, data, progress):
+        # Enquanto este worker trabalha, outro pega e conclui o mesmo job
+        other = queue.claim()
+        queue.complete(other['id'], {'by': 'other'}, other['attempts'] + 1)
+        return {'by': 'slow'}
+
+    pool.handlers['slow'] = handler
+    pool.run_once()
+    job = queue.get(job_id)
+    ok = check(pool.processed == 0 and pool.lost == 1, f"processed={pool.processed}, lost={pool.lost}")
+    ok &= check(job['result'] == {'by': 'other'}, "resultado do outro worker preservado")
+    return ok
+
+
+def main():
+    tests = [test_complete_lease, test_fail_lease, test_pool_counts_lost]
+    results = [test() for test in tests]
+    print(f"\n📊 {sum(results)}/{len(results)} testes passaram")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
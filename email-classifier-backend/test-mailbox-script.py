@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Testes da consulta de várias caixas de email (mail_fetcher.py)
+Roda contra servidores IMAP simulados em memória, sem rede: verifica que só
+mensagens novas são buscadas, os limites de conexões (global e por conta), o
+limite de logins por minuto, o recuo exponencial e as métricas por conta.
+As sessões IDLE falam o protocolo de verdade por um socketpair, e o log de
+eventos do SSE é testado em um banco temporário, assim como o endpoint
+/mailboxes/events (404 sem caixas, limite de streams por worker).
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formatdate
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from event_log import EventLog  # noqa: E402
+from mail_fetcher import MailAccount, MailboxPoller, MailboxWatcher, fetch_latest  # noqa: E402
+
+
+class FakeIMAPServer:
+    """Uma caixa de entrada em memória; cada conexão é um FakeIMAP"""
+
+    def __init__(self, latency=0.0, fail=False):
+        self.messages = {}
+        self.next_uid = 1
+        self.latency = latency
+        self.fail = fail
+        self.logins = 0
+        self.fetched_uids = []
+        self.idlers = set()
+        self.lock = threading.Lock()
+
+    def deliver(self, subject, body, age_seconds=0):
+        message = EmailMessage()
+        message['From'] = 'cliente@example.com'
+        message['Subject'] = subject
+        message['Date'] = formatdate(time.time() - age_seconds)
+        message.set_content(body)
+        with self.lock:
+            self.messages[self.next_uid] = message.as_bytes()
+            self.next_uid += 1
+            count = len(self.messages)
+            idlers = list(self.idlers)
+        for connection in idlers:
+            connection.notify(f'* {count} EXISTS\r\n'.encode())
+
+    def drop_connections(self):
+        """Derruba as sessões abertas, como uma queda de rede"""
+        with self.lock:
+            idlers, self.idlers = list(self.idlers), set()
+        for connection in idlers:
+            connection.peer.close()
+
+    def factory(self, host, port):
+        return FakeIMAP(self)
+
+    def idle_factory(self, host, port):
+        return FakeIdleIMAP(self)
+
+
+class FakeIMAP:
+    """Subconjunto de imaplib.IMAP4 usado pelo mail_fetcher"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def login(self, user, password):
+        time.sleep(self.server.latency)
+        if self.server.fail:
+            raise OSError('conexão recusada')
+        with self.server.lock:
+            self.server.logins += 1
+        return 'OK', [b'LOGIN completed']
+
+    def select(self, folder):
+        return 'OK', [str(len(self.server.messages)).encode()]
+
+    def uid(self, command, *args):
+        with self.server.lock:
+            uids = sorted(self.server.messages)
+        if command == 'search':
+            criteria = args[1]
+            if criteria != 'ALL':
+                start = int(criteria.split()[1].split(':')[0])
+                # Como um servidor real: "n:*" inclui sempre a última mensagem
+                uids = [uid for uid in uids if uid >= start] or uids[-1:]
+            return 'OK', [' '.join(str(uid) for uid in uids).encode()]
+        if command == 'fetch':
+            time.sleep(self.server.latency)
+            wanted = [int(uid) for uid in args[0].split(',')]
+            data = []
+            with self.server.lock:
+                self.server.fetched_uids.extend(wanted)
+                for uid in wanted:
+                    raw = self.server.messages[uid]
+                    data.append((f'{uid} (UID {uid} RFC822 {{{len(raw)}}}'.encode(), raw))
+                    data.append(b')')
+            return 'OK', data
+        raise ValueError(command)
+
+    def noop(self):
+        return 'OK', [b'']
+
+    def logout(self):
+        return 'BYE', [b'']
+
+
+class FakeIdleIMAP(FakeIMAP):
+    """FakeIMAP com IDLE: as respostas do servidor passam por um socketpair"""
+
+    capabilities = ('IMAP4REV1', 'IDLE')
+
+    def __init__(self, server):
+        super().__init__(server)
+        self.sock, self.peer = socket.socketpair()
+        self.file = self.sock.makefile('rb')
+        self.tagnum = 0
+        self.idle_tag = None
+        self.known = 0
+
+    def _new_tag(self):
+        self.tagnum += 1
+        return f'T{self.tagnum}'.encode()
+
+    def send(self, data):
+        command = data.strip()
+        if command.endswith(b' IDLE'):
+            self.idle_tag = command.split()[0]
+            with self.server.lock:
+                count = len(self.server.messages)
+                self.server.idlers.add(self)
+            # Como um servidor real: mensagens que chegaram fora do IDLE são
+            # anunciadas na próxima resposta
+            if count > self.known:
+                self.peer.sendall(f'* {count} EXISTS\r\n'.encode())
+            self.peer.sendall(b'+ idling\r\n')
+        elif command == b'DONE':
+            with self.server.lock:
+                self.server.idlers.discard(self)
+            self.peer.sendall(self.idle_tag + b' OK IDLE terminated\r\n')
+
+    def uid(self, command, *args):
+        if command == 'search':
+            with self.server.lock:
+                self.known = len(self.server.messages)
+        return super().uid(command, *args)
+
+    def notify(self, line):
+        try:
+            self.peer.sendall(line)
+        except OSError:
+            pass
+
+    def readline(self):
+        return self.file.readline()
+
+    def logout(self):
+        with self.server.lock:
+            self.server.idlers.discard(self)
+        self.file.close()
+        self.sock.close()
+        self.peer.close()
+        return 'BYE', [b'']
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def account(name, **options):
+    return MailAccount(name, 'imap.example.com', f'{name}@example.com', password='segredo', **options)
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def test_new_messages_only():
+    print("\n📬 Apenas mensagens novas...")
+    server = FakeIMAPServer()
+    for i in range(8):
+        server.deliver(f'Pedido {i}', f'Qual o status do pedido {i}?', age_seconds=30)
+    classified = []
+    poller = MailboxPoller([account('vendas', limit=5, connections_per_minute=6000, poll_interval=0.01)],
+                           lambda acc, uid, message: classified.append(uid), imap_factory=server.factory)
+    poller.poll_all()
+    ok = check(classified == [4, 5, 6, 7, 8], f"primeira consulta busca as últimas 5: {classified}")
+    server.deliver('Novo', 'Erro no sistema, preciso de ajuda')
+    time.sleep(0.02)
+    poller.poll_all()
+    ok &= check(classified[5:] == [9], f"segunda consulta busca só a nova: {classified[5:]}")
+    time.sleep(0.02)
+    poller.poll_all()
+    ok &= check(len(classified) == 6, "sem mensagens novas nada é classificado de novo")
+    metrics = poller.metrics()['accounts']['vendas']
+    ok &= check(metrics['avg_arrival_lag_seconds'] is not None and metrics['avg_arrival_lag_seconds'] >= 20,
+                f"atraso de chegada medido: {metrics['avg_arrival_lag_seconds']} s")
+    ok &= check(metrics['messages_per_second'] is not None, f"vazão medida: {metrics['messages_per_second']} msg/s")
+    return ok
+
+
+def test_global_connection_cap():
+    print("\n🔒 Limite global de conexões...")
+    servers = [FakeIMAPServer(latency=0.05) for _ in range(6)]
+    for server in servers:
+        server.deliver('Oi', 'Preciso de suporte')
+    accounts = [MailAccount(f'conta{i}', f'imap{i}.example.com', f'conta{i}@example.com', password='segredo')
+                for i in range(6)]
+    # Cada conta fala com o próprio servidor simulado
+    by_host = {acc.host: server for acc, server in zip(accounts, servers)}
+    poller = MailboxPoller(accounts, lambda *args: None, max_connections=3,
+                           imap_factory=lambda host, port: FakeIMAP(by_host[host]))
+    start = time.perf_counter()
+    poller.poll_all()
+    elapsed = time.perf_counter() - start
+    metrics = poller.metrics()
+    ok = check(metrics['max_active_connections'] <= 3,
+               f"no máximo 3 conexões simultâneas (pico: {metrics['max_active_connections']})")
+    ok &= check(all(server.logins == 1 for server in servers), "todas as 6 contas consultadas")
+    ok &= check(elapsed < 6 * 0.1, f"contas consultadas em paralelo ({elapsed * 1000:.0f} ms)")
+    return ok
+
+
+def test_per_account_concurrency():
+    print("\n🔀 Conexões por conta...")
+    server = FakeIMAPServer(latency=0.02)
+    for i in range(5):
+        server.deliver(f'Msg {i}', 'texto')
+    classified = []
+    poller = MailboxPoller([account('suporte', limit=100, max_connections=2, fetch_chunk=10,
+                                    connections_per_minute=600, poll_interval=0.01)],
+                           lambda acc, uid, message: classified.append(uid), max_connections=8,
+                           imap_factory=server.factory)
+    poller.poll_all()
+    for i in range(60):
+        server.deliver(f'Lote {i}', 'texto')
+    time.sleep(0.02)
+    poller.poll_all()
+    state = poller.accounts['suporte']
+    ok = check(classified == list(range(1, 66)), f"{len(classified)} mensagens, em ordem, sem repetição")
+    ok &= check(state.max_active_connections == 2,
+                f"blocos buscados em até 2 conexões da conta (pico: {state.max_active_connections})")
+    ok &= check(sorted(server.fetched_uids) == list(range(1, 66)), "cada UID buscado uma única vez")
+    return ok
+
+
+def test_backlog_and_rate_limit():
+    print("\n⏱️  Limite de logins por minuto...")
+    server = FakeIMAPServer()
+    for i in range(30):
+        server.deliver(f'Msg {i}', 'texto')
+    poller = MailboxPoller([account('financeiro', limit=10, connections_per_minute=2, poll_interval=0.01)],
+                           lambda *args: None, imap_factory=server.factory)
+    poller.poll_all()
+    for i in range(25):
+        server.deliver(f'Nova {i}', 'texto')
+    time.sleep(0.02)
+    for _ in range(5):
+        poller.poll_all()
+    metrics = poller.metrics()['accounts']['financeiro']
+    ok = check(server.logins == 1, f"só 1 login no primeiro minuto com burst 1 (logins: {server.logins})")
+    ok &= check(metrics['rate_limited'] >= 1, f"consultas adiadas pelo limite: {metrics['rate_limited']}")
+
+    poller = MailboxPoller([account('financeiro', limit=10, connections_per_minute=6000, poll_interval=60)],
+                           lambda *args: None, imap_factory=server.factory)
+    poller.accounts['financeiro'].last_uid = 30
+    poller.poll_all()
+    metrics = poller.metrics()['accounts']['financeiro']
+    ok &= check(metrics['backlog'] == 15, f"mensagens acumuladas informadas: {metrics['backlog']}")
+    time.sleep(0.01)
+    poller.poll_all()
+    ok &= check(poller.accounts['financeiro'].last_uid == 50,
+                "conta com acúmulo é consultada de novo sem esperar o intervalo")
+    return ok
+
+
+def test_exponential_backoff():
+    print("\n📉 Recuo exponencial em erros...")
+    server = FakeIMAPServer(fail=True)
+    poller = MailboxPoller([account('instavel', connections_per_minute=6000)], lambda *args: None,
+                           imap_factory=server.factory, base_backoff=0.05, max_backoff=0.2)
+    state = poller.accounts['instavel']
+    delays = []
+    for _ in range(4):
+        while time.monotonic() < state.next_poll_at:
+            time.sleep(0.005)
+        before = time.monotonic()
+        poller.poll_all()
+        delays.append(state.backoff_until - before)
+    ok = check(state.consecutive_failures == 4, f"falhas seguidas contadas: {state.consecutive_failures}")
+    ok &= check(delays[1] > delays[0] * 1.3 and delays[2] > delays[1] * 1.3,
+                f"espera dobra a cada falha: {[round(d, 3) for d in delays]}")
+    ok &= check(delays[3] <= 0.2 * 1.2 + 0.01, "espera limitada por max_backoff")
+    poller.poll_due()
+    ok &= check(poller.metrics()['accounts']['instavel']['backoff_seconds'] > 0,
+                "conta em recuo não é consultada antes do prazo")
+
+    server.fail = False
+    server.deliver('Voltou', 'texto')
+    time.sleep(0.25)
+    poller.poll_all()
+    metrics = poller.metrics()['accounts']['instavel']
+    ok &= check(metrics['consecutive_failures'] == 0 and metrics['messages'] == 1,
+                "recuperação zera as falhas e busca as mensagens")
+    return ok
+
+
+def test_fetch_latest():
+    print("\n📥 fetch_latest (usado pelo /fetch-emails)...")
+    server = FakeIMAPServer()
+    for i in range(4):
+        server.deliver(f'Assunto {i}', f'Corpo {i}')
+    emails = fetch_latest(account('hotmail'), 2, imap_factory=server.factory)
+    return check([e['subject'] for e in emails] == ['Assunto 3', 'Assunto 2'] and emails[0]['body'].strip() == 'Corpo 3',
+                 "últimas mensagens, da mais recente para a mais antiga")
+
+
+def test_idle_watcher():
+    print("\n🔔 Sessão IDLE...")
+    server = FakeIMAPServer()
+    for i in range(3):
+        server.deliver(f'Antigo {i}', 'texto')
+    classified = []
+    watcher = MailboxWatcher([account('suporte')], lambda acc, uid, message: classified.append(uid),
+                             imap_factory=server.idle_factory, idle_timeout=5, base_backoff=0.05, max_backoff=0.1)
+    watcher.ensure_started()
+    ok = check(wait_for(lambda: server.idlers), "sessão em IDLE após conectar")
+    ok &= check(not classified, "mensagens anteriores à sessão não são classificadas")
+
+    arrivals = []
+    for i in range(5):
+        arrivals.append(time.perf_counter())
+        server.deliver(f'Novo {i}', 'Erro no sistema')
+        wait_for(lambda: len(classified) == i + 1)
+        arrivals[-1] = (time.perf_counter() - arrivals[-1]) * 1000
+    ok &= check(classified == [4, 5, 6, 7, 8], f"cada mensagem nova classificada uma vez: {classified}")
+    ok &= check(max(arrivals) < 500, f"chegada → classificação: máx {max(arrivals):.1f} ms")
+    latency = watcher.metrics()['accounts']['suporte']['notification_to_classification_ms']
+    ok &= check(latency['samples'] == 5 and latency['p95'] is not None,
+                f"atraso reportado: p50 {latency['p50']} ms, p95 {latency['p95']} ms")
+
+    for i in range(20):
+        server.deliver(f'Rajada {i}', 'texto')
+    ok &= check(wait_for(lambda: len(classified) == 25) and classified[5:] == list(range(9, 29)),
+                "rajada de 20 mensagens sem perda nem repetição")
+
+    server.drop_connections()
+    server.deliver('Durante a queda', 'texto')
+    ok &= check(wait_for(lambda: classified[-1:] == [29]), "reconecta e classifica o que chegou durante a queda")
+    metrics = watcher.metrics()['accounts']['suporte']
+    ok &= check(metrics['sessions'] == 2 and metrics['errors'] == 1,
+                f"queda contada e sessão refeita (sessões: {metrics['sessions']}, erros: {metrics['errors']})")
+    watcher.stop()
+    return ok
+
+
+def test_idle_fallback():
+    print("\n🔁 Servidor sem IDLE...")
+    server = FakeIMAPServer()
+    classified = []
+    watcher = MailboxWatcher([account('legado')], lambda acc, uid, message: classified.append(uid),
+                             imap_factory=server.factory, fallback_interval=0.05)
+    watcher.ensure_started()
+    wait_for(lambda: watcher.metrics()['accounts']['legado']['connected'])
+    server.deliver('Oi', 'texto')
+    ok = check(wait_for(lambda: classified == [1]), "consulta periódica encontra a mensagem")
+    ok &= check(watcher.metrics()['accounts']['legado']['idle_supported'] is False, "falta de IDLE informada")
+    watcher.stop()
+    return ok
+
+
+def test_event_log():
+    print("\n📡 Log de eventos do SSE...")
+    with tempfile.TemporaryDirectory() as directory:
+        log = EventLog(os.path.join(directory, 'events.db'), retention=150)
+        ok = check(log.last_id() == 0, "log vazio começa em 0")
+        ids = [log.publish('classification', {'n': i}) for i in range(200)]
+        ok &= check(ids == list(range(1, 201)), "IDs crescentes")
+        events = log.since(195)
+        ok &= check([event_id for event_id, _, _ in events] == [196, 197, 198, 199, 200],
+                    "leitura a partir do último ID recebido")
+        reader = EventLog(log.path)
+        ok &= check(reader.since(0, limit=1)[0][0] == 51, "só os últimos eventos são mantidos")
+    return ok
+
+
+class StubMailboxService:
+    """Finge uma leitura de caixas configurada (o endpoint só confere que existe)"""
+
+    def ensure_started(self):
+        pass
+
+    def metrics(self):
+        return {'accounts': {}}
+
+
+def test_events_endpoint():
+    print("\n🚰 Endpoint /mailboxes/events...")
+    directory = tempfile.mkdtemp()
+    os.environ.update(CLASSIFICATION_STORE_PATH='', JOB_WORKERS='0', SSE_MAX_STREAMS='1',
+                      STATS_FILE=os.path.join(directory, 'stats.bin'),
+                      JOBS_DB_PATH=os.path.join(directory, 'jobs.db'),
+                      EVENTS_DB_PATH=os.path.join(directory, 'events.db'))
+    import app as app_module
+
+    client = app_module.app.test_client()
+    ok = check(client.get('/mailboxes/events').status_code == 404, "sem caixas configuradas: 404")
+
+    app_module.mailbox_service = StubMailboxService()
+    try:
+        ok &= check(client.get('/mailboxes/stats').get_json()['events'] is True, "/mailboxes/stats anuncia o stream")
+        first = client.get('/mailboxes/events')
+        ok &= check(first.status_code == 200, "primeiro stream aceito")
+        ok &= check(client.get('/mailboxes/events').status_code == 503, "acima de SSE_MAX_STREAMS: 503")
+        first.close()
+        second = client.get('/mailboxes/events')
+        ok &= check(second.status_code == 200, "vaga liberada quando o stream fecha")
+        second.close()
+    finally:
+        app_module.mailbox_service = None
+    return ok
+
+
+def main():
+    tests = [test_new_messages_only, test_global_connection_cap, test_per_account_concurrency,
+             test_backlog_and_rate_limit, test_exponential_backoff, test_fetch_latest,
+             test_idle_watcher, test_idle_fallback, test_event_log, test_events_endpoint]
+    results = [test() for test in tests]
+    print(f"\n📊 {sum(results)}/{len(results)} testes passaram")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
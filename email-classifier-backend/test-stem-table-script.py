@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Testes da tabela de radicais (stem_table.py)
+Gera uma tabela a partir de um corpus sintético e verifica o formato, que cada
+entrada é o radical do RSLP, que preprocess_text dá o mesmo resultado com e sem
+a tabela em textos fora do corpus (com palavras que não estão nela) e que
+palavras fora da tabela caem no stemmer, vão para o log uma vez e aparecem nas
+métricas.
+
+Os testes que comparam com o RSLP precisam dos dados do NLTK
+(python setup-nltk-script.py); sem eles são pulados com aviso, ou contam como
+falha com --require-rslp.
+"""
+
+import copy
+import logging
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+# Serverless: o stemmer só é carregado no primeiro uso, depois de a tabela existir
+TEMP_DIR = tempfile.mkdtemp()
+TABLE_PATH = os.path.join(TEMP_DIR, 'stem_table.tsv')
+os.environ.update(SERVERLESS='1', STEM_TABLE_PATH=TABLE_PATH, CLASSIFICATION_STORE_PATH='', JOB_WORKERS='0',
+                  STATS_FILE=os.path.join(TEMP_DIR, 'stats.bin'), JOBS_DB_PATH=os.path.join(TEMP_DIR, 'jobs.db'),
+                  EVENTS_DB_PATH=os.path.join(TEMP_DIR, 'events.db'))
+
+from app import app, classifier, rslp_stemmer, stemmer  # noqa: E402
+from nlp_resources import LazyResource  # noqa: E402
+from stem_table import (  # noqa: E402
+    StemTableError, TableStemmer, build_stems, collect_vocabulary, decode_entry,
+    encode_entry, load_table, save_table,
+)
+from synthetic_corpus import CorpusGenerator  # noqa: E402
+
+
+RSLP = rslp_stemmer.get()
+PIPELINE = classifier.pipelines['pt']
+TEXTS = [item['body'] for item in CorpusGenerator(seed=7, languages=('pt',)).iter_emails(300)]
+# Fora do corpus da tabela: outra semente e frases com palavras que ela não tem
+HELD_OUT = [item['body'] for item in CorpusGenerator(seed=1234, languages=('pt',)).iter_emails(100)] + [
+    "Os engenheiros reavaliaram as especificações dos transformadores antes da inauguração.",
+    "Precisamos renegociar as cláusulas contratuais com os fornecedores internacionais.",
+    "As auditorias trimestrais identificaram inconsistências nas conciliações bancárias.",
+]
+
+
+class SuffixStemmer:
+    """Stemmer de brinquedo para testar o mecanismo da tabela sem depender do NLTK"""
+
+    def stem(self, word):
+        return word[:-2] if word.endswith('es') else word.rstrip('s')
+
+
+def tokens(text):
+    return [word for word in classifier.clean_tokens(text, PIPELINE)
+            if len(word) > 2 and word not in PIPELINE.stop_words]
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def test_format():
+    print("\n📄 Formato da tabela...")
+    pairs = [('casa', 'casa'), ('cadeiras', 'cadeir'), ('soube', 'sab'), ('ação', 'açã'), ('pôr', 'por')]
+    ok = check(all(decode_entry(encode_entry(word, stem)) == (word, stem) for word, stem in pairs),
+               "codifica e decodifica palavra → radical")
+    ok &= check(encode_entry('cadeiras', 'cadeir') == 'cadeiras\t6', "radical prefixo da palavra: só o tamanho")
+
+    path = os.path.join(TEMP_DIR, 'format.tsv')
+    save_table(path, dict(pairs), 'teste')
+    stems, name = load_table(path)
+    ok &= check(stems == dict(pairs) and name == 'teste', "grava e relê a tabela")
+
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines[:-2]) + '\n')
+    try:
+        load_table(path)
+        ok &= check(False, "tabela truncada é recusada")
+    except StemTableError:
+        ok &= check(True, "tabela truncada é recusada")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# stem-table v9 rslp 0\n')
+    try:
+        load_table(path)
+        ok &= check(False, "versão desconhecida é recusada")
+    except StemTableError:
+        ok &= check(True, "versão desconhecida é recusada")
+    return ok
+
+
+def test_table_matches_stemmer():
+    print("\n✂️  Tabela gerada do corpus...")
+    if RSLP is None:
+        return None
+    words = collect_vocabulary(TEXTS, tokens)
+    save_table(TABLE_PATH, build_stems(words, RSLP), 'rslp')
+    stems, _ = load_table(TABLE_PATH)
+    ok = check(len(stems) == len(words) > 100, f"{len(stems)} palavras na tabela")
+    wrong = [word for word, stem in stems.items() if stem != RSLP.stem(word)]
+    ok &= check(not wrong, f"toda entrada é o radical do RSLP {wrong[:5]}")
+    return ok
+
+
+def test_preprocess_parity():
+    print("\n🔁 preprocess_text com e sem a tabela...")
+    if RSLP is None:
+        return None
+    table_stemmer = stemmer.get()
+    ok = check(isinstance(table_stemmer, TableStemmer), "app carrega a tabela de STEM_TABLE_PATH")
+    unseen = {word for text in HELD_OUT for word in tokens(text)} - set(table_stemmer.stems)
+    ok &= check(len(unseen) >= 10, f"{len(unseen)} palavras dos textos fora do corpus não estão na tabela")
+
+    # Mesmo pipeline do app, com o RSLP no lugar da tabela
+    plain = copy.copy(PIPELINE)
+    plain._stemmer = rslp_stemmer
+    rules = SimpleNamespace(pipelines={'pt': plain})
+    with_table = [classifier.preprocess_text(text, 'pt') for text in HELD_OUT]
+    without_table = [classifier.preprocess_text(text, 'pt', rules) for text in HELD_OUT]
+    ok &= check(with_table == without_table, f"mesmo texto pré-processado nos {len(HELD_OUT)} textos")
+    metrics = table_stemmer.metrics()
+    ok &= check(metrics['hits'] > 0 and metrics['unseen_words'] == len(unseen),
+                f"palavras novas resolvidas pelo RSLP ({metrics['misses']} consultas fora da tabela)")
+
+    response = app.test_client().get('/stems/stats')
+    ok &= check(response.status_code == 200 and response.get_json()['table_words'] == len(table_stemmer.stems),
+                "/stems/stats responde com as métricas")
+    return ok
+
+
+def test_fallback():
+    print("\n🪂 Palavras fora da tabela...")
+    reference = SuffixStemmer()
+    fallback = LazyResource(lambda: reference)
+    table_stemmer = TableStemmer({'cadeiras': 'cadeir'}, fallback)
+    ok = check(table_stemmer.stem('cadeiras') == 'cadeir' and not fallback.loaded,
+               "acerto na tabela não carrega o stemmer")
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger('stem_table')
+    logger.addHandler(handler)
+    previous_level = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        stems = [table_stemmer.stem('computadores') for _ in range(3)]
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(previous_level)
+    ok &= check(stems == ['computador'] * 3, "palavra nova vai ao stemmer de verdade")
+    ok &= check(len(records) == 1 and 'computadores' in records[0].getMessage(), "registrada no log uma vez")
+
+    metrics = table_stemmer.metrics()
+    ok &= check(metrics['hits'] == 1 and metrics['misses'] == 3 and metrics['hit_rate'] == 0.25,
+                f"acertos e faltas contados: {metrics['hits']}/{metrics['misses']}")
+    ok &= check(metrics['top_unseen'] == [{'word': 'computadores', 'count': 3}], "palavra listada em top_unseen")
+
+    no_fallback = TableStemmer({}, LazyResource(lambda: None))
+    ok &= check(no_fallback.stem('computadores') == 'computadores', "sem stemmer, a palavra fica como está")
+    return ok
+
+
+def main():
+    require_rslp = '--require-rslp' in sys.argv[1:]
+    tests = [test_format, test_table_matches_stemmer, test_preprocess_parity, test_fallback]
+    results = []
+    for test in tests:
+        result = test()
+        if result is None:
+            print("⚠️  PULADO: RSLP indisponível (python setup-nltk-script.py)")
+            if require_rslp:
+                result = check(False, "--require-rslp: RSLP obrigatório")
+        results.append(result)
+    ran = [result for result in results if result is not None]
+    skipped = len(results) - len(ran)
+    print(f"\n📊 {sum(ran)}/{len(ran)} testes passaram")
+    if skipped:
+        print(f"⚠️  {skipped} teste(s) pulado(s) sem o RSLP: a paridade com a tabela NÃO foi verificada")
+    sys.exit(0 if all(ran) else 1)
+
+
+if __name__ == "__main__":
+    main()
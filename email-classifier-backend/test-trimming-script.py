@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Testes do corte de histórico citado, avisos legais e assinaturas (text_trimming.py)
+Verifica que cabeçalhos de resposta, linhas citadas, avisos e assinaturas são
+cortados, que frases do corpo parecidas com atribuição ("o cliente escreveu: ...")
+e agradecimentos sozinhos ficam, e que as contagens fecham com a janela ligada.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from text_trimming import EmailTrimmer  # noqa: E402
+
+TRIMMER = EmailTrimmer()
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def test_quoted_history():
+    print("\n✂️  Histórico citado...")
+    cases = [
+        ("Oi\n\nEm seg., 3 de jun. de 2024 às 10:00, Ana <ana@acme.com.br> escreveu:\n> mensagem antiga", 'Oi'),
+        ("Hi\nOn Mon, Jun 3, 2024 at 10:00 AM John Smith <john@contoso.com>\nwrote:\nold message", 'Hi'),
+        ("Segue.\n-----Mensagem original-----\nDe: Ana\nanterior", 'Segue.'),
+        ("Certo.\nDe: Ana Silva\nEnviado: segunda-feira\nAssunto: x", 'Certo.'),
+        ("Ok\n> citado\n> mais", 'Ok'),
+    ]
+    ok = True
+    for text, expected in cases:
+        header = text.split('\n', 1)[1].strip()
+        ok &= check(TRIMMER.trim(text).text == expected, f"corta {header[:40]!r}")
+    return ok
+
+
+def test_body_attribution_kept():
+    print("\n📝 Frases do corpo com 'escreveu:' / 'wrote:'...")
+    cases = [
+        "Bom dia,\nOn Monday, the client wrote: we need the budget approved. "
+        "Please send the invoice by Friday.\nThanks",
+        "Olá,\nEm anexo segue o que o fornecedor escreveu: precisamos do contrato assinado até sexta.",
+        "Hi,\nOn the ticket, Ana wrote: the login page is down.\nCan you check?",
+    ]
+    ok = True
+    for text in cases:
+        result = TRIMMER.trim(text)
+        ok &= check(result.text == text and result.summary()['dropped']['quoted'] == 0,
+                    f"mantém {text.splitlines()[1][:40]!r}")
+    return ok
+
+
+def test_signature():
+    print("\n🖊️  Assinaturas e agradecimentos...")
+    ok = check(TRIMMER.trim("Pode revisar o relatório?\n\nAtenciosamente,\nAna Silva\nAcme Ltda").text
+               == "Pode revisar o relatório?", "despedida e assinatura cortadas")
+    ok &= check(TRIMMER.trim("Segue o arquivo.\n-- \nAna\n(11) 5555-0000").text == "Segue o arquivo.",
+                "separador '-- ' corta a assinatura")
+    ok &= check(TRIMMER.trim("Bom dia\nObrigado").text == "Bom dia\nObrigado", "'Obrigado' sozinho fica")
+    ok &= check(TRIMMER.trim("Oi\nObrigado!\nJoão Silva\nAcme").text == "Oi\nObrigado!",
+                "agradecimento fica e só a assinatura depois dele sai")
+    ok &= check(TRIMMER.trim("Thanks").text == "Thanks", "'Thanks' sozinho fica")
+    return ok
+
+
+def test_accounting():
+    print("\n📏 Contagens e janela...")
+    trimmer = EmailTrimmer(head_chars=50, tail_chars=20)
+    text = "  Assunto longo\n" + "palavra " * 40 + "\nAtenciosamente,\nAna\n\nEm seg., Ana escreveu:\n> x\n"
+    result = trimmer.trim(text)
+    summary = result.summary()
+    ok = check(len(result.text) <= 70, f"janela dentro do limite ({len(result.text)} caracteres)")
+    ok &= check(sum(summary['dropped'].values()) == summary['dropped_chars'],
+                "motivos somam os caracteres descartados")
+    return ok
+
+
+def main():
+    tests = [test_quoted_history, test_body_attribution_kept, test_signature, test_accounting]
+    results = [test() for test in tests]
+    print(f"\n📊 {sum(results)}/{len(results)} testes passaram")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
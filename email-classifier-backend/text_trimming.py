@@ -0,0 +1,144 @@
+"""
+Corte de respostas citadas, assinaturas e avisos legais antes da classificação
+Threads longas chegam com todas as mensagens anteriores citadas, assinaturas
+e rodapés jurídicos. Esta etapa roda antes do pré-processamento: algumas
+regex compiladas localizam o início do histórico citado, do aviso legal e da
+assinatura, e o texto é cortado nesses pontos sem tokenizar nada. Opcionalmente
+só o início e o fim do que sobra (janela de caracteres) seguem adiante.
+"""
+
+import re
+
+# Início do histórico citado (o que vem depois é descartado); a linha de
+# atribuição ("Em ... escreveu:") termina nos dois-pontos, senão é frase do corpo
+REPLY_HEADER_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'-{2,}[ \t]*(?:original message|mensagem original|forwarded message|mensagem encaminhada)[ \t]*-{2,}'
+    r'|_{10,}'
+    r'|(?:em|on)[ \t][^\n]{0,300}(?:\n[^\n]{0,300})?(?:escreveu|wrote)[ \t]*:[ \t]*$'
+    r'|(?:de|from)[ \t]*:[^\n]*\n(?:[^\n]*\n){0,3}?[ \t]*(?:enviad[ao]|sent|data|date)[ \t]*:'
+    r')',
+    re.IGNORECASE | re.MULTILINE,
+)
+QUOTED_LINE_RE = re.compile(r'^[ \t]*>[^\n]*(?:\n|$)', re.MULTILINE)
+
+# Avisos legais de rodapé (do início do aviso até o fim do texto)
+DISCLAIMER_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'aviso(?: legal)?[ \t]*:|disclaimer[ \t]*:|confidencial(?:idade)?[ \t]*:|confidentiality(?: notice)?[ \t]*:'
+    r'|esta (?:mensagem|comunicação)[^\n]{0,40}(?:pode conter|contém|é destinada)'
+    r'|this (?:message|e-?mail|communication)[^\n]{0,40}(?:may contain|contains|is intended)'
+    r')',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Assinatura: separador "-- " ou despedida sozinha na linha, perto do fim.
+# Um agradecimento sozinho é sinal de email improdutivo: fica no texto e só o
+# que vem depois dele é cortado
+SIGNATURE_SEPARATOR_RE = re.compile(r'^-- ?$', re.MULTILINE)
+VALEDICTION_RE = re.compile(
+    r'^[ \t]*(?:(?P<thanks>obrigad[oa]|grat[oa]|thanks|thank you)'
+    r'|atenciosamente|att\.?|abraços?|abs\.?|cordialmente|saudações'
+    r'|best regards|kind regards|regards|best|cheers|sincerely)[ \t]*[,.!]?[ \t]*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+MAX_SIGNATURE_LINES = 8
+MAX_SIGNATURE_CHARS = 400
+
+
+class TrimResult:
+    """Texto que segue para a classificação e quanto foi descartado por motivo"""
+
+    __slots__ = ('text', 'original_chars', 'dropped')
+
+    def __init__(self, text, original_chars, dropped):
+        self.text = text
+        self.original_chars = original_chars
+        self.dropped = dropped
+
+    def summary(self):
+        return {
+            'original_chars': self.original_chars,
+            'processed_chars': len(self.text),
+            'dropped_chars': self.original_chars - len(self.text),
+            'dropped': dict(self.dropped),
+        }
+
+
+class EmailTrimmer:
+    """Remove histórico citado, aviso legal e assinatura; aplica a janela início/fim
+
+    `head_chars`/`tail_chars` limitam o texto restante aos primeiros e últimos
+    caracteres (0 desliga a janela), com a quebra de linha entre as duas
+    partes dentro do limite. Se o corte não deixar nada, o texto original é
+    mantido. As contagens de `dropped` somam sempre `dropped_chars`.
+    """
+
+    def __init__(self, head_chars=0, tail_chars=0, enabled=True):
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.enabled = enabled
+
+    def trim(self, text):
+        original_chars = len(text)
+        dropped = {'quoted': 0, 'disclaimer': 0, 'signature': 0, 'whitespace': 0, 'window': 0}
+        if not self.enabled:
+            return TrimResult(text, original_chars, dropped)
+
+        kept = text
+        match = REPLY_HEADER_RE.search(kept)
+        if match and match.start() > 0:
+            dropped['quoted'] += len(kept) - match.start()
+            kept = kept[:match.start()]
+        if '>' in kept:
+            without_quotes = QUOTED_LINE_RE.sub('', kept)
+            dropped['quoted'] += len(kept) - len(without_quotes)
+            kept = without_quotes
+
+        match = DISCLAIMER_RE.search(kept)
+        if match and match.start() > 0:
+            dropped['disclaimer'] += len(kept) - match.start()
+            kept = kept[:match.start()]
+
+        cut = self._signature_start(kept)
+        if cut is not None:
+            dropped['signature'] += len(kept) - cut
+            kept = kept[:cut]
+
+        stripped = kept.strip()
+        if not stripped:
+            return TrimResult(text, original_chars, {reason: 0 for reason in dropped})
+        dropped['whitespace'] += len(kept) - len(stripped)
+        kept = stripped
+
+        if self.head_chars or self.tail_chars:
+            limit = self.head_chars + self.tail_chars
+            if len(kept) > limit:
+                dropped['window'] += len(kept) - limit
+                if self.head_chars and self.tail_chars:
+                    # O '\n' entre início e fim conta dentro do limite
+                    kept = kept[:self.head_chars] + '\n' + kept[len(kept) - self.tail_chars + 1:]
+                elif self.head_chars:
+                    kept = kept[:self.head_chars]
+                else:
+                    kept = kept[len(kept) - self.tail_chars:]
+
+        return TrimResult(kept, original_chars, dropped)
+
+    @staticmethod
+    def _signature_start(text):
+        """Posição onde a assinatura começa, se houver uma no fim do texto"""
+        match = SIGNATURE_SEPARATOR_RE.search(text)
+        if match and match.start() > 0:
+            return match.start()
+
+        # Última despedida sozinha na linha, seguida de poucas linhas curtas
+        candidate = None
+        for match in VALEDICTION_RE.finditer(text):
+            candidate = match
+        if candidate is None or not text[:candidate.start()].strip():
+            return None
+        rest = text[candidate.end():]
+        if len(rest) > MAX_SIGNATURE_CHARS or rest.count('\n') > MAX_SIGNATURE_LINES:
+            return None
+        return candidate.end() if candidate.group('thanks') else candidate.start()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Treino do motor linear (Naive Bayes multinomial ou regressão logística)
+Lê um corpus rotulado em JSONL (campos "text" e "label"), treina em streaming
+sobre os tokens de fast_preprocess e compara acurácia e custo por email com o
+motor de regras em uma amostra de validação
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from app import classifier, LINEAR_MODEL_PATH  # noqa: E402
+from linear_model import (  # noqa: E402
+    LABELS, HashingVectorizer, LinearEngine, LogisticRegressionModel,
+    NaiveBayesModel, VocabularyVectorizer,
+)
+from model_artifact import save_artifact  # noqa: E402
+
+
+def iter_corpus(path):
+    """Itera sobre os exemplos rotulados de um arquivo JSONL"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get('label') in LABELS and record.get('text'):
+                yield record
+
+
+def iter_generated(count, seed):
+    """Itera sobre um corpus sintético gerado na hora"""
+    from synthetic_corpus import CorpusGenerator
+
+    generator = CorpusGenerator(seed=seed)
+    for item in generator.iter_emails(count):
+        yield {'text': item['body'], 'label': item['label'], 'language': item['language']}
+
+
+def train(engine, records, holdout_every, progress_every=100_000):
+    """Treina com os exemplos e separa 1 a cada `holdout_every` para validação"""
+    holdout = []
+    trained = 0
+    start = time.perf_counter()
+    for n, record in enumerate(records):
+        if holdout_every and n % holdout_every == 0:
+            holdout.append(record)
+            continue
+        engine.learn(record['text'], record['label'])
+        trained += 1
+        if progress_every and trained % progress_every == 0:
+            elapsed = time.perf_counter() - start
+            print(f"   ... {trained:,} emails ({trained / elapsed:,.0f} emails/s)")
+    engine.finalize()
+    return trained, time.perf_counter() - start, holdout
+
+
+def evaluate(name, predict, holdout):
+    """Acurácia e custo médio por email de um motor"""
+    correct = 0
+    start = time.perf_counter()
+    for record in holdout:
+        if predict(record['text']) == record['label']:
+            correct += 1
+    elapsed = time.perf_counter() - start
+    accuracy = correct / len(holdout) if holdout else 0.0
+    per_email_us = elapsed / len(holdout) * 1e6 if holdout else 0.0
+    print(f"   {name:<8} acurácia {accuracy:6.1%}   {per_email_us:8.1f} µs/email")
+    return accuracy, per_email_us
+
+
+def main():
+    """Função principal do treino"""
+    parser = argparse.ArgumentParser(description="Treina o motor linear de classificação")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Corpus rotulado em JSONL (ver synthetic_corpus.py)")
+    source.add_argument("--generate", type=int, metavar="N", help="Treina com N emails sintéticos")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do corpus sintético")
+    parser.add_argument("--vectorizer", choices=['vocabulary', 'hashing'], default='vocabulary',
+                        help="Vocabulário (cresce com o corpus) ou feature hashing (memória fixa)")
+    parser.add_argument("--hash-bits", type=int, default=18, help="Bits do hashing (2^bits colunas)")
+    parser.add_argument("--unsigned", action="store_true", help="Hashing sem sinal (necessário para Naive Bayes)")
+    parser.add_argument("--algorithm", choices=['nb', 'logreg'],
+                        help="Naive Bayes ou regressão logística (padrão: nb; logreg com hashing com sinal)")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Suavização de Laplace (Naive Bayes)")
+    parser.add_argument("--learning-rate", type=float, default=0.1, help="Taxa de aprendizado (logreg)")
+    parser.add_argument("--holdout-every", type=int, default=10,
+                        help="Separa 1 a cada N exemplos para validação (0 desliga)")
+    parser.add_argument("--output", default=LINEAR_MODEL_PATH,
+                        help="Arquivo do modelo treinado (.json, ou .bin para o artefato binário via mmap)")
+
+    args = parser.parse_args()
+
+    records = iter_corpus(args.corpus) if args.corpus else iter_generated(args.generate, args.seed)
+    if args.vectorizer == 'hashing':
+        vectorizer = HashingVectorizer(args.hash_bits, signed=not args.unsigned,
+                                       patterns=classifier.productive_patterns)
+    else:
+        vectorizer = VocabularyVectorizer()
+
+    algorithm = args.algorithm or ('logreg' if args.vectorizer == 'hashing' and not args.unsigned else 'nb')
+    if algorithm == 'nb' and getattr(vectorizer, 'signed', False):
+        parser.error("Naive Bayes exige valores não negativos: use --unsigned com --vectorizer hashing")
+
+    if algorithm == 'logreg':
+        model = LogisticRegressionModel(vectorizer.n_features, learning_rate=args.learning_rate)
+    else:
+        model = NaiveBayesModel(alpha=args.alpha, n_features=vectorizer.n_features)
+    engine = LinearEngine(classifier.fast_preprocess, vectorizer, model)
+
+    print(f"🧠 Treinando motor linear ({model.name}, vetorizador {vectorizer.name})...")
+    trained, elapsed, holdout = train(engine, records, args.holdout_every)
+    print(f"✅ {trained:,} emails em {elapsed:.1f}s ({engine.vectorizer.n_features:,} colunas)")
+
+    if holdout:
+        print(f"\n📊 Validação ({len(holdout):,} emails):")
+        evaluate('rules', lambda text: classifier.classify_email(text)[0], holdout)
+        evaluate('linear', lambda text: engine.predict(text)[0], holdout)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    if args.output.endswith('.bin'):
+        save_artifact(engine, args.output, {
+            'productive_keywords': classifier.productive_keywords,
+            'unproductive_keywords': classifier.unproductive_keywords,
+            'productive_patterns': classifier.productive_patterns,
+        })
+    else:
+        engine.save(args.output)
+    print(f"\n💾 Modelo salvo em {args.output}")
+    print("   Use CLASSIFIER_ENGINE=linear ou \"engine\": \"linear\" nas requisições")
+
+
+if __name__ == "__main__":
+    main()
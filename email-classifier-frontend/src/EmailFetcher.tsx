@@ -1,4 +1,5 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
+import { classificationService, MailboxClassification } from './services/api';
 
 interface Email {
   id: string;
@@ -17,6 +18,25 @@ const EmailFetcher: React.FC<EmailFetcherProps> = ({ onEmailSelect }) => {
   const [isLoading, setIsLoading] = useState(false);
   const [emails, setEmails] = useState<Email[]>([]);
   const [error, setError] = useState<string | null>(null);
+  const [incoming, setIncoming] = useState<MailboxClassification[]>([]);
+
+  // Emails classificados pelo backend assim que chegam na caixa; só assina o stream
+  // depois que o backend confirma que lê caixas de email
+  useEffect(() => {
+    let unsubscribe: (() => void) | undefined;
+    let cancelled = false;
+    classificationService.hasMailboxEvents().then((available) => {
+      if (available && !cancelled) {
+        unsubscribe = classificationService.subscribeClassifications((result) => {
+          setIncoming((previous) => [result, ...previous].slice(0, 10));
+        });
+      }
+    });
+    return () => {
+      cancelled = true;
+      unsubscribe?.();
+    };
+  }, []);
 
   // Simulação de busca de emails (substituir por API real)
   const fetchEmails = async () => {
@@ -123,6 +143,30 @@ Empresa ABC Ltda`,
           </div>
         )}
         
+        {incoming.length > 0 && (
+          <div className="space-y-2">
+            <h4 className="font-medium text-gray-900">Chegando agora:</h4>
+            {incoming.map((result) => (
+              <div
+                key={`${result.email.account}-${result.email.uid}`}
+                className="p-3 border border-gray-200 rounded-lg flex justify-between items-center"
+              >
+                <div>
+                  <div className="text-sm font-medium text-gray-700">{result.email.subject}</div>
+                  <div className="text-xs text-gray-500">{result.email.from}</div>
+                </div>
+                <span
+                  className={`text-xs font-medium px-2 py-1 rounded ${
+                    result.category === 'Produtivo' ? 'bg-green-100 text-green-800' : 'bg-gray-100 text-gray-700'
+                  }`}
+                >
+                  {result.category}
+                </span>
+              </div>
+            ))}
+          </div>
+        )}
+
         {emails.length > 0 && (
           <div className="space-y-2">
             <h4 className="font-medium text-gray-900">Emails Encontrados:</h4>
@@ -40,6 +40,35 @@ export interface ApiError {
   message?: string;
 }
 
+export interface Job<T = any> {
+  id: string;
+  type: 'text' | 'file' | 'mailbox';
+  status: 'queued' | 'running' | 'done' | 'failed';
+  progress: number;
+  attempts: number;
+  max_attempts: number;
+  result: T | null;
+  error: string | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+export interface MailboxClassification {
+  category: 'Produtivo' | 'Improdutivo';
+  confidence: number;
+  suggested_response?: string;
+  tags?: Record<string, { score: number; spans: [number, number][] }>;
+  timestamp?: string;
+  email: {
+    account: string;
+    uid: number;
+    from: string;
+    subject: string;
+    received_at: number | null;
+  };
+}
+
 // Serviço de classificação
 export const classificationService = {
   // Classificar email via texto
@@ -75,6 +104,58 @@ export const classificationService = {
     }
   },
 
+  // Classificar arquivo em segundo plano (PDFs grandes não esbarram no timeout)
+  async submitFileJob(file: File): Promise<string> {
+    try {
+      const formData = new FormData();
+      formData.append('file', file);
+
+      const response = await api.post('/jobs', formData, {
+        headers: {
+          'Content-Type': 'multipart/form-data',
+        },
+      });
+      return response.data.id;
+    } catch (error) {
+      if (axios.isAxiosError(error)) {
+        throw new Error(error.response?.data?.error || 'Erro ao enviar o arquivo');
+      }
+      throw new Error('Erro de conexão');
+    }
+  },
+
+  // Consultar status, progresso e resultado de um job
+  async getJob<T = ClassificationResult>(id: string): Promise<Job<T>> {
+    try {
+      const response = await api.get(`/jobs/${id}`);
+      return response.data;
+    } catch (error) {
+      if (axios.isAxiosError(error)) {
+        throw new Error(error.response?.data?.error || 'Erro ao consultar o job');
+      }
+      throw new Error('Erro de conexão');
+    }
+  },
+
+  // Aguardar o fim de um job consultando o status periodicamente
+  async waitForJob<T = ClassificationResult>(
+    id: string,
+    onProgress?: (job: Job<T>) => void,
+    intervalMs = 1000,
+  ): Promise<T> {
+    for (;;) {
+      const job = await classificationService.getJob<T>(id);
+      onProgress?.(job);
+      if (job.status === 'done') {
+        return job.result as T;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Erro no processamento do job');
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  },
+
   // Verificar status da API
   async checkHealth(): Promise<{ status: string; timestamp: string; version: string }> {
     try {
@@ -98,6 +179,56 @@ export const classificationService = {
     }
   },
 
+  // Verificar se o backend lê caixas de email e transmite as classificações (SSE)
+  async hasMailboxEvents(): Promise<boolean> {
+    try {
+      const response = await api.get('/mailboxes/stats');
+      return response.data.events === true;
+    } catch (error) {
+      return false;
+    }
+  },
+
+  // Receber os emails classificados conforme chegam nas caixas (SSE); retorna a função que encerra a assinatura.
+  // Em caso de erro (fim do stream, limite de streams, backend fora do ar) a conexão é fechada e refeita
+  // com espera crescente, de 3 s a 1 min, continuando do último evento recebido
+  subscribeClassifications(onClassification: (result: MailboxClassification) => void): () => void {
+    let source: EventSource | null = null;
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    let lastId = '';
+    let delayMs = 3000;
+    let closed = false;
+
+    const connect = () => {
+      const query = lastId ? `?last_id=${encodeURIComponent(lastId)}` : '';
+      const current = new EventSource(`${API_BASE_URL}/mailboxes/events${query}`);
+      source = current;
+      current.onopen = () => {
+        delayMs = 3000;
+      };
+      current.addEventListener('classification', (event) => {
+        const message = event as MessageEvent;
+        lastId = message.lastEventId || lastId;
+        onClassification(JSON.parse(message.data));
+      });
+      current.onerror = () => {
+        current.close();
+        if (closed) {
+          return;
+        }
+        timer = setTimeout(connect, delayMs);
+        delayMs = Math.min(delayMs * 2, 60000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      source?.close();
+    };
+  },
+
   // Obter estatísticas da API
   async getStats(): Promise<any> {
     try {